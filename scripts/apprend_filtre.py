@@ -2,15 +2,29 @@
 """
 Réalise l'apprentissage du filtre anti-spam basé sur le classifieur naïf de Bayes
 avec la base d'apprentissage et sur le nombre de spam et de ham passés en paramètres
-et sauvegarde le classifieur/filtre dans le fichier passé en argument (format json).
+et sauvegarde le classifieur/filtre dans le fichier passé en argument (format json, ou binaire avec l'option -b).
 Si les nombres de spam et de ham ne sont pas précisés, l'ensemble de la base d'apprentissage sera utilisé.
+Avec l'option -H, tous les mots sont pris en compte (sans dictionnaire) par hachage dans 2^nbBits alvéoles
+(cf. moduleHachage, NumPy requis) et le filtre est sauvegardé au format .npz.
+Avec l'option -i, le filtre est mis à jour sur toute la base d'apprentissage à partir de son manifeste
+(cf. moduleManifeste) : seuls les mails ajoutés ou modifiés depuis le précédent apprentissage sont lus
+et les mails supprimés sont retirés des comptes.
 """
 
-from glob import glob
 import argparse
 import os
-from moduleUtils import is_positive_integer, is_valid_directory, is_valid_file
-from moduleFiltreAntiSpam import charger_dictionnaire, apprendre_base, sauvegarder_filtre, lissage, DEFAULT_DICT, EPSILON
+from moduleUtils import is_positive_integer, is_valid_directory, is_valid_file, eprint
+from moduleFiltreAntiSpam import charger_dictionnaire, apprendre_base, sauvegarder_filtre, DEFAULT_DICT, EPSILON
+from moduleFormatBinaire import sauvegarder_filtre_binaire
+from moduleJournal import supprimer_journal
+from moduleSources import nombre_messages, limite_messages, libelle_nombre, est_source_simple
+from moduleCache import CacheTraits
+from moduleManifeste import apprendre_incremental, supprimer_manifeste
+from moduleMetriques import ajouter_arguments, activer_depuis_arguments
+try:
+    from moduleVectorise import apprendre_base_vectorise
+except ImportError:     # NumPy absent
+    apprendre_base_vectorise = None
 
 def main():
     # On parse les arguments
@@ -25,10 +39,37 @@ def main():
                         help="(optionnel) nombre de ham à apprendre parmi ceux de la base d'apprentissage.")
     parser.add_argument("-d", "--dictionnaire", required = False, metavar="dictionnaire", dest="dict", type=is_valid_file,
                         help="le dictionnaire contenant les mots à prendre en compte.\nPar défault, c'est le fichier '" + DEFAULT_DICT + "' qui sera utilisé.")                        
+    parser.add_argument("-j", "--jobs", metavar="N", dest="jobs", type=is_positive_integer, default=1,
+                        help="nombre de processus utilisés pour l'apprentissage (par défaut : 1).")
+    parser.add_argument("-c", "--cache", metavar="fichierCache", dest="cache",
+                        help="cache des mots présents dans les mails : seuls les mails nouveaux ou modifiés sont relus.")
+    parser.add_argument("-b", "--binaire", action="store_true",
+                        help="sauvegarde le filtre au format binaire (projetable en mémoire) plutôt qu'en json.")
+    parser.add_argument("-n", "--nettoyer", action="store_true",
+                        help="supprime les en-têtes et les pièces jointes des mails avant l'apprentissage.")
+    parser.add_argument("-H", "--hachage", metavar="nbBits", type=is_positive_integer,
+                        help="mode haché : tous les mots sont hachés dans 2^nbBits alvéoles (sans dictionnaire, NumPy requis).")
+    parser.add_argument("-i", "--incremental", action="store_true",
+                        help="met à jour le filtre existant à partir de son manifeste : seuls les mails ajoutés ou modifiés\n"
+                        + "sont lus et les mails supprimés sont retirés (toute la base est apprise).")
+    ajouter_arguments(parser)
     args = parser.parse_args()
+    activer_depuis_arguments(args)
+    if args.incremental:
+        if args.nbSpam is not None or args.hachage is not None or args.cache is not None or args.nettoyer:
+            parser.error("l'apprentissage incrémental (-i) est incompatible avec nbSpam, nbHam et les options -H, -c et -n.")
+    if args.hachage is not None:
+        if args.cache is not None or args.binaire or args.dict is not None:
+            parser.error("le mode haché (-H) est incompatible avec les options -c, -b et -d.")
+        try:
+            from moduleHachage import nouveaux_comptes_haches, apprendre_base_hachee, sauvegarder_filtre_hache
+        except ImportError:
+            parser.error("le mode haché (-H) requiert NumPy.")
 
     # Dictionnaire
-    if args.dict is not None:       # Dico précisé
+    if args.hachage is not None:    # Mode haché : pas de dictionnaire
+        dict = None
+    elif args.dict is not None:     # Dico précisé
         dict = args.dict
     else:                           # Non précisé
         currentDir = os.getcwd()
@@ -45,22 +86,62 @@ def main():
     if not os.path.isdir(hamDir):
         print("Warning: Aucun répertoire 'ham' n'est présent dans " + str(args.repAppr))
 
-    # On prend tous les spams ou hams si la quantité n'est pas précisée ou dépasse la quantité réelle (des dossiers)
-    nbMaxSpam = len([nom for nom in glob(os.path.join(spamDir, '*.txt'))])
-    nbMaxHam = len([nom for nom in glob(os.path.join(hamDir, '*.txt'))])
-    nbSpam = min(i for i in [args.nbSpam, nbMaxSpam] if i is not None)
-    nbHam = min(i for i in [args.nbHam, nbMaxHam] if i is not None)
+    # On prend tous les spams ou hams si la quantité n'est pas précisée ou dépasse la quantité réelle (des dossiers) ;
+    # les messages des archives ne sont comptés que pendant l'apprentissage
+    nbMaxSpam = nombre_messages(spamDir)
+    nbMaxHam = nombre_messages(hamDir)
+    nbSpam = limite_messages(args.nbSpam, nbMaxSpam)
+    nbHam = limite_messages(args.nbHam, nbMaxHam)
     
 
+    # Mode haché : apprentissage et sauvegarde des comptes hachés
+    if args.hachage is not None:
+        try:
+            comptes = nouveaux_comptes_haches(args.hachage)
+        except ValueError as e:
+            parser.error(str(e))
+        print("Apprentissage (haché sur 2^" + str(args.hachage) + " alvéoles) sur " + libelle_nombre(nbSpam) + " spams et "
+              + libelle_nombre(nbHam) + " hams...")
+        (nbSpam, nbHam) = apprendre_base_hachee(comptes, spamDir, hamDir, nbSpam, nbHam, args.jobs, args.nettoyer)
+        sauvegarder_filtre_hache(args.fichierFiltre, comptes, nbSpam, nbHam, EPSILON)
+        supprimer_journal(args.fichierFiltre)
+        supprimer_manifeste(args.fichierFiltre)
+        print("Classifieur enregistré dans '" + args.fichierFiltre + "'.")
+        return
+
     # On commence l'apprentissage
-    dicoProbas = charger_dictionnaire(dict)
-    print("Apprentissage sur " + str(nbSpam) + " spams et " + str(nbHam) + " hams...")
-    apprendre_base(dicoProbas, spamDir, hamDir, nbSpam, nbHam)
-    # On lisse
-    print("Lissage...")
-    lissage(dicoProbas, nbSpam, nbHam, EPSILON)
-    # On sauvegarde le filtre
-    sauvegarder_filtre(args.fichierFiltre, dicoProbas, nbSpam , nbHam)
+    dicoComptes = charger_dictionnaire(dict)
+    if args.incremental:
+        if not (est_source_simple(spamDir) and est_source_simple(hamDir)):
+            parser.error("l'apprentissage incrémental (-i) ne prend en charge que des mails .txt (ni archive ni maildir).")
+        print("Apprentissage incrémental sur " + str(nbMaxSpam) + " spams et " + str(nbMaxHam) + " hams...")
+        try:
+            stats = apprendre_incremental(args.fichierFiltre, dicoComptes, spamDir, hamDir, args.jobs, args.binaire or None)
+        except ValueError as e: # Aucun mail ou filtre modifié pendant l'apprentissage
+            eprint(str(e))
+            exit(-1)
+        if stats['reconstruction']:
+            print("Manifeste absent ou établi avec un autre dictionnaire : filtre entièrement réappris.")
+        if stats['ecartAbandonne']:
+            print("Warning: l'éventuel apprentissage en ligne déjà intégré à l'ancien filtre (compaction) n'a pas été conservé.")
+        print(str(stats['nbLus']) + " mails lus, " + str(stats['nbRetires']) + " mails retirés.")
+        print("Classifieur enregistré dans '" + args.fichierFiltre + "'.")
+        return
+    print("Apprentissage sur " + libelle_nombre(nbSpam) + " spams et " + libelle_nombre(nbHam) + " hams...")
+    cache = CacheTraits(args.cache, dicoComptes) if args.cache is not None else None
+    # Moteur d'apprentissage vectorisé si NumPy est disponible
+    apprendre = apprendre_base_vectorise if apprendre_base_vectorise is not None else apprendre_base
+    (nbSpam, nbHam) = apprendre(dicoComptes, spamDir, hamDir, nbSpam, nbHam, args.jobs, cache, args.nettoyer)
+    if cache is not None:
+        print(str(cache.nbCaches) + " mails lus depuis le cache, " + str(cache.nbLus) + " mails lus.")
+        cache.fermer()
+    # On sauvegarde le filtre (les comptes, le lissage est fait lors de la prédiction)
+    if args.binaire:
+        sauvegarder_filtre_binaire(args.fichierFiltre, dicoComptes, nbSpam, nbHam, EPSILON)
+    else:
+        sauvegarder_filtre(args.fichierFiltre, dicoComptes, nbSpam, nbHam, EPSILON)
+    supprimer_journal(args.fichierFiltre)   # Le journal d'un éventuel ancien filtre ne s'applique plus
+    supprimer_manifeste(args.fichierFiltre) # Ni son manifeste
     print("Classifieur enregistré dans '" + args.fichierFiltre + "'.")
 
 if __name__ == '__main__':
@@ -1,38 +1,120 @@
 #!/usr/bin/env python
 """
-Modifie un classifieur existant (provenant d'un fichier json) en apprenant un spam ou un ham.
+Modifie un classifieur existant (provenant d'un fichier json ou binaire) en apprenant des spams et des hams.
+Les mails appris sont ajoutés au journal du filtre (<fichierFiltre>.journal) sans réécrire le filtre ;
+le journal est rejoué au chargement du filtre et intégré par compacter_filtre.py (ou l'option --compacter).
+
+Les mails à apprendre sont désignés :
+  - par un mail, un répertoire, un motif glob ou '-' (chemins lus sur l'entrée standard) suivi du type ;
+  - ou par un manifeste (-m) : un mail par ligne sous la forme chemin,type ('-' pour l'entrée standard).
+Tous les mails sont lus avant d'être ajoutés au journal en une seule écriture.
 """
 
+from argparse import ArgumentTypeError
 import argparse
-from moduleUtils import is_valid_mail_type, is_valid_file
-from moduleFiltreAntiSpam import charger_filtre, ajouter_mail, sauvegarder_filtre, EPSILON
+import csv
+import sys
+from moduleUtils import is_valid_mail_type, is_valid_file, iterer_chemins, eprint
+from moduleFiltreAntiSpam import lire_contenu
+from moduleJournal import journaliser_plusieurs, mots_du_contenu, vocabulaire_journal, compacter_filtre
+from moduleMetriques import ajouter_arguments, activer_depuis_arguments
+
+def lire_manifeste(cheminManifeste):
+    """
+    Lit un manifeste de mails à apprendre (une ligne chemin,type par mail).
+
+    Parameters
+    ----------
+    cheminManifeste : str
+        Le chemin du manifeste, ou '-' pour l'entrée standard.
+
+    Returns
+    -------
+    list
+        Les couples (chemin du mail, type SPAM ou HAM).
+
+    Raises
+    ------
+    ValueError
+        Si une ligne du manifeste est invalide.
+    """
+    fichier = sys.stdin if cheminManifeste == '-' else open(cheminManifeste, 'r', newline='')
+    try:
+        mails = []
+        for (numero, ligne) in enumerate(csv.reader(fichier), 1):
+            if not ligne:
+                continue
+            try:
+                (chemin, type) = ligne
+                mails.append((chemin, is_valid_mail_type(type.strip())))
+            except (ValueError, ArgumentTypeError) as e:
+                raise ValueError("Ligne " + str(numero) + " du manifeste invalide (chemin,type attendu) : " + str(e))
+        return mails
+    finally:
+        if fichier is not sys.stdin:
+            fichier.close()
 
 def main():
     # On parse les arguments
     parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
     parser.add_argument("fichierFiltre", metavar="fichierFiltre", type=is_valid_file,
                         help="fichier contenant les données du filtre à mettre à jour.")
-    parser.add_argument("mail", metavar="mail", type=is_valid_file,
-                        help="mail à apprendre.")
-    parser.add_argument("type", metavar="type", type=is_valid_mail_type,
-                        help="type du mail à apprendre : HAM ou SPAM.")
+    parser.add_argument("mail", metavar="mail", nargs='?',
+                        help="mail à apprendre, ou répertoire/motif glob de mails, ou '-' pour lire les chemins sur l'entrée standard.")
+    parser.add_argument("type", metavar="type", nargs='?', type=is_valid_mail_type,
+                        help="type du (des) mail(s) à apprendre : HAM ou SPAM.")
+    parser.add_argument("-m", "--manifeste", metavar="manifeste",
+                        help="fichier listant les mails à apprendre (une ligne chemin,type par mail), '-' pour l'entrée standard.")
+    parser.add_argument("-c", "--compacter", action="store_true",
+                        help="intègre le journal au filtre après l'apprentissage (cf. compacter_filtre.py).")
+    ajouter_arguments(parser)
     args = parser.parse_args()
+    activer_depuis_arguments(args)
 
     fichierFiltre = args.fichierFiltre
-    mail = args.mail
-    isSpam = args.type == "SPAM"
-    
-    # Apprentissage en ligne
-    (dicoProbas, nbSpam, nbHam) = charger_filtre(fichierFiltre)
-    ajouter_mail(dicoProbas, nbSpam, nbHam, mail, EPSILON, isSpam)
-    if isSpam:
-        nbSpam+=1
+    if args.manifeste is not None:
+        if args.mail is not None:
+            parser.error("un manifeste (-m) ne peut être combiné à un mail et un type.")
+        try:
+            mails = lire_manifeste(args.manifeste)
+        except (OSError, ValueError) as e:
+            eprint(str(e))
+            exit(-1)
+    elif args.type is None:
+        parser.error("un mail (ou répertoire) et son type, ou un manifeste (-m), sont requis.")
     else:
-        nbHam+=1
-    sauvegarder_filtre(fichierFiltre, dicoProbas, nbSpam, nbHam)
+        mails = [(chemin, args.type) for chemin in iterer_chemins([args.mail])]
+        if not mails:
+            parser.error("aucun mail ne correspond à '" + args.mail + "'.")
+
+    # Apprentissage en ligne : on lit tous les mails puis on ajoute leurs mots au journal du filtre (sans le charger)
+    try:
+        vocabulaire = vocabulaire_journal(fichierFiltre)
+    except ValueError as e: # N'est pas un fichier de filtre
+        eprint(str(e))
+        exit(-1)
+    try:
+        lus = [(mots_du_contenu(lire_contenu(chemin), vocabulaire), type == "SPAM") for (chemin, type) in mails]
+    except OSError as e:
+        eprint("Lecture impossible : " + str(e))
+        exit(-1)
+    journaliser_plusieurs(fichierFiltre, lus)
+
+    if len(mails) == 1:
+        print("Modification du filtre '" + fichierFiltre + "' par apprentissage sur le " + mails[0][1] + " '" + mails[0][0] + "'.")
+    else:
+        nbSpam = sum(1 for (_, isSpam) in lus if isSpam)
+        print("Modification du filtre '" + fichierFiltre + "' par apprentissage sur " + str(nbSpam) + " spams et "
+              + str(len(lus) - nbSpam) + " hams.")
+
+    if args.compacter:
+        try:
+            compacter_filtre(fichierFiltre)
+        except ValueError as e: # N'est pas un fichier de filtre ou journal invalide
+            eprint(str(e))
+            exit(-1)
+        print("Journal intégré au filtre '" + fichierFiltre + "'.")
 
-    print("Modification du filtre '" + fichierFiltre + "' par apprentissage sur le " + args.type + " '" + mail + "'.")
 
-    
 if __name__ == '__main__':
     main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+"""
+Compare le temps de lecture des mails d'un répertoire entre l'ancienne représentation
+(vecteur binaire obtenu par copie du dictionnaire, cf. lire_message) et l'ensemble
+des mots présents (cf. lire_mots_presents).
+"""
+
+from copy import deepcopy
+import argparse
+import os
+import re
+import time
+from glob import glob
+from moduleUtils import is_positive_integer, is_valid_directory, is_valid_file
+from moduleFiltreAntiSpam import charger_dictionnaire, lire_mots_presents, DEFAULT_DICT
+
+def lire_message_copie(messageFilePath, dico) :
+    """
+    Ancienne lecture d'un message : copie du dictionnaire puis recherche de chaque mot capitalisé.
+    """
+    dicoPresence = deepcopy(dico)
+    for mot in dicoPresence : dicoPresence[mot] = False
+    with open(messageFilePath, 'r', encoding='utf-8', errors='ignore') as file:
+        for word in re.split(r'\W+', file.read()) :
+            if word.upper() in dicoPresence :
+                dicoPresence[word.upper()] = True
+    return dicoPresence
+
+def chronometrer(fonction, fichiersMails, dico, repetitions):
+    """
+    Retourne le meilleur temps (en secondes) de lecture de tous les mails sur plusieurs répétitions.
+    """
+    meilleur = None
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        for fichierMail in fichiersMails:
+            fonction(fichierMail, dico)
+        duree = time.perf_counter() - debut
+        meilleur = duree if meilleur is None else min(meilleur, duree)
+    return meilleur
+
+def main():
+    # On parse les arguments
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("repMails", metavar="répertoireMails", type=is_valid_directory,
+                        help="répertoire contenant les mails (.txt) à lire.")
+    parser.add_argument("-d", "--dictionnaire", metavar="dictionnaire", dest="dict", type=is_valid_file, default=DEFAULT_DICT,
+                        help="le dictionnaire contenant les mots à prendre en compte.\nPar défault, c'est le fichier '" + DEFAULT_DICT + "' qui sera utilisé.")
+    parser.add_argument("-r", "--repetitions", metavar="N", type=is_positive_integer, default=3,
+                        help="nombre de répétitions (le meilleur temps est retenu, par défaut : 3).")
+    args = parser.parse_args()
+
+    dico = charger_dictionnaire(args.dict)
+    fichiersMails = glob(os.path.join(args.repMails, '*.txt'))
+    if not fichiersMails:
+        print("Aucun mail (.txt) dans " + args.repMails)
+        return
+
+    # On vérifie que les deux lectures donnent les mêmes mots
+    for fichierMail in fichiersMails:
+        vecteur = lire_message_copie(fichierMail, dico)
+        assert {mot for mot in vecteur if vecteur[mot]} == lire_mots_presents(fichierMail, dico)
+
+    tempsCopie = chronometrer(lire_message_copie, fichiersMails, dico, args.repetitions)
+    tempsPresents = chronometrer(lire_mots_presents, fichiersMails, dico, args.repetitions)
+    print("{0} mails, dictionnaire de {1} mots".format(len(fichiersMails), len(dico)))
+    print("Copie du dictionnaire : {0:.1f} µs/mail".format(tempsCopie / len(fichiersMails) * 1e6))
+    print("Mots présents         : {0:.1f} µs/mail".format(tempsPresents / len(fichiersMails) * 1e6))
+    print("Gain                  : x{0:.1f}".format(tempsCopie / tempsPresents))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+"""
+Suite de benchmarks du filtre anti-spam.
+
+  generer : génère un corpus synthétique (et éventuellement un dictionnaire synthétique).
+  lancer  : mesure le temps, le débit et le pic de mémoire de chaque étape du filtre
+            sur un corpus et sauvegarde les mesures (json).
+  comparer : compare deux fichiers de mesures ; le code de retour est 1 en cas de régression.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+from moduleUtils import is_positive_integer, is_valid_directory, is_valid_file
+from moduleFiltreAntiSpam import DEFAULT_DICT
+from moduleBenchmark import generer_dictionnaire, generer_corpus, lancer_benchmarks, comparer_benchmarks
+
+def generer(args):
+    """
+    Génère un corpus synthétique.
+    """
+    dictionnaire = args.dict
+    if args.nbMots is not None:
+        dictionnaire = os.path.join(args.repCorpus, 'dictionnaire.txt')
+        os.makedirs(args.repCorpus, exist_ok=True)
+        generer_dictionnaire(dictionnaire, args.nbMots, args.graine)
+    generer_corpus(args.repCorpus, dictionnaire, args.nbSpam, args.nbHam, args.longueur, args.graine)
+    print("Corpus de " + str(args.nbSpam) + " spams et " + str(args.nbHam) + " hams généré dans '" + args.repCorpus
+          + "' (dictionnaire '" + dictionnaire + "').")
+
+def lancer(args):
+    """
+    Mesure chaque étape du filtre et sauvegarde les mesures.
+    """
+    mesures = lancer_benchmarks(args.repCorpus, args.dict, args.repetitions)
+    print("{0:<25} {1:>12} {2:>14} {3:>14}".format("étape", "temps (s)", "débit (/s)", "mémoire (Ko)"))
+    for (nom, mesure) in mesures.items():
+        print("{0:<25} {1:>12.4f} {2:>14.1f} {3:>14.1f}".format(nom, mesure['secondes'], mesure['debit'] or 0,
+                                                                mesure['memoireMax'] / 1024))
+    if args.sortie is not None:
+        with open(args.sortie, 'w') as f:
+            json.dump({'python': platform.python_version(), 'corpus': os.path.abspath(args.repCorpus),
+                       'dictionnaire': os.path.abspath(args.dict), 'mesures': mesures}, f, indent=2)
+        print("Mesures enregistrées dans '" + args.sortie + "'.")
+
+def comparer(args):
+    """
+    Compare deux fichiers de mesures.
+    """
+    with open(args.reference, 'r') as f:
+        reference = json.load(f)['mesures']
+    with open(args.courant, 'r') as f:
+        courant = json.load(f)['mesures']
+
+    regression = False
+    print("{0:<25} {1:>10} {2:>10}".format("étape", "temps", "mémoire"))
+    for (nom, rapportTemps, rapportMemoire, estRegression) in comparer_benchmarks(reference, courant, args.seuil):
+        print("{0:<25} {1:>9.2f}x {2:>9.2f}x{3}".format(nom, rapportTemps, rapportMemoire, "  **régression**" if estRegression else ""))
+        regression = regression or estRegression
+    sys.exit(1 if regression else 0)
+
+def main():
+    # On parse les arguments
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    sousParsers = parser.add_subparsers(dest="commande", required=True)
+
+    parserGenerer = sousParsers.add_parser("generer", help="génère un corpus synthétique.")
+    parserGenerer.add_argument("repCorpus", metavar="répertoireCorpus",
+                               help="répertoire du corpus à générer (sous-répertoires spam et ham).")
+    parserGenerer.add_argument("nbSpam", metavar="nbSpam", type=is_positive_integer, help="nombre de spams.")
+    parserGenerer.add_argument("nbHam", metavar="nbHam", type=is_positive_integer, help="nombre de hams.")
+    parserGenerer.add_argument("-l", "--longueur", metavar="nbMots", type=is_positive_integer, default=200,
+                               help="nombre moyen de mots par message (par défaut : 200).")
+    parserGenerer.add_argument("-d", "--dictionnaire", metavar="dictionnaire", dest="dict", type=is_valid_file, default=DEFAULT_DICT,
+                               help="le dictionnaire dans lequel les mots sont tirés.\nPar défault, c'est le fichier '" + DEFAULT_DICT + "' qui sera utilisé.")
+    parserGenerer.add_argument("-m", "--mots", metavar="nbMots", dest="nbMots", type=is_positive_integer,
+                               help="génère un dictionnaire synthétique de nbMots mots (dictionnaire.txt dans le corpus) plutôt que d'utiliser -d.")
+    parserGenerer.add_argument("-g", "--graine", metavar="graine", type=int, default=0,
+                               help="graine du générateur aléatoire (par défaut : 0).")
+    parserGenerer.set_defaults(fonction=generer)
+
+    parserLancer = sousParsers.add_parser("lancer", help="mesure chaque étape du filtre.")
+    parserLancer.add_argument("repCorpus", metavar="répertoireCorpus", type=is_valid_directory,
+                              help="répertoire du corpus (contenant 2 sous-répertoires spam et ham).")
+    parserLancer.add_argument("-d", "--dictionnaire", metavar="dictionnaire", dest="dict", type=is_valid_file, default=DEFAULT_DICT,
+                              help="le dictionnaire contenant les mots à prendre en compte.\nPar défault, c'est le fichier '" + DEFAULT_DICT + "' qui sera utilisé.")
+    parserLancer.add_argument("-r", "--repetitions", metavar="N", type=is_positive_integer, default=3,
+                              help="nombre de répétitions chronométrées (le meilleur temps est retenu, par défaut : 3).")
+    parserLancer.add_argument("-o", "--sortie", metavar="fichier", dest="sortie",
+                              help="fichier json dans lequel sauvegarder les mesures.")
+    parserLancer.set_defaults(fonction=lancer)
+
+    parserComparer = sousParsers.add_parser("comparer", help="compare deux fichiers de mesures.")
+    parserComparer.add_argument("reference", metavar="référence", type=is_valid_file, help="mesures de référence (json).")
+    parserComparer.add_argument("courant", metavar="courant", type=is_valid_file, help="nouvelles mesures (json).")
+    parserComparer.add_argument("-s", "--seuil", metavar="seuil", type=float, default=0.1,
+                                help="augmentation relative du temps ou de la mémoire considérée comme une régression (par défaut : 0.1).")
+    parserComparer.set_defaults(fonction=comparer)
+
+    args = parser.parse_args()
+    args.fonction(args)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+"""
+Client du serveur de classification (cf. serveur_filtre.py) :
+prédit si des mails sont des spams ou des hams, ou les fait apprendre au serveur.
+"""
+
+import argparse
+import json
+import os
+import socket
+from moduleUtils import is_valid_file, is_valid_mail_type, eprint
+from serveur_filtre import DEFAULT_SOCKET
+
+def main():
+    # On parse les arguments
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("mails", metavar="mail", nargs='*', type=is_valid_file,
+                        help="mails à tester (ou à apprendre avec l'option -a).")
+    parser.add_argument("-s", "--socket", default=DEFAULT_SOCKET, metavar="socket", dest="socket",
+                        help="chemin de la socket Unix du serveur.\nPar défaut : '" + DEFAULT_SOCKET + "'.")
+    parser.add_argument("-a", "--apprendre", metavar="type", type=is_valid_mail_type, dest="type",
+                        help="fait apprendre les mails au serveur : HAM ou SPAM.")
+    parser.add_argument("-c", "--contenu", action="store_true",
+                        help="envoie le contenu des mails plutôt que leur chemin (serveur distant du système de fichiers).")
+    parser.add_argument("--stats", action="store_true",
+                        help="affiche le nombre de requêtes traitées par le serveur et ses latences p50/p99.")
+    args = parser.parse_args()
+
+    requetes = []
+    for mail in args.mails:
+        requete = {"action": "classer"} if args.type is None else {"action": "apprendre", "type": args.type}
+        if args.contenu:
+            with open(mail, 'r', encoding='utf-8', errors='ignore') as f:
+                requete["contenu"] = f.read()
+        else:
+            requete["chemin"] = os.path.abspath(mail)
+        requetes.append((mail, requete))
+    if args.stats:
+        requetes.append(("stats", {"action": "stats"}))
+
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+            s.connect(args.socket)
+            fichierSocket = s.makefile('rw', encoding='utf-8')
+            for (nom, requete) in requetes:
+                fichierSocket.write(json.dumps(requete) + "\n")
+                fichierSocket.flush()
+                reponse = json.loads(fichierSocket.readline())
+                if "erreur" in reponse:
+                    eprint(nom + " : " + reponse["erreur"])
+                elif "etiquette" in reponse:
+                    print(nom + "\t" + reponse["etiquette"] + "\t" + repr(reponse["pSpam"]))
+                elif "appris" in reponse:
+                    print("Apprentissage du " + reponse["appris"] + " '" + nom + "'.")
+                else:
+                    print("{0} requêtes traitées (p50 = {1} ms, p99 = {2} ms).".format(reponse["requetes"], reponse["p50"], reponse["p99"]))
+    except OSError as e:
+        eprint("Connexion au serveur '" + args.socket + "' impossible : " + str(e))
+        exit(-1)
+
+if __name__ == '__main__':
+    main()
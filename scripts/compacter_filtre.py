@@ -0,0 +1,27 @@
+#!/usr/bin/env python
+"""
+Intègre le journal d'apprentissage en ligne (<fichierFiltre>.journal) à un filtre
+puis vide le journal. Le filtre est conservé dans son format d'origine (json ou binaire).
+"""
+
+import argparse
+from moduleUtils import is_valid_file, eprint
+from moduleJournal import compacter_filtre
+
+def main():
+    # On parse les arguments
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("fichierFiltre", metavar="fichierFiltre", type=is_valid_file,
+                        help="fichier contenant les données du filtre à compacter.")
+    args = parser.parse_args()
+
+    try:
+        nbEntrees = compacter_filtre(args.fichierFiltre)
+    except ValueError as e: # N'est pas un fichier de filtre ou journal invalide
+        eprint(str(e))
+        exit(-1)
+
+    print(str(nbEntrees) + " mail(s) du journal intégré(s) au filtre '" + args.fichierFiltre + "'.")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+"""
+Convertit un fichier de filtre/classifieur du format json vers le format binaire
+(projetable en mémoire) ou inversement.
+Par défaut, le filtre est converti dans le format opposé à celui du fichier source.
+"""
+
+import argparse
+from moduleUtils import is_valid_file, eprint
+from moduleFiltreAntiSpam import charger_filtre, sauvegarder_filtre
+from moduleFormatBinaire import est_filtre_binaire, sauvegarder_filtre_binaire
+from moduleJournal import supprimer_journal
+
+def main():
+    # On parse les arguments
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("fichierSource", metavar="fichierSource", type=is_valid_file,
+                        help="fichier contenant les données du filtre à convertir (json ou binaire).")
+    parser.add_argument("fichierDestination", metavar="fichierDestination",
+                        help="fichier de sortie où le filtre converti sera sauvegardé.")
+    parser.add_argument("-f", "--format", choices=["json", "binaire"],
+                        help="format du fichier de sortie (par défaut : le format opposé à celui du fichier source).")
+    args = parser.parse_args()
+
+    format = args.format
+    if format is None:
+        format = "json" if est_filtre_binaire(args.fichierSource) else "binaire"
+
+    try:
+        (dicoComptes, nbSpam, nbHam, epsilon) = charger_filtre(args.fichierSource)
+    except ValueError as e: # N'est pas un fichier de filtre
+        eprint(str(e))
+        exit(-1)
+
+    if format == "binaire":
+        sauvegarder_filtre_binaire(args.fichierDestination, dicoComptes, nbSpam, nbHam, epsilon)
+    else:
+        sauvegarder_filtre(args.fichierDestination, dicoComptes, nbSpam, nbHam, epsilon)
+    supprimer_journal(args.fichierDestination)  # Le journal du fichier source est intégré au filtre converti
+    print("Filtre '" + args.fichierSource + "' converti au format " + format + " dans '" + args.fichierDestination + "'.")
+
+if __name__ == '__main__':
+    main()
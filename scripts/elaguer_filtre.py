@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+"""
+Élague le vocabulaire d'un filtre/classifieur (json ou binaire) : les mots sont notés après le lissage
+par information mutuelle ou par log-odds (cf. moduleElagage) et seuls les K mots les mieux notés (-k)
+ou ceux dont la note dépasse un seuil (-s) sont conservés dans le filtre sauvegardé.
+Avec l'option -t, le compromis taux d'erreurs / taille du modèle est évalué sur une base de test
+pour plusieurs nombres de mots conservés et écrit au format csv.
+"""
+
+import argparse
+import csv
+import os
+import sys
+from moduleUtils import is_positive_integer, is_positive_number_list, is_valid_directory, is_valid_file, eprint
+from moduleFiltreAntiSpam import charger_filtre, sauvegarder_filtre, lissage
+from moduleFormatBinaire import est_filtre_binaire, sauvegarder_filtre_binaire
+from moduleJournal import supprimer_journal
+from moduleElagage import CRITERES, COLONNES_ELAGAGE, scores_mots, classer_mots, selectionner_mots, elaguer, compromis_elagage
+from moduleSources import nombre_messages
+
+def main():
+    # On parse les arguments
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("fichierSource", metavar="fichierSource", type=is_valid_file,
+                        help="fichier contenant les données du filtre à élaguer (json ou binaire).")
+    parser.add_argument("fichierDestination", metavar="fichierDestination",
+                        help="fichier de sortie où le filtre élagué sera sauvegardé.")
+    parser.add_argument("-k", "--mots", metavar="K", dest="nbMots", type=is_positive_integer,
+                        help="nombre de mots conservés (les mieux notés).")
+    parser.add_argument("-s", "--seuil", metavar="note", type=float,
+                        help="note minimale des mots conservés.")
+    parser.add_argument("-C", "--critere", choices=CRITERES, default=CRITERES[0],
+                        help="critère de notation des mots : information mutuelle ou log-odds (par défaut : information).")
+    parser.add_argument("-f", "--format", choices=["json", "binaire"],
+                        help="format du fichier de sortie (par défaut : celui du fichier source).")
+    parser.add_argument("-t", "--test", metavar="répertoireTest", dest="repTest", type=is_valid_directory,
+                        help="base de test (contenant 2 sous-répertoires spam et ham) sur laquelle évaluer le compromis\ntaux d'erreurs / taille du modèle.")
+    parser.add_argument("--tailles", metavar="n1,n2,...", type=is_positive_number_list,
+                        help="nombres de mots conservés à évaluer avec -t (par défaut : 1/16, 1/8, 1/4 et 1/2 du vocabulaire,\nle nombre de mots sélectionnés et le vocabulaire complet).")
+    parser.add_argument("--csv", metavar="fichier", dest="csv",
+                        help="fichier csv du compromis (par défaut : sortie standard).")
+    parser.add_argument("-j", "--jobs", metavar="N", dest="jobs", type=is_positive_integer, default=1,
+                        help="nombre de processus utilisés pour les tests (par défaut : 1).")
+    parser.add_argument("-n", "--nettoyer", action="store_true",
+                        help="supprime les en-têtes et les pièces jointes des mails avant les tests.")
+    args = parser.parse_args()
+
+    if args.nbMots is None and args.seuil is None:
+        parser.error("un nombre de mots (-k) ou un seuil (-s) est requis.")
+    if args.tailles is not None and any(not isinstance(taille, int) for taille in args.tailles):
+        parser.error("les nombres de mots doivent être entiers.")
+
+    try:
+        (dicoComptes, nbSpam, nbHam, epsilon) = charger_filtre(args.fichierSource)
+    except ValueError as e: # N'est pas un fichier de filtre
+        eprint(str(e))
+        exit(-1)
+
+    # Notation et sélection des mots
+    scores = scores_mots(lissage(dicoComptes, nbSpam, nbHam, epsilon), nbSpam / (nbSpam + nbHam), args.critere)
+    mots = selectionner_mots(scores, args.nbMots, args.seuil)
+    if not mots:
+        eprint("Aucun mot n'atteint le seuil " + str(args.seuil) + ".")
+        exit(-1)
+
+    format = args.format
+    if format is None:
+        format = "binaire" if est_filtre_binaire(args.fichierSource) else "json"
+    dicoElague = elaguer(dicoComptes, mots)
+    if format == "binaire":
+        sauvegarder_filtre_binaire(args.fichierDestination, dicoElague, nbSpam, nbHam, epsilon)
+    else:
+        sauvegarder_filtre(args.fichierDestination, dicoElague, nbSpam, nbHam, epsilon)
+    supprimer_journal(args.fichierDestination)
+    # Le csv du compromis peut être écrit sur la sortie standard : le message passe alors par la sortie d'erreur
+    print("Filtre '" + args.fichierSource + "' élagué de " + str(len(dicoComptes)) + " à " + str(len(dicoElague))
+          + " mots dans '" + args.fichierDestination + "'.", file=sys.stderr if args.repTest is not None and args.csv is None else sys.stdout)
+
+    # Compromis taux d'erreurs / taille du modèle
+    if args.repTest is not None:
+        spamTestDir = os.path.join(args.repTest, 'spam')
+        hamTestDir = os.path.join(args.repTest, 'ham')
+        nbMotsTotal = len(dicoComptes)
+        if args.tailles is not None:
+            tailles = {min(taille, nbMotsTotal) for taille in args.tailles}
+        else:
+            tailles = {max(1, nbMotsTotal // diviseur) for diviseur in (16, 8, 4, 2, 1)} | {len(mots)}
+        fichierCsv = open(args.csv, 'w', newline='') if args.csv is not None else sys.stdout
+        ecrivain = csv.DictWriter(fichierCsv, fieldnames=COLONNES_ELAGAGE)
+        ecrivain.writeheader()
+        for ligne in compromis_elagage(dicoComptes, nbSpam, nbHam, epsilon, classer_mots(scores), tailles,
+                                       spamTestDir, hamTestDir, nombre_messages(spamTestDir), nombre_messages(hamTestDir),
+                                       args.jobs, args.nettoyer):
+            ecrivain.writerow(ligne)
+            fichierCsv.flush()
+        if args.csv is not None:
+            fichierCsv.close()
+
+if __name__ == '__main__':
+    main()
@@ -5,13 +5,26 @@ avec la base d'apprentissage contenue dans le répertoire baseapp par défaut ou
 et effectue des tests sur la base de test passée en paramètre
 et éventuellement le nombre de spam et de ham de cette base à tester.
 Si les nombres de spam et de ham à tester ne sont pas précisés, l'ensemble de la base de test sera utilisé.
+Avec l'option --courbe, la courbe d'apprentissage (taux d'erreurs et temps en fonction du nombre
+de mails appris) est calculée sans interaction et écrite au format csv.
+Avec l'option -H, le filtre apprend tous les mots (sans dictionnaire) hachés dans 2^nbBits alvéoles (NumPy requis).
 """
 
-from glob import glob
+import csv
 import os
+import sys
 import argparse
-from moduleUtils import is_positive_integer, is_valid_directory, is_valid_file, ask_input_for_integer_between_bounds, eprint
-from moduleFiltreAntiSpam import charger_dictionnaire, apprendre_base, lissage, test_dossiers, DEFAULT_REP_APPR, DEFAULT_DICT, EPSILON
+from moduleUtils import is_positive_integer, is_positive_number_list, is_valid_directory, is_valid_file, ask_input_for_integer_between_bounds, eprint
+from moduleFiltreAntiSpam import (charger_dictionnaire, apprendre_base, lissage, compiler_filtre, evaluer_base, afficher_resultats,
+                                  ecrire_resultats_jsonl, DEFAULT_REP_APPR, DEFAULT_DICT, EPSILON)
+from moduleCache import CacheTraits
+from moduleCourbe import courbe_apprentissage, COLONNES_COURBE
+from moduleSources import nombre_messages, limite_messages, est_source_simple
+from moduleMetriques import ajouter_arguments, activer_depuis_arguments
+try:
+    from moduleVectorise import apprendre_base_vectorise, lissage_vectorise
+except ImportError:     # NumPy absent
+    apprendre_base_vectorise = lissage_vectorise = None
 
 def main() :
     # On parse les arguments
@@ -26,7 +39,36 @@ def main() :
                         help="le répertoire contenant la base d'apprentissage (contenant 2 sous-répertoires spam et ham).\nPar défaut, c'est le dossier '" + DEFAULT_REP_APPR + "' qui sera utilisé.")
     parser.add_argument("-d", "--dictionnaire", required = False, metavar="dictionnaire", dest="dict", type=is_valid_file,
                         help="le dictionnaire contenant les mots à prendre en compte.\nPar défault, c'est le fichier '" + DEFAULT_DICT + "' qui sera utilisé.")
+    parser.add_argument("-j", "--jobs", metavar="N", dest="jobs", type=is_positive_integer, default=1,
+                        help="nombre de processus utilisés pour l'apprentissage et les tests (par défaut : 1).")
+    parser.add_argument("-c", "--cache", metavar="fichierCache", dest="cache",
+                        help="cache des mots présents dans les mails : seuls les mails nouveaux ou modifiés sont relus.")
+    parser.add_argument("-v", "--details", action="store_true",
+                        help="affiche la prédiction de chaque message testé.")
+    parser.add_argument("-m", "--matrice", action="store_true",
+                        help="affiche la matrice de confusion.")
+    parser.add_argument("-o", "--sortie", metavar="fichier", dest="sortie",
+                        help="écrit le résultat de chaque message testé dans un fichier (json, un message par ligne).")
+    parser.add_argument("--courbe", metavar="n1,n2,...", type=is_positive_number_list,
+                        help="calcule la courbe d'apprentissage pour ces nombres de spams et de hams appris (par ex. 100,200,500).")
+    parser.add_argument("--csv", metavar="fichier", dest="csv",
+                        help="fichier csv de la courbe d'apprentissage (par défaut : sortie standard).")
+    parser.add_argument("-n", "--nettoyer", action="store_true",
+                        help="supprime les en-têtes et les pièces jointes des mails avant l'apprentissage et les tests.")
+    parser.add_argument("-H", "--hachage", metavar="nbBits", type=is_positive_integer,
+                        help="mode haché : tous les mots sont hachés dans 2^nbBits alvéoles (sans dictionnaire, NumPy requis).")
+    ajouter_arguments(parser)
     args = parser.parse_args()
+    activer_depuis_arguments(args)
+    if args.hachage is not None:
+        if args.courbe is not None or args.cache is not None or args.dict is not None:
+            parser.error("le mode haché (-H) est incompatible avec les options --courbe, -c et -d.")
+        try:
+            from moduleHachage import nouveaux_comptes_haches, apprendre_base_hachee, compiler_filtre_hache
+        except ImportError:
+            parser.error("le mode haché (-H) requiert NumPy.")
+    if args.courbe is not None and any(not isinstance(taille, int) for taille in args.courbe):
+        parser.error("les tailles de la courbe d'apprentissage doivent être entières.")
     
     # Base de test
     spamTestDir = os.path.join(args.repTest, 'spam')
@@ -38,13 +80,15 @@ def main() :
         print("Warning: Aucun répertoire 'ham' n'est présent dans " + str(args.repTest))
         
     # On prend tous les spams ou hams si la quantité n'est pas précisée ou dépasse la quantité réelle (des dossiers)
-    nbMaxSpamTest = len([nom for nom in glob(os.path.join(spamTestDir, '*.txt'))])
-    nbMaxHamTest = len([nom for nom in glob(os.path.join(hamTestDir, '*.txt'))])
-    nbSpamTest = min(i for i in [args.nbSpamTest, nbMaxSpamTest] if i is not None)
-    nbHamTest = min(i for i in [args.nbHamTest, nbMaxHamTest] if i is not None)
+    nbMaxSpamTest = nombre_messages(spamTestDir)
+    nbMaxHamTest = nombre_messages(hamTestDir)
+    nbSpamTest = limite_messages(args.nbSpamTest, nbMaxSpamTest)
+    nbHamTest = limite_messages(args.nbHamTest, nbMaxHamTest)
     
     # Dictionnaire
-    if args.dict is not None:       # Dico précisé
+    if args.hachage is not None:    # Mode haché : pas de dictionnaire
+        dict = None
+    elif args.dict is not None:     # Dico précisé
         dict = args.dict
     else:                           # Non précisé
         currentDir = os.getcwd()
@@ -73,28 +117,69 @@ def main() :
     if not os.path.isdir(hamApprDir):
         print("Warning: Aucun répertoire 'ham' n'est présent dans " + str(repAppr))
         
-    # On compte le nombre de spam et de ham de la base d'apprentissage
-    nbMaxSpamAppr = len([nom for nom in glob(os.path.join(spamApprDir, '*.txt'))])
-    nbMaxHamAppr = len([nom for nom in glob(os.path.join(hamApprDir, '*.txt'))])
+    # On compte le nombre de spam et de ham de la base d'apprentissage (inconnu pour des archives : compté à l'apprentissage)
+    nbMaxSpamAppr = nombre_messages(spamApprDir)
+    nbMaxHamAppr = nombre_messages(hamApprDir)
     
+    # Courbe d'apprentissage (sans interaction)
+    if args.courbe is not None:
+        if args.nettoyer or not all(est_source_simple(dossier) for dossier in (spamApprDir, hamApprDir, spamTestDir, hamTestDir)):
+            parser.error("la courbe d'apprentissage requiert des mails .txt (sans archives ni --nettoyer).")
+        dicoComptes = charger_dictionnaire(dict)
+        cache = CacheTraits(args.cache, dicoComptes) if args.cache is not None else None
+        fichierCsv = open(args.csv, 'w', newline='') if args.csv is not None else sys.stdout
+        ecrivain = csv.DictWriter(fichierCsv, fieldnames=COLONNES_COURBE)
+        ecrivain.writeheader()
+        for etape in courbe_apprentissage(dicoComptes, spamApprDir, hamApprDir, args.courbe, spamTestDir, hamTestDir,
+                                          nbSpamTest, nbHamTest, EPSILON, args.jobs, cache):
+            ecrivain.writerow(etape)
+            fichierCsv.flush()
+        if args.csv is not None:
+            fichierCsv.close()
+        if cache is not None:
+            cache.fermer()
+        return
+
     # On demande à l'utilisateur de préciser le nombre de spam et de ham à utiliser pour l'apprentissage
-    nbSpamAppr = ask_input_for_integer_between_bounds('Spams dans la base d\'apprentissage ? (max ' + str(nbMaxSpamAppr) + ') ',
+    nbSpamAppr = ask_input_for_integer_between_bounds('Spams dans la base d\'apprentissage ?' + (' (max ' + str(nbMaxSpamAppr) + ')' if nbMaxSpamAppr is not None else '') + ' ',
                                                       1, nbMaxSpamAppr)
                         
-    nbHamAppr = ask_input_for_integer_between_bounds('Hams dans la base d\'apprentissage ? (max ' + str(nbMaxHamAppr) + ') ',
+    nbHamAppr = ask_input_for_integer_between_bounds('Hams dans la base d\'apprentissage ?' + (' (max ' + str(nbMaxHamAppr) + ')' if nbMaxHamAppr is not None else '') + ' ',
                                                      1, nbMaxHamAppr)
 
     # Apprentissage
-    dicoProbas = charger_dictionnaire(dict)
-    print('Apprentissage...')
-    apprendre_base(dicoProbas, spamApprDir, hamApprDir, nbSpamAppr, nbHamAppr)
+    if args.hachage is not None:    # Mode haché : lissage et compilation sur les comptes hachés
+        try:
+            comptes = nouveaux_comptes_haches(args.hachage)
+        except ValueError as e:
+            parser.error(str(e))
+        print('Apprentissage...')
+        cache = None
+        (nbSpamAppr, nbHamAppr) = apprendre_base_hachee(comptes, spamApprDir, hamApprDir, nbSpamAppr, nbHamAppr, args.jobs, args.nettoyer)
+        print('Lissage...')
+        filtreCompile = compiler_filtre_hache(comptes, nbSpamAppr, nbHamAppr, EPSILON)
+        print('Tests :')
+    else:
+        dicoComptes = charger_dictionnaire(dict)
+        # Moteur d'apprentissage et lissage vectorisés si NumPy est disponible
+        (apprendre, lisser) = ((apprendre_base_vectorise, lissage_vectorise) if apprendre_base_vectorise is not None
+                               else (apprendre_base, lissage))
+        print('Apprentissage...')
+        cache = CacheTraits(args.cache, dicoComptes) if args.cache is not None else None
+        (nbSpamAppr, nbHamAppr) = apprendre(dicoComptes, spamApprDir, hamApprDir, nbSpamAppr, nbHamAppr, args.jobs, cache, args.nettoyer)
 
-    print('Lissage...')
-    lissage(dicoProbas, nbSpamAppr, nbHamAppr, EPSILON)
-    
-    # Tests
-    print('Tests :')
-    test_dossiers(spamTestDir, hamTestDir, nbSpamAppr, nbHamAppr, dicoProbas, nbSpamTest, nbHamTest)
+        print('Lissage...')
+        dicoProbas = lisser(dicoComptes, nbSpamAppr, nbHamAppr, EPSILON)
+
+        # Tests
+        print('Tests :')
+        filtreCompile = compiler_filtre(dicoProbas, nbSpamAppr/(nbSpamAppr+nbHamAppr), nbHamAppr/(nbSpamAppr+nbHamAppr))
+    resultat = evaluer_base(filtreCompile, spamTestDir, hamTestDir, nbSpamTest, nbHamTest, args.jobs, cache, args.nettoyer)
+    if cache is not None:
+        cache.fermer()
+    afficher_resultats(resultat, args.details, args.matrice)
+    if args.sortie is not None:
+        ecrire_resultats_jsonl(resultat, args.sortie)
     
 if __name__ == '__main__':
     main()
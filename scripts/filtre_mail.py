@@ -1,44 +1,113 @@
 #!/usr/bin/env python
 """
 Prédit si un mail est un spam ou un ham à partir d'un filtre/classifieur
-stocké dans un fichier (json) passé en argument.
+stocké dans un fichier (json ou binaire) passé en argument.
+En mode lot (-l), le filtre n'est chargé qu'une fois et une ligne de verdict
+(chemin, étiquette, P(SPAM)) est écrite au fil de l'eau pour chaque mail ;
+les fichiers mbox, Maildir et archives .gz/.tar.gz sont lus en flux (un verdict par message).
+Avec les options -a et -B, un mail (hors mode lot) est lu par blocs et sa lecture s'arrête dès que le verdict
+est certain ou une fois le budget d'octets lu (cf. predire_fichier_flux).
 """
 
 import argparse
-from moduleUtils import is_valid_file, eprint
-from moduleFiltreAntiSpam import charger_filtre, predire_message
+from argparse import ArgumentTypeError
+import json
+import os
+import sys
+from pathlib import Path
+from moduleUtils import is_valid_file, is_positive_integer, eprint
+from moduleFiltreAntiSpam import predire_fichier_flux
+from moduleClassifieur import FiltreAntiSpam
+from moduleSources import iterer_sources
+from moduleMetriques import ajouter_arguments, activer_depuis_arguments
 from math import exp
 
+def classer_lot(sources, filtre, format, nettoyer=False) :
+    """
+    Classe tous les messages désignés par les sources (cf. iterer_sources) et écrit un verdict par ligne sur la sortie standard.
+    Retourne le nombre de messages classés.
+    """
+    sortie = sys.stdout
+    nbMessages = 0
+    # Un fichier ou une archive illisible est signalé et ignoré
+    for (mail, contenu) in iterer_sources(sources, nettoyer, lambda chemin, e: eprint(chemin + " : " + str(e))):
+        (etiquette, pSpam, _, _) = filtre.classer(contenu)
+        if format == "jsonl":
+            sortie.write(json.dumps({"chemin": mail, "etiquette": etiquette, "pSpam": pSpam}) + "\n")
+        else:
+            sortie.write(mail + "\t" + etiquette + "\t" + repr(pSpam) + "\n")
+        nbMessages += 1
+    sortie.flush()
+    return nbMessages
+
 def main() :
     # On parse les arguments
     parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
     parser.add_argument("fichierFiltre", metavar="fichierFiltre", type=is_valid_file,
                         help="fichier contenant les données du filtre.")
-    parser.add_argument("mail", metavar="mail", type=is_valid_file,
-                        help="mail à tester.")
+    parser.add_argument("mails", metavar="mail", nargs='+',
+                        help="mail à tester.\nEn mode lot : répertoires, fichiers, motifs glob ou '-' pour lire la liste des mails sur l'entrée standard.")
+    parser.add_argument("-l", "--lot", action="store_true",
+                        help="mode lot : classe tous les mails désignés et écrit un verdict par ligne.")
+    parser.add_argument("-f", "--format", choices=["tsv", "jsonl"], default="tsv",
+                        help="format des verdicts en mode lot (par défaut : tsv).")
+    parser.add_argument("-n", "--nettoyer", action="store_true",
+                        help="supprime les en-têtes et les pièces jointes des mails avant la prédiction.")
+    parser.add_argument("-a", "--anticipe", action="store_true",
+                        help="lit le mail par blocs et s'arrête dès que la suite du mail ne peut plus changer le verdict.")
+    parser.add_argument("-B", "--budget", metavar="octets", type=is_positive_integer,
+                        help="nombre maximal d'octets du mail lus (lecture par blocs).")
+    ajouter_arguments(parser)
     args = parser.parse_args()
+    activer_depuis_arguments(args)
 
     fichierFiltre = args.fichierFiltre
-    mail = args.mail
-    
-    # On charge le fichier de filtre
-    try:    
-        (dicoProbas, nbSpam, nbHam) = charger_filtre(fichierFiltre)
+    if not args.lot:
+        if len(args.mails) != 1:
+            parser.error("un seul mail à tester attendu (utilisez -l pour le mode lot).")
+        try:
+            mail = is_valid_file(args.mails[0])
+        except ArgumentTypeError as e:
+            parser.error(str(e))
+    flux = args.anticipe or args.budget is not None
+    if flux and (args.lot or args.nettoyer):
+        parser.error("la lecture par blocs (-a, -B) est incompatible avec les options -l et -n.")
+
+    # On charge et compile le fichier de filtre
+    try:
+        filtre = FiltreAntiSpam.charger(fichierFiltre)
     except ValueError as e: # N'est pas un fichier de filtre
         eprint(str(e))
         exit(-1)
-    
-    # Et on prédit l'étiquette du mail
-    PspamApriori = nbSpam / (nbSpam + nbHam)
-    PhamApriori = nbHam / (nbSpam + nbHam)
-    (probaSpam, probaHam) = predire_message(mail, nbSpam, nbHam, dicoProbas, PspamApriori, PhamApriori)
-    
+
+    # Et on prédit l'étiquette du ou des mails
+    if args.lot:
+        try:
+            nbMessages = classer_lot(args.mails, filtre, args.format, args.nettoyer)
+        except BrokenPipeError:     # Sortie fermée (| head par exemple) : on s'arrête sans trace d'erreur
+            os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+            exit(1)
+        if nbMessages == 0:
+            eprint("Aucun mail ne correspond à " + " ".join(args.mails)
+                   + " (les répertoires ne sont pas parcourus récursivement : désignez par exemple leurs sous-répertoires spam et ham).")
+            exit(-1)
+        return
+
+    if flux:
+        prediction = predire_fichier_flux(mail, filtre.filtreCompile, budgetOctets=args.budget, arretAnticipe=args.anticipe)
+        (probaSpam, probaHam) = (prediction.logPspam, prediction.logPham)
+    else:
+        (_, _, probaSpam, probaHam) = filtre.classer(Path(mail), args.nettoyer)
+
     msg = "D'après '" + fichierFiltre + "', le message '" + mail + "' est un "
     if probaSpam > probaHam:
         msg += "SPAM à {0} !".format(1. / (1. + exp(probaHam - probaSpam)))
     else:
         msg += "HAM à {0} !".format(1. / (1. + exp(probaSpam - probaHam)))
+    if flux and prediction.arretAnticipe:
+        msg += " (lecture arrêtée après " + str(prediction.octetsLus) + " octets : "
+        msg += "verdict certain)" if prediction.raison == 'borne' else "budget atteint)"
     print(msg)
-    
+
 if __name__ == '__main__':
     main()
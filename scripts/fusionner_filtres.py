@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+"""
+Fusionne des filtres/classifieurs partiels (json, binaires ou hachés), appris par exemple sur différents nœuds :
+les comptes des mots et les nombres de spams et de hams sont additionnés, le lissage n'étant appliqué
+qu'à la prédiction. Le filtre obtenu est identique à celui appris sur l'union des mails.
+Avec l'option -s, les comptes d'un filtre partiel sont soustraits (expiration d'anciens mails).
+Les filtres doivent partager le même dictionnaire et le même epsilon.
+"""
+
+import argparse
+from moduleUtils import is_valid_file, eprint
+from moduleFiltreAntiSpam import charger_filtre, sauvegarder_filtre, est_filtre_hache
+from moduleFormatBinaire import est_filtre_binaire, sauvegarder_filtre_binaire
+from moduleJournal import supprimer_journal
+from moduleFusion import fusionner_filtres
+
+def charger(cheminFichier):
+    """
+    Charge un filtre partiel (à dictionnaire ou haché), journal compris.
+    """
+    if est_filtre_hache(cheminFichier):
+        from moduleHachage import charger_filtre_hache
+        return charger_filtre_hache(cheminFichier)
+    return charger_filtre(cheminFichier)
+
+def main():
+    # On parse les arguments
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("fichierDestination", metavar="fichierDestination",
+                        help="fichier de sortie où le filtre fusionné sera sauvegardé.")
+    parser.add_argument("filtres", metavar="filtre", nargs='+', type=is_valid_file,
+                        help="filtres partiels à fusionner.")
+    parser.add_argument("-s", "--soustraire", metavar="filtre", action="append", default=[], type=is_valid_file,
+                        help="filtre partiel dont les comptes sont soustraits (option répétable).")
+    parser.add_argument("-f", "--format", choices=["json", "binaire"],
+                        help="format du fichier de sortie d'un filtre à dictionnaire (par défaut : celui du premier filtre).")
+    args = parser.parse_args()
+
+    try:
+        modeles = [(chemin, charger(chemin)) for chemin in args.filtres]
+        soustraits = [(chemin, charger(chemin)) for chemin in args.soustraire]
+        (comptes, nbSpam, nbHam, epsilon) = fusionner_filtres(modeles, soustraits)
+    except ValueError as e: # N'est pas un fichier de filtre ou filtres incompatibles
+        eprint(str(e))
+        exit(-1)
+
+    if not isinstance(comptes, dict):
+        from moduleHachage import sauvegarder_filtre_hache
+        sauvegarder_filtre_hache(args.fichierDestination, comptes, nbSpam, nbHam, epsilon)
+    elif args.format == "binaire" or (args.format is None and est_filtre_binaire(args.filtres[0])):
+        sauvegarder_filtre_binaire(args.fichierDestination, comptes, nbSpam, nbHam, epsilon)
+    else:
+        sauvegarder_filtre(args.fichierDestination, comptes, nbSpam, nbHam, epsilon)
+    supprimer_journal(args.fichierDestination)
+    print("Filtre fusionné (" + str(nbSpam) + " spams et " + str(nbHam) + " hams) enregistré dans '" + args.fichierDestination + "'.")
+
+if __name__ == '__main__':
+    main()
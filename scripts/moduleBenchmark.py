@@ -0,0 +1,218 @@
+"""
+Module contenant la suite de benchmarks du filtre anti-spam : génération de corpus synthétiques,
+mesure du temps, du débit et du pic de mémoire de chaque étape, et comparaison de deux mesures.
+"""
+
+import os
+import random
+import string
+import tempfile
+import time
+import tracemalloc
+from moduleFiltreAntiSpam import (charger_dictionnaire, lire_message, lire_mots_presents, lister_mails, apprendre_base,
+                                  lissage, predire_message, compiler_filtre, predire_message_compile,
+                                  sauvegarder_filtre, charger_filtre, ajouter_mail, EPSILON)
+
+#: Proportion des mots d'un message synthétique tirés du vocabulaire propre à sa classe
+PROPORTION_MOTS_CLASSE = 0.3
+
+def generer_dictionnaire(cheminFichier, nbMots, graine=0):
+    """
+    Génère un dictionnaire de mots aléatoires (un par ligne).
+
+    Parameters
+    ----------
+    cheminFichier : str
+        Le chemin du fichier du dictionnaire à créer.
+    nbMots : int
+        Le nombre de mots (distincts) du dictionnaire.
+    graine : int
+        La graine du générateur aléatoire.
+    """
+    aleatoire = random.Random(graine)
+    mots = set()
+    while len(mots) < nbMots:
+        mots.add(''.join(aleatoire.choice(string.ascii_lowercase) for _ in range(aleatoire.randint(3, 12))))
+    with open(cheminFichier, 'w') as f:
+        for mot in sorted(mots):
+            f.write(mot + '\n')
+
+
+def generer_corpus(repertoire, cheminDictionnaire, nbSpam, nbHam, longueurMessage, graine=0):
+    """
+    Génère un corpus synthétique de spams et de hams (sous-répertoires spam et ham, un mail .txt par fichier).
+    Chaque classe a son propre vocabulaire privilégié parmi les mots du dictionnaire, qui ne dépend que
+    du dictionnaire : des corpus générés avec des graines différentes (apprentissage et test) sont cohérents.
+    Les messages contiennent aussi des mots hors dictionnaire et de la ponctuation.
+
+    Parameters
+    ----------
+    repertoire : str
+        Le répertoire du corpus (créé s'il n'existe pas).
+    cheminDictionnaire : str
+        Le dictionnaire dans lequel les mots sont tirés.
+    nbSpam : int
+        Le nombre de spams à générer.
+    nbHam : int
+        Le nombre de hams à générer.
+    longueurMessage : int
+        Le nombre moyen de mots d'un message.
+    graine : int
+        La graine du générateur aléatoire.
+    """
+    aleatoire = random.Random(graine)   # Ne sert qu'à tirer les messages
+    with open(cheminDictionnaire, 'r') as f:
+        mots = [mot.strip() for mot in f if mot.strip()]
+    # Vocabulaires des classes : un mot sur trois du dictionnaire chacun, dans l'ordre du fichier
+    vocabulaires = {'spam': mots[0::3], 'ham': mots[1::3]}
+    ponctuations = ['', '', '', ',', '.', '!', '?']
+
+    for (classe, nb) in (('spam', nbSpam), ('ham', nbHam)):
+        dossier = os.path.join(repertoire, classe)
+        os.makedirs(dossier, exist_ok=True)
+        for i in range(nb):
+            message = []
+            for _ in range(aleatoire.randint(longueurMessage // 2, 3 * longueurMessage // 2)):
+                tirage = aleatoire.random()
+                if tirage < PROPORTION_MOTS_CLASSE:
+                    mot = aleatoire.choice(vocabulaires[classe])
+                elif tirage < 0.9:
+                    mot = aleatoire.choice(mots)
+                else:   # Mot hors dictionnaire
+                    mot = ''.join(aleatoire.choice(string.ascii_lowercase) for _ in range(aleatoire.randint(1, 10)))
+                message.append(mot + aleatoire.choice(ponctuations))
+            with open(os.path.join(dossier, str(i) + '.txt'), 'w') as f:
+                f.write(' '.join(message))
+
+
+def mesurer(preparer, executer, nbElements, repetitions=3):
+    """
+    Mesure une étape : le meilleur temps sur plusieurs répétitions, le débit correspondant
+    et le pic de mémoire allouée (mesuré lors d'une exécution supplémentaire sous tracemalloc).
+
+    Parameters
+    ----------
+    preparer : function
+        Fonction sans paramètre retournant les arguments de l'étape (non chronométrée).
+    executer : function
+        Fonction réalisant l'étape.
+    nbElements : int
+        Le nombre d'éléments (mails, mots...) traités par l'étape, pour le calcul du débit.
+    repetitions : int
+        Le nombre de répétitions chronométrées.
+
+    Returns
+    -------
+    dict
+        La mesure : secondes, debit (éléments par seconde), memoireMax (octets) et nbElements.
+    """
+    meilleur = None
+    for _ in range(repetitions):
+        arguments = preparer()
+        debut = time.perf_counter()
+        executer(*arguments)
+        duree = time.perf_counter() - debut
+        meilleur = duree if meilleur is None else min(meilleur, duree)
+
+    arguments = preparer()
+    tracemalloc.start()
+    executer(*arguments)
+    memoireMax = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {'secondes': meilleur, 'debit': nbElements / meilleur if meilleur > 0 else None,
+            'memoireMax': memoireMax, 'nbElements': nbElements}
+
+
+def lancer_benchmarks(repCorpus, cheminDictionnaire, repetitions=3, nbMailsReference=100):
+    """
+    Mesure chaque étape du filtre sur un corpus (cf. mesurer).
+
+    Parameters
+    ----------
+    repCorpus : str
+        Le répertoire du corpus (contenant 2 sous-répertoires spam et ham).
+    cheminDictionnaire : str
+        Le dictionnaire utilisé.
+    repetitions : int
+        Le nombre de répétitions chronométrées de chaque étape.
+    nbMailsReference : int
+        Le nombre de mails prédits avec predire_message et lus avec lire_message,
+        dont le coût est proportionnel à la taille du dictionnaire.
+
+    Returns
+    -------
+    dict
+        Les mesures de chaque étape (nom de l'étape -> mesure).
+    """
+    spamDir = os.path.join(repCorpus, 'spam')
+    hamDir = os.path.join(repCorpus, 'ham')
+    fichiersSpam = lister_mails(spamDir, None)
+    fichiersHam = lister_mails(hamDir, None)
+    fichiersMails = fichiersSpam + fichiersHam
+    (nbSpam, nbHam) = (len(fichiersSpam), len(fichiersHam))
+    fichiersReference = fichiersMails[:nbMailsReference]
+
+    dico = charger_dictionnaire(cheminDictionnaire)
+    dicoComptes = charger_dictionnaire(cheminDictionnaire)
+    apprendre_base(dicoComptes, spamDir, hamDir, nbSpam, nbHam)
+    dicoProbas = lissage(dicoComptes, nbSpam, nbHam, EPSILON)
+    (PspamApriori, PhamApriori) = (nbSpam / (nbSpam + nbHam), nbHam / (nbSpam + nbHam))
+    filtreCompile = compiler_filtre(dicoProbas, PspamApriori, PhamApriori)
+    repTemporaire = tempfile.TemporaryDirectory()
+    fichierFiltre = os.path.join(repTemporaire.name, 'filtre.json')
+    sauvegarder_filtre(fichierFiltre, dicoComptes, nbSpam, nbHam, EPSILON)
+
+    sansArgument = lambda: ()
+    etapes = {
+        'charger_dictionnaire': (sansArgument, lambda: charger_dictionnaire(cheminDictionnaire), len(dico)),
+        'lire_message': (sansArgument, lambda: [lire_message(f, dico) for f in fichiersReference], len(fichiersReference)),
+        'lire_mots_presents': (sansArgument, lambda: [lire_mots_presents(f, dico) for f in fichiersMails], len(fichiersMails)),
+        'apprendre_base': (lambda: (charger_dictionnaire(cheminDictionnaire),),
+                           lambda d: apprendre_base(d, spamDir, hamDir, nbSpam, nbHam), len(fichiersMails)),
+        'lissage': (sansArgument, lambda: lissage(dicoComptes, nbSpam, nbHam, EPSILON), len(dico)),
+        'compiler_filtre': (sansArgument, lambda: compiler_filtre(dicoProbas, PspamApriori, PhamApriori), len(dico)),
+        'predire_message': (sansArgument,
+                            lambda: [predire_message(f, nbSpam, nbHam, dicoProbas, PspamApriori, PhamApriori) for f in fichiersReference],
+                            len(fichiersReference)),
+        'predire_message_compile': (sansArgument, lambda: [predire_message_compile(f, filtreCompile) for f in fichiersMails],
+                                    len(fichiersMails)),
+        'sauvegarder_filtre': (sansArgument, lambda: sauvegarder_filtre(fichierFiltre, dicoComptes, nbSpam, nbHam, EPSILON), len(dico)),
+        'charger_filtre': (sansArgument, lambda: charger_filtre(fichierFiltre), len(dico)),
+        'ajouter_mail': (lambda: ({mot: list(comptes) for (mot, comptes) in dicoComptes.items()},),
+                         lambda d: [ajouter_mail(d, f, True) for f in fichiersMails], len(fichiersMails)),
+    }
+
+    mesures = {}
+    for (nom, (preparer, executer, nbElements)) in etapes.items():
+        mesures[nom] = mesurer(preparer, executer, nbElements, repetitions)
+    repTemporaire.cleanup()
+    return mesures
+
+
+def comparer_benchmarks(reference, courant, seuil):
+    """
+    Compare deux ensembles de mesures (cf. lancer_benchmarks).
+
+    Parameters
+    ----------
+    reference : dict
+        Les mesures de référence (nom de l'étape -> mesure).
+    courant : dict
+        Les nouvelles mesures.
+    seuil : float
+        L'augmentation relative du temps (ou du pic de mémoire) au-delà de laquelle il y a régression (0.1 pour 10%).
+
+    Returns
+    -------
+    list
+        Pour chaque étape commune, un tuple (nom, rapport des temps, rapport des pics de mémoire, régression ?).
+    """
+    comparaisons = []
+    for nom in reference:
+        if nom not in courant:
+            continue
+        rapportTemps = courant[nom]['secondes'] / reference[nom]['secondes'] if reference[nom]['secondes'] else 1.
+        rapportMemoire = courant[nom]['memoireMax'] / reference[nom]['memoireMax'] if reference[nom]['memoireMax'] else 1.
+        comparaisons.append((nom, rapportTemps, rapportMemoire, rapportTemps > 1 + seuil or rapportMemoire > 1 + seuil))
+    return comparaisons
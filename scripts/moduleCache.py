@@ -0,0 +1,117 @@
+"""
+Module contenant le cache sur disque des traits (mots présents) des mails.
+
+Pour chaque mail, le cache conserve l'ensemble des mots du dictionnaire qui y sont présents,
+sous la forme des numéros de ces mots dans le dictionnaire trié. Une entrée est identifiée
+par le chemin du mail, sa taille et sa date de modification, ainsi que par l'empreinte
+du dictionnaire et le nombre minimal de caractères des mots : seuls les mails nouveaux
+ou modifiés sont relus.
+"""
+
+from array import array
+import hashlib
+import os
+import sqlite3
+from moduleFiltreAntiSpam import lire_mots_presents_parallele, DEFAULT_MIN_CHAR_DICT
+
+def empreinte_dictionnaire(mots, minNbOfChar=DEFAULT_MIN_CHAR_DICT):
+    """
+    Calcule l'empreinte (sha1) d'un dictionnaire de mots.
+
+    Parameters
+    ----------
+    mots : iterable
+        Les mots (capitalisés) du dictionnaire.
+    minNbOfChar : int
+        Le nombre de caractères minimal à partir duquel un mot est pris en compte.
+
+    Returns
+    -------
+    str
+        L'empreinte hexadécimale du dictionnaire.
+    """
+    empreinte = hashlib.sha1(str(minNbOfChar).encode('utf-8'))
+    for mot in sorted(mots):
+        empreinte.update(b'\n' + mot.encode('utf-8'))
+    return empreinte.hexdigest()
+
+
+class CacheTraits:
+    """
+    Cache sur disque (base sqlite) des mots présents dans les mails pour un dictionnaire donné.
+    """
+
+    def __init__(self, cheminCache, vocabulaire, minNbOfChar=DEFAULT_MIN_CHAR_DICT):
+        """
+        Parameters
+        ----------
+        cheminCache : str
+            Le chemin du fichier du cache (créé s'il n'existe pas).
+        vocabulaire : iterable
+            Les mots (capitalisés) du dictionnaire.
+        minNbOfChar : int
+            Le nombre de caractères minimal à partir duquel un mot du dictionnaire est pris en compte.
+        """
+        self.mots = sorted(vocabulaire)
+        self.vocabulaire = frozenset(self.mots)
+        self.indexMots = {mot: i for (i, mot) in enumerate(self.mots)}
+        self.empreinte = empreinte_dictionnaire(self.mots, minNbOfChar)
+        self.connexion = sqlite3.connect(cheminCache)
+        self.connexion.execute("CREATE TABLE IF NOT EXISTS traits (empreinte TEXT, chemin TEXT, taille INTEGER, mtime INTEGER,"
+                               " indices BLOB, PRIMARY KEY (empreinte, chemin))")
+        self.nbLus = 0
+        self.nbCaches = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.fermer()
+
+    def fermer(self):
+        """
+        Ferme le cache.
+        """
+        self.connexion.close()
+
+    def lire_plusieurs(self, fichiersMails, nbJobs=1):
+        """
+        Retourne les mots présents dans chaque mail, en ne lisant que les mails absents du cache
+        ou modifiés depuis leur mise en cache (éventuellement avec plusieurs processus).
+
+        Parameters
+        ----------
+        fichiersMails : list
+            Les chemins des mails.
+        nbJobs : int
+            Le nombre de processus utilisés pour lire les mails absents du cache.
+
+        Returns
+        -------
+        list
+            Pour chaque mail (dans l'ordre), l'ensemble des mots du dictionnaire qui y sont présents.
+        """
+        presents = [None] * len(fichiersMails)
+        aLire = []
+        requete = "SELECT taille, mtime, indices FROM traits WHERE empreinte = ? AND chemin = ?"
+        for (i, fichierMail) in enumerate(fichiersMails):
+            chemin = os.path.abspath(fichierMail)
+            stat = os.stat(chemin)
+            ligne = self.connexion.execute(requete, (self.empreinte, chemin)).fetchone()
+            if ligne is not None and ligne[0] == stat.st_size and ligne[1] == stat.st_mtime_ns:
+                indices = array('I')
+                indices.frombytes(ligne[2])
+                presents[i] = {self.mots[j] for j in indices}
+            else:
+                aLire.append((i, chemin, stat))
+        self.nbCaches += len(fichiersMails) - len(aLire)
+        self.nbLus += len(aLire)
+
+        lus = lire_mots_presents_parallele([chemin for (_, chemin, _) in aLire], self.vocabulaire, nbJobs)
+        with self.connexion:
+            for ((i, chemin, stat), mots) in zip(aLire, lus):
+                presents[i] = mots
+                indices = array('I', sorted(self.indexMots[mot] for mot in mots))
+                self.connexion.execute("INSERT OR REPLACE INTO traits VALUES (?, ?, ?, ?, ?)",
+                                       (self.empreinte, chemin, stat.st_size, stat.st_mtime_ns, indices.tobytes()))
+        return presents
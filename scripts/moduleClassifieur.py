@@ -0,0 +1,204 @@
+"""
+Module contenant le classifieur FiltreAntiSpam : un filtre immuable (comptes en tableaux en lecture seule
+et filtre compilé), utilisable sans verrou par plusieurs threads.
+
+L'apprentissage ne modifie pas le filtre : il retourne un nouveau filtre (instantané). Une application
+multi-thread remplace simplement sa référence au filtre, les classements en cours continuant avec l'ancien :
+
+    filtre = FiltreAntiSpam.charger("filtre.json")
+    verdict = filtre.classer(Path("mail.txt"))
+    filtre = filtre.apprendre("contenu d'un spam...", True)
+"""
+
+from array import array
+from collections import namedtuple
+import os
+from moduleFiltreAntiSpam import (lire_contenu, mots_presents, lissage, compiler_filtre, predire_contenu_compile,
+                                  proba_spam, charger_filtre, est_filtre_hache, EPSILON)
+from moduleSources import nettoyer_message
+
+#: Verdict d'un message (cf. FiltreAntiSpam.classer)
+Verdict = namedtuple('Verdict', ['etiquette', 'pSpam', 'logPspam', 'logPham'])
+
+def _lecture_seule(comptes):
+    """
+    Retourne une vue en lecture seule sur des comptes (array ou tableau NumPy).
+    """
+    if hasattr(comptes, 'flags'):   # Tableau NumPy
+        comptes = comptes.view()
+        comptes.flags.writeable = False
+        return comptes
+    return memoryview(comptes).toreadonly()
+
+
+class FiltreAntiSpam:
+    """
+    Classifieur immuable : comptes des mots, nombres de spams et de hams appris, epsilon et filtre compilé.
+    Construit à partir du résultat de charger_filtre : FiltreAntiSpam(*charger_filtre(chemin)).
+    """
+    __slots__ = ('mots', 'comptesSpam', 'comptesHam', 'nbSpam', 'nbHam', 'epsilon', 'filtreCompile')
+
+    def __init__(self, dicoComptes, nbSpam, nbHam, epsilon=EPSILON):
+        filtreCompile = compiler_filtre(lissage(dicoComptes, nbSpam, nbHam, epsilon),
+                                        nbSpam / (nbSpam + nbHam), nbHam / (nbSpam + nbHam))
+        # L'index des mots du filtre compilé suit l'ordre de dicoComptes
+        self._initialiser(filtreCompile.indexMots,
+                          _lecture_seule(array('q', (comptes[0] for comptes in dicoComptes.values()))),
+                          _lecture_seule(array('q', (comptes[1] for comptes in dicoComptes.values()))),
+                          nbSpam, nbHam, epsilon, filtreCompile)
+
+    def _initialiser(self, mots, comptesSpam, comptesHam, nbSpam, nbHam, epsilon, filtreCompile):
+        for (nom, valeur) in zip(self.__slots__, (mots, comptesSpam, comptesHam, nbSpam, nbHam, epsilon, filtreCompile)):
+            object.__setattr__(self, nom, valeur)
+
+    @classmethod
+    def _depuis_modele(cls, mots, comptesSpam, comptesHam, nbSpam, nbHam, epsilon, filtreCompile):
+        """
+        Construit un filtre à partir de comptes déjà en lecture seule et de son filtre compilé.
+        """
+        filtre = cls.__new__(cls)
+        filtre._initialiser(mots, comptesSpam, comptesHam, nbSpam, nbHam, epsilon, filtreCompile)
+        return filtre
+
+    def __setattr__(self, nom, valeur):
+        raise AttributeError("Un FiltreAntiSpam est immuable : l'apprentissage retourne un nouveau filtre.")
+
+    @classmethod
+    def depuis_binaire(cls, modele):
+        """
+        Construit un filtre sur un filtre binaire déjà lu (cf. lire_filtre_binaire), sans copie ni compilation :
+        le tampon du filtre binaire doit rester ouvert tant que le filtre est utilisé.
+        """
+        return cls._depuis_modele(modele.mots, modele.comptesSpam, modele.comptesHam,
+                                  modele.nbSpam, modele.nbHam, modele.epsilon, modele.filtreCompile)
+
+    @classmethod
+    def charger(cls, cheminFichier):
+        """
+        Charge un filtre depuis un fichier (json, binaire ou haché) et rejoue son journal.
+        Un filtre binaire dont le journal est vide est projeté en mémoire, sans copie ni compilation.
+
+        Raises
+        ------
+        ValueError
+            Si le fichier passé en paramètre n'est pas un fichier de filtre valide.
+        """
+        from moduleFormatBinaire import est_filtre_binaire, charger_filtre_binaire
+        from moduleJournal import verrou_journal, taille_journal
+        if est_filtre_hache(cheminFichier):
+            from moduleHachage import charger_filtre_hache, compiler_filtre_hache, hacheur
+            (comptes, nbSpam, nbHam, epsilon) = charger_filtre_hache(cheminFichier)
+            return cls._depuis_modele(hacheur(comptes), _lecture_seule(comptes[0]), _lecture_seule(comptes[1]),
+                                      nbSpam, nbHam, epsilon, compiler_filtre_hache(comptes, nbSpam, nbHam, epsilon))
+        if est_filtre_binaire(cheminFichier):
+            with verrou_journal(cheminFichier):
+                modele = charger_filtre_binaire(cheminFichier)
+                journalVide = taille_journal(cheminFichier) == 0
+            if journalVide:
+                return cls.depuis_binaire(modele)
+        return cls(*charger_filtre(cheminFichier))
+
+    def comptes(self):
+        """
+        Retourne une copie des comptes [nbSpam, nbHam] de chaque mot sous forme de dictionnaire (cf. sauvegarder_filtre).
+        """
+        if getattr(self.mots, 'ouvert', False):
+            raise ValueError("Un filtre haché n'a pas de dictionnaire (cf. moduleHachage).")
+        if isinstance(self.mots, dict):
+            return {mot: [self.comptesSpam[i], self.comptesHam[i]] for (mot, i) in self.mots.items()}
+        return {mot: [self.comptesSpam[i], self.comptesHam[i]] for (i, mot) in enumerate(self.mots)}
+
+    @staticmethod
+    def contenu(message, nettoyer=False):
+        """
+        Retourne le contenu d'un message : texte (str), octets (décodés en utf-8) ou chemin de fichier (os.PathLike).
+        """
+        if isinstance(message, os.PathLike):
+            contenu = lire_contenu(message)
+        elif isinstance(message, (bytes, bytearray, memoryview)):
+            contenu = bytes(message).decode('utf-8', errors='ignore')
+        else:
+            contenu = message
+        return nettoyer_message(contenu) if nettoyer else contenu
+
+    def classer(self, message, nettoyer=False):
+        """
+        Classe un message.
+
+        Parameters
+        ----------
+        message : str, bytes ou os.PathLike
+            Le contenu du message (texte ou octets) ou le chemin de son fichier (pathlib.Path par exemple).
+        nettoyer : bool
+            Supprime les en-têtes et les pièces jointes du message (cf. nettoyer_message).
+
+        Returns
+        -------
+        Verdict
+            L'étiquette (SPAM ou HAM), la probabilité que le message soit un spam et les log-probabilités.
+        """
+        (logPspam, logPham) = predire_contenu_compile(self.contenu(message, nettoyer), self.filtreCompile)
+        return Verdict("SPAM" if logPspam > logPham else "HAM", proba_spam(logPspam, logPham), logPspam, logPham)
+
+    def classer_plusieurs(self, messages, executeur=None, nettoyer=False):
+        """
+        Classe plusieurs messages, éventuellement en parallèle.
+
+        Parameters
+        ----------
+        messages : iterable
+            Les messages (cf. classer).
+        executeur : concurrent.futures.Executor
+            L'exécuteur utilisé (un ThreadPoolExecutor par exemple), ou None pour classer dans le thread courant.
+        nettoyer : bool
+            Supprime les en-têtes et les pièces jointes des messages (cf. nettoyer_message).
+
+        Returns
+        -------
+        iterator
+            Le verdict de chaque message, dans l'ordre des messages.
+        """
+        if executeur is None:
+            return (self.classer(message, nettoyer) for message in messages)
+        return executeur.map(lambda message: self.classer(message, nettoyer), messages)
+
+    def apprendre(self, message, isSpam, nettoyer=False):
+        """
+        Retourne un nouveau filtre ayant appris un message (cf. apprendre_plusieurs).
+        """
+        return self.apprendre_plusieurs([(message, isSpam)], nettoyer)
+
+    def apprendre_plusieurs(self, mails, nettoyer=False):
+        """
+        Retourne un nouveau filtre ayant appris des messages ; le filtre courant n'est pas modifié.
+
+        Parameters
+        ----------
+        mails : iterable
+            Les couples (message, isSpam), chaque message étant un texte, des octets ou un chemin (cf. classer).
+        nettoyer : bool
+            Supprime les en-têtes et les pièces jointes des messages (cf. nettoyer_message).
+
+        Returns
+        -------
+        FiltreAntiSpam
+            Le nouveau filtre.
+        """
+        (nbSpam, nbHam) = (self.nbSpam, self.nbHam)
+        if getattr(self.mots, 'ouvert', False):   # Filtre haché
+            import numpy as np
+            from moduleHachage import compiler_filtre_hache
+            comptes = np.stack([self.comptesSpam, self.comptesHam])
+            for (message, isSpam) in mails:
+                alveoles = np.fromiter(self.mots.alveoles(mots_presents(self.contenu(message, nettoyer), self.mots)), dtype=np.int64)
+                comptes[0 if isSpam else 1, alveoles] += 1
+                (nbSpam, nbHam) = (nbSpam + 1, nbHam) if isSpam else (nbSpam, nbHam + 1)
+            return self._depuis_modele(self.mots, _lecture_seule(comptes[0]), _lecture_seule(comptes[1]), nbSpam, nbHam,
+                                       self.epsilon, compiler_filtre_hache(comptes, nbSpam, nbHam, self.epsilon))
+
+        dicoComptes = self.comptes()
+        for (message, isSpam) in mails:
+            for mot in mots_presents(self.contenu(message, nettoyer), dicoComptes):
+                dicoComptes[mot][0 if isSpam else 1] += 1
+            (nbSpam, nbHam) = (nbSpam + 1, nbHam) if isSpam else (nbSpam, nbHam + 1)
+        return FiltreAntiSpam(dicoComptes, nbSpam, nbHam, self.epsilon)
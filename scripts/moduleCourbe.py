@@ -0,0 +1,89 @@
+"""
+Module contenant le calcul de la courbe d'apprentissage du filtre anti-spam :
+taux d'erreurs sur une base de test fixe en fonction du nombre de mails appris.
+
+L'apprentissage est incrémental : à chaque étape, seuls les mails supplémentaires
+sont ajoutés aux comptes accumulés. La base de test n'est lue qu'une fois.
+"""
+
+import time
+from moduleFiltreAntiSpam import (lister_mails, lire_mots_presents_parallele, lissage, compiler_filtre,
+                                  predire_mots_compile, resultat_evaluation)
+
+#: Colonnes du fichier csv de la courbe d'apprentissage
+COLONNES_COURBE = ['taille', 'nbSpam', 'nbHam', 'tauxErreurSpam', 'tauxErreurHam', 'tauxErreur',
+                   'tempsApprentissage', 'tempsTest']
+
+def _lire(fichiersMails, dicoComptes, nbJobs, cache):
+    """
+    Retourne les mots présents dans chaque mail, depuis le cache s'il y en a un.
+    """
+    if cache is not None:
+        return cache.lire_plusieurs(fichiersMails, nbJobs)
+    return lire_mots_presents_parallele(fichiersMails, dicoComptes, nbJobs)
+
+
+def courbe_apprentissage(dicoComptes, dossierSpam, dossierHam, tailles, spamTestFolder, hamTestFolder,
+                         nbSpamsTest, nbHamsTest, epsilon, nbJobs=1, cache=None):
+    """
+    Apprend des préfixes croissants de la base d'apprentissage et évalue le filtre après chaque étape.
+
+    Parameters
+    ----------
+    dicoComptes : dict
+        Les comptes [nbSpam, nbHam] de chaque mot sous forme de dictionnaire (initialement nuls).
+        Modifié à la sortie de la fonction.
+    dossierSpam : str
+        Le chemin du dossier qui contient tous les spams de la base d'apprentissage.
+    dossierHam : str
+        Le chemin du dossier qui contient tous les hams de la base d'apprentissage.
+    tailles : list
+        Les nombres croissants de mails de chaque classe à apprendre (limités au nombre de mails disponibles).
+    spamTestFolder : str
+        Le dossier de la base de test contenant les spams.
+    hamTestFolder : str
+        Le dossier de la base de test contenant les hams.
+    nbSpamsTest : int
+        Le nombre de spams à tester.
+    nbHamsTest : int
+        Le nombre de hams à tester.
+    epsilon : int
+        Paramètre du lissage.
+    nbJobs : int
+        Le nombre de processus utilisés pour lire les mails.
+    cache : CacheTraits
+        Le cache des mots présents dans les mails (cf. moduleCache), ou None.
+
+    Yields
+    ------
+    dict
+        Pour chaque étape : la taille demandée, le nombre de spams et de hams appris, les taux d'erreurs
+        (cf. evaluer_base) et les temps (en secondes) d'apprentissage de l'étape et de test.
+    """
+    fichiersSpam = lister_mails(dossierSpam, max(tailles))
+    fichiersHam = lister_mails(dossierHam, max(tailles))
+    fichiersTest = [('SPAM', fichier) for fichier in lister_mails(spamTestFolder, nbSpamsTest)] + \
+                   [('HAM', fichier) for fichier in lister_mails(hamTestFolder, nbHamsTest)]
+    motsTest = _lire([fichier for (_, fichier) in fichiersTest], dicoComptes, nbJobs, cache)
+
+    (nbSpam, nbHam) = (0, 0)
+    for taille in sorted(tailles):
+        # On n'apprend que les mails supplémentaires
+        debut = time.perf_counter()
+        for (numero, fichiersMails, dejaAppris) in ((0, fichiersSpam, nbSpam), (1, fichiersHam, nbHam)):
+            for mots in _lire(fichiersMails[dejaAppris:taille], dicoComptes, nbJobs, cache):
+                for mot in mots:
+                    dicoComptes[mot][numero] += 1
+        (nbSpam, nbHam) = (min(taille, len(fichiersSpam)), min(taille, len(fichiersHam)))
+        tempsApprentissage = time.perf_counter() - debut
+
+        debut = time.perf_counter()
+        filtreCompile = compiler_filtre(lissage(dicoComptes, nbSpam, nbHam, epsilon),
+                                        nbSpam / (nbSpam + nbHam), nbHam / (nbSpam + nbHam))
+        resultat = resultat_evaluation([(type, fichier) + predire_mots_compile(mots, filtreCompile)
+                                        for ((type, fichier), mots) in zip(fichiersTest, motsTest)])
+        tempsTest = time.perf_counter() - debut
+
+        yield {'taille': taille, 'nbSpam': nbSpam, 'nbHam': nbHam,
+               'tauxErreurSpam': resultat['tauxErreurSpam'], 'tauxErreurHam': resultat['tauxErreurHam'],
+               'tauxErreur': resultat['tauxErreur'], 'tempsApprentissage': tempsApprentissage, 'tempsTest': tempsTest}
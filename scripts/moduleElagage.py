@@ -0,0 +1,190 @@
+"""
+Module contenant l'élagage du vocabulaire du filtre anti-spam (sélection des mots les plus informatifs).
+
+Après le lissage, chaque mot du dictionnaire est noté selon l'un des critères suivants :
+  - information : l'information mutuelle entre la présence du mot et la classe du message ;
+  - logodds : la valeur absolue du logarithme du rapport des cotes P(mot|spam) / P(mot|ham),
+    c'est-à-dire l'écart entre les deltas spam et ham du filtre compilé (cf. compiler_filtre).
+Seuls les K mots les mieux notés, ou ceux dont la note dépasse un seuil, sont conservés :
+le filtre élagué est un filtre ordinaire (comptes des mots conservés), plus petit et plus rapide à charger.
+
+Le compromis taux d'erreurs / taille du modèle (cf. compromis_elagage) est évalué sur une base de test
+lue une seule fois, pour plusieurs nombres de mots conservés.
+"""
+
+from math import log
+import time
+from moduleFiltreAntiSpam import lissage, compiler_filtre, predire_mots_compile, resultat_evaluation, lire_mots_messages
+from moduleFormatBinaire import serialiser_filtre_binaire
+from moduleSources import iterer_messages
+
+#: Critères de notation des mots
+CRITERES = ('information', 'logodds')
+#: Colonnes du fichier csv du compromis taux d'erreurs / taille du modèle
+COLONNES_ELAGAGE = ['nbMots', 'tailleOctets', 'tauxErreurSpam', 'tauxErreurHam', 'tauxErreur', 'tempsTest']
+
+def information_mutuelle(pSpam, pHam, PspamApriori):
+    """
+    Retourne l'information mutuelle (en nats) entre la présence d'un mot et la classe d'un message.
+
+    Parameters
+    ----------
+    pSpam : float
+        La probabilité (lissée) P(mot|spam).
+    pHam : float
+        La probabilité (lissée) P(mot|ham).
+    PspamApriori : float
+        La probabilité a priori qu'un message soit un spam.
+
+    Returns
+    -------
+    float
+        L'information mutuelle, positive ou nulle.
+    """
+    PhamApriori = 1 - PspamApriori
+    pPresent = PspamApriori * pSpam + PhamApriori * pHam
+    pAbsent = 1 - pPresent
+    return (PspamApriori * (pSpam * log(pSpam / pPresent) + (1-pSpam) * log((1-pSpam) / pAbsent))
+            + PhamApriori * (pHam * log(pHam / pPresent) + (1-pHam) * log((1-pHam) / pAbsent)))
+
+
+def log_odds(pSpam, pHam):
+    """
+    Retourne la valeur absolue du logarithme du rapport des cotes d'un mot entre les spams et les hams.
+    """
+    return abs(log(pSpam) - log(1-pSpam) - log(pHam) + log(1-pHam))
+
+
+def scores_mots(dicoProbas, PspamApriori, critere='information'):
+    """
+    Note chaque mot du dictionnaire selon un critère de sélection.
+
+    Parameters
+    ----------
+    dicoProbas : dict
+        Les probabilités (lissées) [P(mot|spam), P(mot|ham)] sous forme de dictionnaire (cf. lissage).
+    PspamApriori : float
+        La probabilité a priori qu'un message soit un spam.
+    critere : str
+        Le critère de notation : 'information' ou 'logodds'.
+
+    Returns
+    -------
+    dict
+        La note de chaque mot.
+    """
+    if critere == 'information':
+        return {mot: information_mutuelle(pSpam, pHam, PspamApriori) for (mot, (pSpam, pHam)) in dicoProbas.items()}
+    elif critere == 'logodds':
+        return {mot: log_odds(pSpam, pHam) for (mot, (pSpam, pHam)) in dicoProbas.items()}
+    raise ValueError("Critère de sélection inconnu : " + str(critere) + " (" + ", ".join(CRITERES) + " attendu).")
+
+
+def classer_mots(scores):
+    """
+    Retourne les mots par note décroissante (les mots de même note sont classés par ordre alphabétique).
+    """
+    return sorted(scores, key=lambda mot: (-scores[mot], mot))
+
+
+def selectionner_mots(scores, nbMots=None, seuil=None):
+    """
+    Sélectionne les mots les plus informatifs.
+
+    Parameters
+    ----------
+    scores : dict
+        La note de chaque mot (cf. scores_mots).
+    nbMots : int
+        Le nombre maximal de mots conservés (None pour ne pas limiter).
+    seuil : float
+        La note minimale des mots conservés (None pour ne pas limiter).
+
+    Returns
+    -------
+    list
+        Les mots conservés, par note décroissante.
+    """
+    mots = classer_mots(scores)
+    if seuil is not None:
+        mots = [mot for mot in mots if scores[mot] >= seuil]
+    return mots[:nbMots]
+
+
+def elaguer(dicoComptes, mots):
+    """
+    Retourne les comptes des seuls mots conservés (dans l'ordre du dictionnaire d'origine).
+
+    Parameters
+    ----------
+    dicoComptes : dict
+        Les comptes [nbSpam, nbHam] de chaque mot sous forme de dictionnaire.
+    mots : iterable
+        Les mots conservés.
+
+    Returns
+    -------
+    dict
+        Les comptes des mots conservés.
+    """
+    conserves = set(mots)
+    return {mot: list(comptes) for (mot, comptes) in dicoComptes.items() if mot in conserves}
+
+
+def compromis_elagage(dicoComptes, nbSpam, nbHam, epsilon, motsClasses, tailles, spamTestFolder, hamTestFolder,
+                      nbSpamsTest, nbHamsTest, nbJobs=1, nettoyer=False):
+    """
+    Évalue le filtre élagué à différents nombres de mots conservés sur une base de test (lue une seule fois).
+
+    Parameters
+    ----------
+    dicoComptes : dict
+        Les comptes [nbSpam, nbHam] de chaque mot du filtre complet.
+    nbSpam : int
+        Le nombre totale de spams que le classifieur a appris.
+    nbHam : int
+        Le nombre totale de hams que le classifieur a appris.
+    epsilon : int
+        Paramètre du lissage.
+    motsClasses : list
+        Les mots par note décroissante (cf. classer_mots).
+    tailles : list
+        Les nombres de mots conservés à évaluer.
+    spamTestFolder : str
+        Le dossier de la base de test contenant les spams.
+    hamTestFolder : str
+        Le dossier de la base de test contenant les hams.
+    nbSpamsTest : int
+        Le nombre de spams à tester.
+    nbHamsTest : int
+        Le nombre de hams à tester.
+    nbJobs : int
+        Le nombre de processus utilisés pour lire les mails.
+    nettoyer : bool
+        Supprime les en-têtes et les pièces jointes des mails avant les tests (cf. nettoyer_message).
+
+    Yields
+    ------
+    dict
+        Pour chaque nombre de mots (par ordre croissant) : le nombre de mots conservés, la taille du filtre
+        au format binaire (en octets), les taux d'erreurs (cf. evaluer_base) et le temps de test (en secondes).
+    """
+    motsTest = []
+    for (type, dossier, nbMails) in (('SPAM', spamTestFolder, nbSpamsTest), ('HAM', hamTestFolder, nbHamsTest)):
+        motsTest += [(type, identifiant, mots) for (identifiant, mots)
+                     in lire_mots_messages(iterer_messages(dossier, nbMails, nettoyer), dicoComptes, nbJobs)]
+
+    for taille in sorted(tailles):
+        dicoElague = elaguer(dicoComptes, motsClasses[:taille])
+        debut = time.perf_counter()
+        filtreCompile = compiler_filtre(lissage(dicoElague, nbSpam, nbHam, epsilon),
+                                        nbSpam / (nbSpam + nbHam), nbHam / (nbSpam + nbHam))
+        indexMots = filtreCompile.indexMots
+        resultat = resultat_evaluation([(type, identifiant) + predire_mots_compile([mot for mot in mots if mot in indexMots],
+                                                                                   filtreCompile)
+                                        for (type, identifiant, mots) in motsTest])
+        tempsTest = time.perf_counter() - debut
+
+        yield {'nbMots': len(dicoElague), 'tailleOctets': len(serialiser_filtre_binaire(dicoElague, nbSpam, nbHam, epsilon)),
+               'tauxErreurSpam': resultat['tauxErreurSpam'], 'tauxErreurHam': resultat['tauxErreurHam'],
+               'tauxErreur': resultat['tauxErreur'], 'tempsTest': tempsTest}
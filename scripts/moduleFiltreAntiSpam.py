@@ -3,13 +3,15 @@ Module contenant toutes les fonctions liées au filtre anti-spam.
 """
 
 from glob import glob
-from math import log, exp
+import codecs
+from math import log, exp, fsum
+from collections import namedtuple, Counter
+from itertools import islice
+from multiprocessing import Pool
 import re
-from copy import deepcopy
-import os
-import sys
 import json
-from os import path
+import moduleMetriques
+from moduleSources import est_source_simple, iterer_messages
 
 # Paramètres par défaut
 #: Le répertoire d'apprentissage par défaut
@@ -23,9 +25,28 @@ EPSILON = 1
 
 # Identifieurs des différents champs pour la sauvegarde du classifieur dans un fichier json
 DICO_PROBA_JSON_NAME = "DICO_PROBA"
+DICO_COMPTES_JSON_NAME = "DICO_COMPTES"
+EPSILON_JSON_NAME    = "EPSILON"
 NB_SPAM_JSON_NAME    = "NB_SPAM"
 NB_HAM_JSON_NAME     = "NB_HAM"
 
+#: Signature des fichiers de filtre hachés (archive .npz, cf. moduleHachage)
+SIGNATURE_FILTRE_HACHE = b"PK\x03\x04"
+
+#: Séparateurs des mots d'un message (ponctuation + espaces)
+SEPARATEURS_MOTS = re.compile(r'\W+')
+
+#: Nombre de messages d'un flux (cf. lire_mots_messages) confiés à chaque processus à la fois
+TAILLE_LOT_MESSAGES = 256
+
+#: Taille (en octets) des blocs lus par predire_fichier_flux
+TAILLE_BLOC_FLUX = 1 << 16
+
+#: Forme compilée du classifieur (cf. compiler_filtre)
+FiltreCompile = namedtuple('FiltreCompile', ['logBaseSpam', 'logBaseHam', 'indexMots', 'deltaSpam', 'deltaHam'])
+#: Résultat d'une prédiction en flux (cf. predire_fichier_flux)
+PredictionFlux = namedtuple('PredictionFlux', ['logPspam', 'logPham', 'arretAnticipe', 'raison', 'octetsLus'])
+
 def charger_dictionnaire(dicoFilePath, minNbOfChar=DEFAULT_MIN_CHAR_DICT) :
     """
     Charge un dictionnaire de mots depuis un fichier texte.
@@ -45,7 +66,7 @@ def charger_dictionnaire(dicoFilePath, minNbOfChar=DEFAULT_MIN_CHAR_DICT) :
     """
     dico = {}
 
-    with open(dicoFilePath, 'r') as file :
+    with moduleMetriques.etape('dictionnaire'), open(dicoFilePath, 'r') as file :
         for word in file :
             word = ''.join(word.split())    # Enlève les éventuels whitespace
             if len(word) >= minNbOfChar:    # Si le mot est au moins de longueur minimale
@@ -54,9 +75,84 @@ def charger_dictionnaire(dicoFilePath, minNbOfChar=DEFAULT_MIN_CHAR_DICT) :
     return dico
 
 
+def lire_contenu(cheminMessage) :
+    """
+    Lit le contenu d'un message.
+    
+    Parameters
+    ----------
+    cheminMessage : str
+        Le chemin du fichier texte contenant le message/mail à lire.
+    
+    Returns
+    -------
+    str
+        Le contenu du message.
+    """
+    with moduleMetriques.etape('lecture'), open(cheminMessage, 'r', encoding='utf-8', errors='ignore') as file:
+        contenu = file.read()
+    if moduleMetriques.ACTIF :
+        moduleMetriques.incrementer('fichiers_lus')
+        moduleMetriques.incrementer('octets_lus', len(contenu.encode('utf-8', errors='ignore')))
+    return contenu
+
+
+def mots_presents(contenu, vocabulaire) :
+    """
+    Retourne l'ensemble des mots du vocabulaire présents dans le contenu d'un message.
+    Le vocabulaire n'est jamais copié : chaque mot distinct du message n'est capitalisé
+    qu'une fois puis recherché dans le vocabulaire.
+    
+    Parameters
+    ----------
+    contenu : str
+        Le contenu du message.
+    vocabulaire : dict, set ou conteneur
+        Les mots capitalisés recherchés (par exemple le dictionnaire du classifieur).
+    
+    Returns
+    -------
+    set
+        Les mots (capitalisés) du vocabulaire présents dans le message.
+    """
+    with moduleMetriques.etape('tokenisation') :
+        tokens = SEPARATEURS_MOTS.split(contenu)
+        mots = {mot.upper() for mot in set(tokens)}
+        if isinstance(vocabulaire, dict) :
+            presents = mots & vocabulaire.keys()
+        elif isinstance(vocabulaire, (set, frozenset)) :
+            presents = mots & vocabulaire
+        else :
+            presents = {mot for mot in mots if mot in vocabulaire}
+    if moduleMetriques.ACTIF :
+        moduleMetriques.incrementer('mots', len(tokens))
+        moduleMetriques.incrementer('mots_dictionnaire', len(presents))
+    return presents
+
+
+def lire_mots_presents(messageFilePath, vocabulaire) :
+    """
+    Lit un message et retourne l'ensemble des mots du vocabulaire qui y sont présents (cf. mots_presents).
+    
+    Parameters
+    ----------
+    messageFilePath : str
+        Le chemin du fichier texte contenant le message/mail à lire.
+    vocabulaire : dict, set ou conteneur
+        Les mots capitalisés recherchés.
+    
+    Returns
+    -------
+    set
+        Les mots (capitalisés) du vocabulaire présents dans le message.
+    """
+    return mots_presents(lire_contenu(messageFilePath), vocabulaire)
+
+
 def lire_message(messageFilePath, dico) :
     """
     Lit un message et le traduit en une représentation sous forme de vecteur binaire x à partir d’un dictionnaire.
+    Il est préférable d'utiliser lire_mots_presents, qui ne parcourt pas tout le dictionnaire.
     
     Parameters
     ----------
@@ -70,83 +166,87 @@ def lire_message(messageFilePath, dico) :
     dict
         Un dictionnaire représentant le vecteur binaire (mot -> booléen).
     """
-    dicoPresence = deepcopy(dico)   # Copie le dictionnaire afin de ne pas modifier l'original
+    presents = lire_mots_presents(messageFilePath, dico)
+    return {mot: mot in presents for mot in dico}
+
 
-    for mot in dicoPresence : dicoPresence[mot] = False  # On met faux à la place des [0,0]
+def lister_mails(dossier, nbMails) :
+    """
+    Liste les mails (fichiers .txt) d'un dossier.
+    
+    Parameters
+    ----------
+    dossier : str
+        Le chemin du dossier contenant les mails.
+    nbMails : int
+        Le nombre maximal de mails à lister.
     
-    with open(messageFilePath, 'r', encoding='utf-8', errors='ignore') as file:
-        content = file.read()
-        messageWords = re.split('\W+', content) # Séparation des mots par la ponctuation + espaces
-        # On parcourt les mots présents dans le mail
-        for word in messageWords :
-            if word.upper() in dicoPresence :
-                dicoPresence[word.upper()] = True # Si le mot capitalisé est dans le dictionnaire et dans le message
-                
-    return dicoPresence
+    Returns
+    -------
+    list
+        Les chemins des nbMails premiers mails du dossier.
+    """
+    return glob(dossier + '/*.txt')[:nbMails]
 
 
-def apprendre_ham(dicoProbas, nbHam, message) :
+def apprendre_ham(dicoComptes, message) :
     """
     Met à jour le classifieur en apprenant le ham.
     
     Parameters
     ----------
-    dicoProbas : dict
-        Les probabilités sous forme de dictionnaire.
+    dicoComptes : dict
+        Les comptes [nbSpam, nbHam] de chaque mot sous forme de dictionnaire.
         Modifié à la sortie de la fonction.
         Fait partie des attributs du classifieur.
-    nbHam : int
-        Le nombre totale de hams que le classifieur va apprendre.
-        Fait partie des attributs du classifieur.
     message : str
         Le ham appris par le classifieur.
     """
-    vecteurPresence = lire_message(message, dicoProbas)
-    
-    for mot in (present for present in vecteurPresence if vecteurPresence[present] == True) :
-        #Pour chaque mot présent, on augmente la probabilité de ham
-        ancienneValeur = dicoProbas[mot][1]
-        ancienneValeur *= nbHam
-        ancienneValeur += 1
-        ancienneValeur /= nbHam
-        dicoProbas[mot][1] = ancienneValeur
+    presents = lire_mots_presents(message, dicoComptes)
+    with moduleMetriques.etape('mise_a_jour') :
+        for mot in presents :
+            #Pour chaque mot présent, on incrémente le nombre de hams le contenant
+            dicoComptes[mot][1] += 1
+    if moduleMetriques.ACTIF :
+        moduleMetriques.incrementer('mails_appris')
+        moduleMetriques.incrementer('mises_a_jour', len(presents))
 
         
-def apprendre_spam(dicoProbas, nbSpam, message) :
+def apprendre_spam(dicoComptes, message) :
     """
     Met à jour le classifieur en apprenant le spam.
     
     Parameters
     ----------
-    dicoProbas : dict
-        Les probabilités sous forme de dictionnaire.
+    dicoComptes : dict
+        Les comptes [nbSpam, nbHam] de chaque mot sous forme de dictionnaire.
         Modifié à la sortie de la fonction.
         Fait partie des attributs du classifieur.
-    nbSpam : int
-        Le nombre totale de spams que le classifieur va apprendre.
-        Fait partie des attributs du classifieur.
     message : str
         Le spam appris par le classifieur.
     """  
-    vecteurPresence = lire_message(message, dicoProbas)
-
-    for mot in (present for present in vecteurPresence if vecteurPresence[present] == True) :
-        #Pour chaque mot présent, on augmente la probabilité de spam
-        ancienneValeur = dicoProbas[mot][0]
-        ancienneValeur *= nbSpam
-        ancienneValeur += 1
-        ancienneValeur /= nbSpam
-        dicoProbas[mot][0] = ancienneValeur
+    presents = lire_mots_presents(message, dicoComptes)
+    with moduleMetriques.etape('mise_a_jour') :
+        for mot in presents :
+            #Pour chaque mot présent, on incrémente le nombre de spams le contenant
+            dicoComptes[mot][0] += 1
+    if moduleMetriques.ACTIF :
+        moduleMetriques.incrementer('mails_appris')
+        moduleMetriques.incrementer('mises_a_jour', len(presents))
 
         
-def apprendre_base(dicoProbas, dossierSpam, dossierHam, nbSpam, nbHam) :
+def apprendre_base(dicoComptes, dossierSpam, dossierHam, nbSpam, nbHam, nbJobs=1, cache=None, nettoyer=False) :
     """
     Met à jour le classifieur en apprenant l'ensemble des spams et des hams de la base.
+    Avec plusieurs processus, chacun compte les mots d'une partie des mails
+    et les comptes partiels sont ensuite additionnés : le résultat est identique.
+    Les dossiers contenant des archives (mbox, .gz, .tar.gz) ou des Maildir sont lus en flux
+    (cf. moduleSources) ; le cache n'est alors pas utilisé.
     
     Parameters
     ----------
-    dicoProbas : dict
-        Les probabilités sous forme de dictionnaire.
+    dicoComptes : dict
+        Les comptes [nbSpam, nbHam] de chaque mot sous forme de dictionnaire.
         Modifié à la sortie de la fonction.
         Fait partie des attributs du classifieur.
     dossierSpam : str
@@ -154,37 +254,204 @@ def apprendre_base(dicoProbas, dossierSpam, dossierHam, nbSpam, nbHam) :
     dossierHam : str
         Le chemin du dossier qui contient tous les hams de la base d'apprentissage.
     nbHam : int
-        Le nombre totale de spams que le classifieur va apprendre.
+        Le nombre totale de spams que le classifieur va apprendre (None pour tous).
         Fait partie des attributs du classifieur.
     nbSpam : int
-        Le nombre totale de spams que le classifieur va apprendre.
+        Le nombre totale de spams que le classifieur va apprendre (None pour tous).
         Fait partie des attributs du classifieur.
+    nbJobs : int
+        Le nombre de processus utilisés pour l'apprentissage.
+    cache : CacheTraits
+        Le cache des mots présents dans les mails (cf. moduleCache), ou None.
+    nettoyer : bool
+        Supprime les en-têtes et les pièces jointes des mails avant l'apprentissage (cf. nettoyer_message).
+    
+    Returns
+    -------
+    tuple
+        Les nombres de spams et de hams réellement appris (nbSpam, nbHam) : au plus ceux demandés,
+        les messages des archives étant comptés pendant leur lecture.
     """
-    spams = 0
-    hams = 0
+    if nettoyer or not (est_source_simple(dossierSpam) and est_source_simple(dossierHam)) :
+        nbAppris = [0, 0]
+        for (numero, dossier, nbMails) in ((0, dossierSpam, nbSpam), (1, dossierHam, nbHam)) :
+            for (_, mots) in lire_mots_messages(iterer_messages(dossier, nbMails, nettoyer), dicoComptes, nbJobs) :
+                for mot in mots :
+                    dicoComptes[mot][numero] += 1
+                nbAppris[numero] += 1
+        return tuple(nbAppris)
+
+    fichiersSpam = lister_mails(dossierSpam, nbSpam)
+    fichiersHam = lister_mails(dossierHam, nbHam)
+    if cache is not None :
+        for (numero, fichiersMails) in ((0, fichiersSpam), (1, fichiersHam)) :
+            for mots in cache.lire_plusieurs(fichiersMails, nbJobs) :
+                for mot in mots :
+                    dicoComptes[mot][numero] += 1
+        return (len(fichiersSpam), len(fichiersHam))
+
+    if nbJobs > 1 :
+        (comptesSpam, comptesHam) = compter_mails_parallele([fichiersSpam, fichiersHam], dicoComptes, nbJobs)
+        for mot in comptesSpam :
+            dicoComptes[mot][0] += comptesSpam[mot]
+        for mot in comptesHam :
+            dicoComptes[mot][1] += comptesHam[mot]
+        return (len(fichiersSpam), len(fichiersHam))
 
     #On apprend nbSpam spams
-    for m in glob(dossierSpam + '/*.txt') :
-        apprendre_spam(dicoProbas, nbSpam, m)
-        spams+=1
-        if spams >= nbSpam : break
+    for m in fichiersSpam :
+        apprendre_spam(dicoComptes, m)
         
     #On apprend nbHam hams
-    for m in glob(dossierHam + '/*.txt') :
-        apprendre_ham(dicoProbas, nbHam, m)
-        hams+=1
-        if hams >= nbHam : break
+    for m in fichiersHam :
+        apprendre_ham(dicoComptes, m)
+    return (len(fichiersSpam), len(fichiersHam))
 
         
-def lissage(dicoProbas, nbSpam, nbHam, epsilon) :
+#: Vocabulaire des processus de compter_mails_parallele
+_vocabulaireTravailleur = None
+
+def _figer_vocabulaire(vocabulaire) :
+    """
+    Fige le vocabulaire transmis aux processus ; un vocabulaire ouvert (cf. moduleHachage) est transmis tel quel.
+    """
+    if getattr(vocabulaire, 'ouvert', False) :
+        return vocabulaire
+    return frozenset(vocabulaire)
+
+
+def _initialiser_travailleur(vocabulaire) :
+    """
+    Initialise un processus de compter_mails_parallele avec le vocabulaire.
+    """
+    global _vocabulaireTravailleur
+    _vocabulaireTravailleur = vocabulaire
+
+
+def _compter_mails(tache) :
+    """
+    Compte, pour chaque mot, le nombre de mails d'une partie de la base le contenant.
+    """
+    (numeroListe, fichiersMails) = tache
+    comptes = Counter()
+    for fichierMail in fichiersMails :
+        comptes.update(lire_mots_presents(fichierMail, _vocabulaireTravailleur))
+    return (numeroListe, comptes)
+
+
+def _lire_mots_presents_travailleur(fichierMail) :
+    """
+    Lit les mots présents dans un mail (cf. lire_mots_presents_parallele).
+    """
+    return lire_mots_presents(fichierMail, _vocabulaireTravailleur)
+
+
+def lire_mots_presents_parallele(fichiersMails, vocabulaire, nbJobs) :
     """
-    Réalise le lissage des probas afin d'éviter les probas nulles.
+    Lit les mots présents dans chaque mail (cf. lire_mots_presents), éventuellement avec plusieurs processus.
     
     Parameters
     ----------
-    dicoProbas : dict
-        Les probabilités sous forme de dictionnaire.
-        Modifié à la sortie de la fonction.
+    fichiersMails : list
+        Les chemins des mails.
+    vocabulaire : iterable
+        Les mots (capitalisés) recherchés.
+    nbJobs : int
+        Le nombre de processus.
+    
+    Returns
+    -------
+    list
+        Pour chaque mail (dans l'ordre), l'ensemble des mots du vocabulaire qui y sont présents.
+    """
+    vocabulaire = _figer_vocabulaire(vocabulaire)
+    if nbJobs <= 1 or len(fichiersMails) <= 1 :
+        return [lire_mots_presents(fichierMail, vocabulaire) for fichierMail in fichiersMails]
+    with Pool(nbJobs, initializer=_initialiser_travailleur, initargs=(vocabulaire,)) as pool :
+        return pool.map(_lire_mots_presents_travailleur, fichiersMails, chunksize=max(1, len(fichiersMails) // (4 * nbJobs)))
+
+
+def _mots_message_travailleur(message) :
+    """
+    Retourne les mots présents dans un message (cf. lire_mots_messages).
+    """
+    (identifiant, contenu) = message
+    return (identifiant, mots_presents(contenu, _vocabulaireTravailleur))
+
+
+def lire_mots_messages(messages, vocabulaire, nbJobs) :
+    """
+    Retourne au fur et à mesure les mots présents dans chaque message d'un flux (cf. moduleSources),
+    éventuellement avec plusieurs processus. Les messages sont traités par lots afin de borner la mémoire.
+    
+    Parameters
+    ----------
+    messages : iterable
+        Les messages sous la forme de couples (identifiant, contenu).
+    vocabulaire : iterable
+        Les mots (capitalisés) recherchés.
+    nbJobs : int
+        Le nombre de processus.
+    
+    Yields
+    ------
+    tuple
+        Pour chaque message (dans l'ordre), le couple (identifiant, ensemble des mots du vocabulaire présents).
+    """
+    vocabulaire = _figer_vocabulaire(vocabulaire)
+    if nbJobs <= 1 :
+        for (identifiant, contenu) in messages :
+            yield (identifiant, mots_presents(contenu, vocabulaire))
+        return
+    messages = iter(messages)
+    with Pool(nbJobs, initializer=_initialiser_travailleur, initargs=(vocabulaire,)) as pool :
+        while True :
+            lot = list(islice(messages, TAILLE_LOT_MESSAGES * nbJobs))
+            if not lot :
+                break
+            yield from pool.map(_mots_message_travailleur, lot, chunksize=TAILLE_LOT_MESSAGES // 4)
+
+
+def compter_mails_parallele(listesFichiers, vocabulaire, nbJobs) :
+    """
+    Compte, pour chaque liste de mails et chaque mot, le nombre de mails le contenant
+    en répartissant les mails entre plusieurs processus.
+    
+    Parameters
+    ----------
+    listesFichiers : list
+        Les listes de chemins de mails (par exemple [spams, hams]).
+    vocabulaire : iterable
+        Les mots (capitalisés) à compter.
+    nbJobs : int
+        Le nombre de processus.
+    
+    Returns
+    -------
+    list
+        Pour chaque liste de mails, un Counter (mot -> nombre de mails le contenant).
+    """
+    taches = []
+    for (numeroListe, fichiersMails) in enumerate(listesFichiers) :
+        taille = max(1, len(fichiersMails) // (4 * nbJobs))   # Plusieurs tâches par processus pour équilibrer la charge
+        for debut in range(0, len(fichiersMails), taille) :
+            taches.append((numeroListe, fichiersMails[debut:debut + taille]))
+
+    comptes = [Counter() for _ in listesFichiers]
+    with Pool(nbJobs, initializer=_initialiser_travailleur, initargs=(_figer_vocabulaire(vocabulaire),)) as pool :
+        for (numeroListe, comptesPartiels) in pool.imap_unordered(_compter_mails, taches) :
+            comptes[numeroListe].update(comptesPartiels)
+    return comptes
+
+
+def lissage(dicoComptes, nbSpam, nbHam, epsilon) :
+    """
+    Calcule les probas lissées à partir des comptes afin d'éviter les probas nulles.
+    
+    Parameters
+    ----------
+    dicoComptes : dict
+        Les comptes [nbSpam, nbHam] de chaque mot sous forme de dictionnaire.
         Fait partie des attributs du classifieur.
     nbSpam : int
         Le nombre totale de spams que le classifieur a appris.
@@ -194,19 +461,20 @@ def lissage(dicoProbas, nbSpam, nbHam, epsilon) :
         Fait partie des attributs du classifieur.    
     epsilon : int
         Paramètre du lissage.
-    """
-    for mot in dicoProbas :
-        #On ajoute epsilon dans la probabilité spam
-        ancienneValeurSpam = dicoProbas[mot][0]
-        ancienneValeurSpam *= nbSpam
-        ancienneValeurSpam = (ancienneValeurSpam + epsilon) / (nbSpam + 2*epsilon)
-        dicoProbas[mot][0] = ancienneValeurSpam
 
-        #On ajoute epsilon dans la probabilité ham
-        ancienneValeurHam = dicoProbas[mot][1]
-        ancienneValeurHam *= nbHam
-        ancienneValeurHam = (ancienneValeurHam + epsilon) / (nbHam + 2*epsilon)
-        dicoProbas[mot][1] = ancienneValeurHam
+    Returns
+    -------
+    dict
+        Les probabilités [P(mot|spam), P(mot|ham)] sous forme de dictionnaire.
+    """
+    dicoProbas = {}
+    with moduleMetriques.etape('lissage') :
+        for mot in dicoComptes :
+            (comptesSpam, comptesHam) = dicoComptes[mot]
+            #On ajoute epsilon dans les probabilités spam et ham
+            dicoProbas[mot] = [(comptesSpam + epsilon) / (nbSpam + 2*epsilon),
+                               (comptesHam + epsilon) / (nbHam + 2*epsilon)]
+    return dicoProbas
 
         
 def predire_message(cheminMessage, nbSpam, nbHam, dicoProbas, PspamApriori, PhamApriori) :
@@ -233,26 +501,453 @@ def predire_message(cheminMessage, nbSpam, nbHam, dicoProbas, PspamApriori, Pham
     tuple
         Un tuple de la forme (probabilité spam, probabilité ham).
     """ 
-    vecteurPresence = lire_message(cheminMessage, dicoProbas)
+    presents = lire_mots_presents(cheminMessage, dicoProbas)
 
     logPspam = 0
     logPham = 0
     
-    #On définit la somme des log des probas des mots
-    for j in dicoProbas :
-        if vecteurPresence[j] == True :
-            logPspam += log(dicoProbas[j][0])
-            logPham += log(dicoProbas[j][1])
-        else :
-            logPspam += log((1-dicoProbas[j][0]))
-            logPham += log((1-dicoProbas[j][1]))
+    if moduleMetriques.ACTIF :
+        moduleMetriques.incrementer('messages_predits')
+    with moduleMetriques.etape('prediction') :
+        #On définit la somme des log des probas des mots
+        for j in dicoProbas :
+            if j in presents :
+                logPspam += log(dicoProbas[j][0])
+                logPham += log(dicoProbas[j][1])
+            else :
+                logPspam += log((1-dicoProbas[j][0]))
+                logPham += log((1-dicoProbas[j][1]))
 
     return (logPspam + log(PspamApriori), logPham + log(PhamApriori))
 
 
+def compiler_filtre(dicoProbas, PspamApriori, PhamApriori) :
+    """
+    Compile le classifieur afin que la prédiction d'un message ne parcourt que les mots qui y sont présents.
+    
+    On précalcule pour chaque classe la log-vraisemblance d'un message ne contenant
+    aucun mot du dictionnaire (a priori compris), puis pour chaque mot le delta
+    log(p) - log(1-p) à y ajouter lorsque le mot est présent.
+    
+    Parameters
+    ----------
+    dicoProbas : dict
+        Les probabilités (lissées) sous forme de dictionnaire.
+        Fait partie des attributs du classifieur.
+    PspamApriori : float
+        La probabilité a priori qu'un message soit un spam.
+    PhamApriori : float
+        La probabilité a priori qu'un message soit un ham.
+    
+    Returns
+    -------
+    FiltreCompile
+        Le classifieur compilé.
+    """
+    indexMots = {}
+    deltaSpam = []
+    deltaHam = []
+    logAbsentsSpam = [log(PspamApriori)]
+    logAbsentsHam = [log(PhamApriori)]
+
+    with moduleMetriques.etape('compilation') :
+        for mot in dicoProbas :
+            (pSpam, pHam) = dicoProbas[mot]
+            indexMots[mot] = len(deltaSpam)
+            logAbsentsSpam.append(log(1-pSpam))
+            logAbsentsHam.append(log(1-pHam))
+            deltaSpam.append(log(pSpam) - log(1-pSpam))
+            deltaHam.append(log(pHam) - log(1-pHam))
+
+    return FiltreCompile(fsum(logAbsentsSpam), fsum(logAbsentsHam), indexMots, tuple(deltaSpam), tuple(deltaHam))
+
+
+def predire_contenu_compile(contenu, filtreCompile) :
+    """
+    Prédit la nature d'un message (spam/ham) à partir de son contenu et du classifieur compilé.
+    Le coût est proportionnel à la taille du message et non à celle du dictionnaire.
+    
+    Parameters
+    ----------
+    contenu : str
+        Le contenu du message à analyser.
+    filtreCompile : FiltreCompile
+        Le classifieur compilé (cf. compiler_filtre).
+    
+    Returns
+    -------
+    tuple
+        Un tuple de la forme (log-probabilité spam, log-probabilité ham).
+    """
+    indexMots = filtreCompile.indexMots
+    if isinstance(indexMots, dict) :
+        return predire_mots_compile(mots_presents(contenu, indexMots), filtreCompile)
+    # Index sans dictionnaire (table des mots d'un filtre binaire, hachage) : chaque mot n'y est recherché qu'une fois
+    with moduleMetriques.etape('tokenisation') :
+        tokens = SEPARATEURS_MOTS.split(contenu)
+        indices = set(map(indexMots.get, {mot.upper() for mot in set(tokens)}))
+        indices.discard(None)
+    if moduleMetriques.ACTIF :
+        moduleMetriques.incrementer('mots', len(tokens))
+        moduleMetriques.incrementer('mots_dictionnaire', len(indices))
+    return predire_indices_compile(indices, filtreCompile)
+
+
+def predire_mots_compile(mots, filtreCompile) :
+    """
+    Prédit la nature d'un message (spam/ham) à partir des mots du dictionnaire qui y sont présents et du classifieur compilé.
+    
+    Parameters
+    ----------
+    mots : set
+        Les mots (capitalisés) du dictionnaire présents dans le message.
+    filtreCompile : FiltreCompile
+        Le classifieur compilé (cf. compiler_filtre).
+    
+    Returns
+    -------
+    tuple
+        Un tuple de la forme (log-probabilité spam, log-probabilité ham).
+    """
+    indexMots = filtreCompile.indexMots
+    return predire_indices_compile({indexMots[mot] for mot in mots}, filtreCompile)
+
+
+def predire_indices_compile(indices, filtreCompile) :
+    """
+    Prédit la nature d'un message (spam/ham) à partir des indices (dans le classifieur compilé)
+    des mots du dictionnaire qui y sont présents.
+    
+    Parameters
+    ----------
+    indices : set
+        Les indices distincts des mots présents (plusieurs mots peuvent partager un indice, cf. moduleHachage).
+    filtreCompile : FiltreCompile
+        Le classifieur compilé (cf. compiler_filtre).
+    
+    Returns
+    -------
+    tuple
+        Un tuple de la forme (log-probabilité spam, log-probabilité ham).
+    """
+    if moduleMetriques.ACTIF :
+        moduleMetriques.incrementer('messages_predits')
+    with moduleMetriques.etape('prediction') :
+        deltaSpam = filtreCompile.deltaSpam
+        deltaHam = filtreCompile.deltaHam
+
+        return (filtreCompile.logBaseSpam + fsum(deltaSpam[i] for i in indices),
+                filtreCompile.logBaseHam + fsum(deltaHam[i] for i in indices))
+
+
+def predire_message_compile(cheminMessage, filtreCompile) :
+    """
+    Prédit la nature du message (spam/ham) à l'aide du classifieur compilé
+    et retourne la probabilité qu'il s'agisse d'un spam et celle qu'il s'agisse d'un ham.
+    
+    Parameters
+    ----------
+    cheminMessage : str
+        Le chemin du message à analyser.
+    filtreCompile : FiltreCompile
+        Le classifieur compilé (cf. compiler_filtre).
+    
+    Returns
+    -------
+    tuple
+        Un tuple de la forme (log-probabilité spam, log-probabilité ham).
+    """
+    return predire_contenu_compile(lire_contenu(cheminMessage), filtreCompile)
+
+
+def bornes_filtre(filtreCompile) :
+    """
+    Calcule, pour un classifieur compilé, les variations extrêmes de l'écart log P(spam) - log P(ham)
+    que peuvent provoquer les mots d'un message (cf. predire_fichier_flux).
+    Ne dépend que du filtre : à calculer une fois pour tous les messages.
+    
+    Returns
+    -------
+    tuple
+        (hausse maximale, baisse maximale) : sommes des écarts deltaSpam - deltaHam positifs et négatifs.
+    """
+    ecarts = [dSpam - dHam for (dSpam, dHam) in zip(filtreCompile.deltaSpam, filtreCompile.deltaHam)]
+    return (fsum(ecart for ecart in ecarts if ecart > 0), fsum(ecart for ecart in ecarts if ecart < 0))
+
+
+def predire_fichier_flux(cheminMessage, filtreCompile, bornes=None, budgetOctets=None, arretAnticipe=True,
+                         tailleBloc=TAILLE_BLOC_FLUX) :
+    """
+    Prédit la nature d'un message (spam/ham) en le lisant par blocs, sans le charger entièrement en mémoire.
+    Le dernier mot (éventuellement incomplet) de chaque bloc est reporté sur le bloc suivant.
+    
+    Après chaque bloc, si les mots du dictionnaire non encore rencontrés ne peuvent plus inverser le verdict
+    (cf. bornes_filtre), la lecture s'arrête ; elle s'arrête également une fois le budget d'octets lu.
+    Lu jusqu'au bout, le message obtient exactement les log-probabilités de predire_message_compile ;
+    après un arrêt anticipé, ce sont celles des mots lus (le verdict est alors certain si raison vaut 'borne').
+    
+    Parameters
+    ----------
+    cheminMessage : str
+        Le chemin du message à analyser.
+    filtreCompile : FiltreCompile
+        Le classifieur compilé (cf. compiler_filtre).
+    bornes : tuple
+        Les bornes du filtre (cf. bornes_filtre), calculées si None.
+    budgetOctets : int
+        Le nombre maximal d'octets lus (None pour ne pas limiter).
+    arretAnticipe : bool
+        Arrête la lecture dès que le verdict est certain.
+    tailleBloc : int
+        La taille (en octets) des blocs lus.
+    
+    Returns
+    -------
+    PredictionFlux
+        Les log-probabilités spam et ham, si la lecture s'est arrêtée avant la fin du message,
+        la raison de l'arrêt ('borne', 'budget' ou None) et le nombre d'octets lus.
+    """
+    if bornes is None :
+        bornes = bornes_filtre(filtreCompile)
+    (hausseMax, baisseMax) = bornes
+    (indexMots, deltaSpam, deltaHam) = (filtreCompile.indexMots, filtreCompile.deltaSpam, filtreCompile.deltaHam)
+    decodeur = codecs.getincrementaldecoder('utf-8')(errors='ignore')
+    indices = set()
+    hausses = []    # Écarts des mots rencontrés qui ont réduit la hausse possible
+    baisses = []    # et la baisse possible
+    reste = ''
+    octetsLus = 0
+    raison = None
+
+    def ajouter(tokens) :
+        for mot in {token.upper() for token in tokens} :
+            i = indexMots.get(mot)
+            if i is not None :
+                if i not in indices :
+                    indices.add(i)
+                    ecart = deltaSpam[i] - deltaHam[i]
+                    if ecart > 0 :
+                        hausses.append(ecart)
+                    elif ecart < 0 :
+                        baisses.append(ecart)
+
+    def scores() :
+        return (filtreCompile.logBaseSpam + fsum(deltaSpam[i] for i in indices),
+                filtreCompile.logBaseHam + fsum(deltaHam[i] for i in indices))
+
+    if moduleMetriques.ACTIF :
+        moduleMetriques.incrementer('messages_predits')
+    with moduleMetriques.etape('prediction'), open(cheminMessage, 'rb') as f :
+        while True :
+            taille = tailleBloc if budgetOctets is None else min(tailleBloc, budgetOctets - octetsLus)
+            bloc = f.read(taille) if taille > 0 else b''
+            if not bloc :
+                if taille <= 0 and f.read(1) :  # Budget épuisé avant la fin du message
+                    raison = 'budget'
+                break
+            octetsLus += len(bloc)
+            tokens = SEPARATEURS_MOTS.split(reste + decodeur.decode(bloc))
+            reste = tokens.pop()
+            ajouter(tokens)
+            if arretAnticipe :
+                (logPspam, logPham) = scores()
+                ecart = logPspam - logPham
+                hausse = fsum([hausseMax] + [-e for e in hausses])
+                baisse = fsum([baisseMax] + [-e for e in baisses])
+                tolerance = 1e-9 * (abs(ecart) + hausse - baisse + 1)   # Erreurs d'arrondi des sommes
+                if ecart + baisse > tolerance or ecart + hausse < -tolerance :
+                    raison = 'borne'
+                    break
+        if raison is None :
+            ajouter(SEPARATEURS_MOTS.split(reste + decodeur.decode(b'', final=True)))
+    if moduleMetriques.ACTIF :
+        moduleMetriques.incrementer('fichiers_lus')
+        moduleMetriques.incrementer('octets_lus', octetsLus)
+
+    return PredictionFlux(*scores(), raison is not None, raison, octetsLus)
+
+
+def proba_spam(logPspam, logPham) :
+    """
+    Calcule la probabilité a posteriori P(SPAM) à partir des log-probabilités spam et ham
+    (sans dépassement de capacité lorsque leur écart est grand).
+    
+    Parameters
+    ----------
+    logPspam : float
+        La log-probabilité spam (cf. predire_message).
+    logPham : float
+        La log-probabilité ham (cf. predire_message).
+    
+    Returns
+    -------
+    float
+        La probabilité que le message soit un spam.
+    """
+    ecart = logPham - logPspam
+    if ecart > 0 :
+        e = exp(-ecart)
+        return e / (1. + e)
+    return 1. / (1. + exp(ecart))
+
+
+#: Filtre compilé des processus de evaluer_base
+_filtreTravailleur = None
+
+def _initialiser_evaluation(filtreCompile) :
+    """
+    Initialise un processus de evaluer_base avec le filtre compilé.
+    """
+    global _filtreTravailleur
+    _filtreTravailleur = filtreCompile
+
+
+def _predire_mails(tache) :
+    """
+    Prédit une partie des mails de la base de test.
+    """
+    (type, fichiersMails) = tache
+    return [(type, fichierMail) + predire_message_compile(fichierMail, _filtreTravailleur) for fichierMail in fichiersMails]
+
+
+def evaluer_base(filtreCompile, spamFolder, hamFolder, nbSpamsTest, nbHamsTest, nbJobs=1, cache=None, nettoyer=False) :
+    """
+    Évalue le filtre sur une base de test, éventuellement en répartissant les mails entre plusieurs processus.
+    Un message est identifié comme spam si sa log-probabilité spam est supérieure ou égale à celle ham.
+    Les dossiers contenant des archives (mbox, .gz, .tar.gz) ou des Maildir sont lus en flux
+    (cf. moduleSources) ; le cache n'est alors pas utilisé.
+    
+    Parameters
+    ----------
+    filtreCompile : FiltreCompile
+        Le classifieur compilé (cf. compiler_filtre).
+    spamFolder : str
+        Le dossier de la base de test contenant les spams.
+    hamFolder : str
+        Le dossier de la base de test contenant les hams.
+    nbSpamsTest : int
+        Le nombre de spams à tester dans le dossier précisé.
+    nbHamsTest : int
+        Le nombre de hams à tester dans le dossier précisé.
+    nbJobs : int
+        Le nombre de processus utilisés pour l'évaluation.
+    cache : CacheTraits
+        Le cache des mots présents dans les mails (cf. moduleCache), ou None.
+    nettoyer : bool
+        Supprime les en-têtes et les pièces jointes des mails avant la prédiction (cf. nettoyer_message).
+    
+    Returns
+    -------
+    dict
+        Le résultat de l'évaluation :
+        'confusion' : la matrice de confusion (type réel -> type prédit -> nombre de messages),
+        'nbSpams', 'nbHams' : le nombre de spams et de hams testés,
+        'tauxErreurSpam', 'tauxErreurHam', 'tauxErreur' : les taux d'erreurs (None si aucun message),
+        'messages' : pour chaque message, un dictionnaire (chemin, type, etiquette, pSpam).
+    """
+    if nettoyer or not (est_source_simple(spamFolder) and est_source_simple(hamFolder)) :
+        predictions = []
+        for (type, dossier, nbMails) in (('SPAM', spamFolder, nbSpamsTest), ('HAM', hamFolder, nbHamsTest)) :
+            for (identifiant, mots) in lire_mots_messages(iterer_messages(dossier, nbMails, nettoyer), filtreCompile.indexMots, nbJobs) :
+                predictions.append((type, identifiant) + predire_mots_compile(mots, filtreCompile))
+        return resultat_evaluation(predictions)
+
+    listes = [('SPAM', lister_mails(spamFolder, nbSpamsTest)), ('HAM', lister_mails(hamFolder, nbHamsTest))]
+
+    if cache is not None :
+        predictions = []
+        for (type, fichiersMails) in listes :
+            for (fichierMail, mots) in zip(fichiersMails, cache.lire_plusieurs(fichiersMails, nbJobs)) :
+                predictions.append((type, fichierMail) + predire_mots_compile(mots, filtreCompile))
+    elif nbJobs > 1 :
+        taches = []
+        for (type, fichiersMails) in listes :
+            taille = max(1, len(fichiersMails) // (4 * nbJobs))
+            taches += [(type, fichiersMails[debut:debut + taille]) for debut in range(0, len(fichiersMails), taille)]
+        with Pool(nbJobs, initializer=_initialiser_evaluation, initargs=(filtreCompile,)) as pool :
+            predictions = [prediction for partie in pool.imap(_predire_mails, taches) for prediction in partie]
+    else :
+        _initialiser_evaluation(filtreCompile)
+        predictions = [prediction for tache in listes for prediction in _predire_mails(tache)]
+
+    return resultat_evaluation(predictions)
+
+
+def resultat_evaluation(predictions) :
+    """
+    Construit le résultat d'une évaluation (cf. evaluer_base) à partir des prédictions de chaque message.
+    
+    Parameters
+    ----------
+    predictions : list
+        Pour chaque message, un tuple (type réel 'SPAM' ou 'HAM', chemin, log-probabilité spam, log-probabilité ham).
+    
+    Returns
+    -------
+    dict
+        Le résultat de l'évaluation (cf. evaluer_base).
+    """
+    confusion = {'SPAM': {'SPAM': 0, 'HAM': 0}, 'HAM': {'SPAM': 0, 'HAM': 0}}
+    messages = []
+    for (type, fichierMail, logPspam, logPham) in predictions :
+        etiquette = 'SPAM' if logPspam >= logPham else 'HAM'
+        confusion[type][etiquette] += 1
+        messages.append({'chemin': fichierMail, 'type': type, 'etiquette': etiquette, 'pSpam': proba_spam(logPspam, logPham)})
+
+    nbSpams = confusion['SPAM']['SPAM'] + confusion['SPAM']['HAM']
+    nbHams = confusion['HAM']['SPAM'] + confusion['HAM']['HAM']
+    nbErreurs = confusion['SPAM']['HAM'] + confusion['HAM']['SPAM']
+    return {'confusion': confusion, 'nbSpams': nbSpams, 'nbHams': nbHams,
+            'tauxErreurSpam': confusion['SPAM']['HAM'] / nbSpams if nbSpams else None,
+            'tauxErreurHam': confusion['HAM']['SPAM'] / nbHams if nbHams else None,
+            'tauxErreur': nbErreurs / (nbSpams + nbHams) if nbSpams + nbHams else None,
+            'messages': messages}
+
+
+def afficher_resultats(resultat, details=False, matrice=False) :
+    """
+    Affiche le résultat d'une évaluation (cf. evaluer_base) : les pourcentages d'erreurs,
+    précédés si demandé du détail de chaque message et de la matrice de confusion.
+    
+    Parameters
+    ----------
+    resultat : dict
+        Le résultat de l'évaluation.
+    details : boolean
+        Affiche la prédiction de chaque message.
+    matrice : boolean
+        Affiche la matrice de confusion.
+    """
+    if details :
+        for message in resultat['messages'] :
+            print(message['type'].capitalize() + ' ' + message['chemin'] + ', P(SPAM) = {0}, P(HAM) = {1}'.format(message['pSpam'], 1-message['pSpam']))
+            erreur = '' if message['etiquette'] == message['type'] else ' **erreur**'
+            print('-> identifié comme ' + message['etiquette'].lower() + erreur)
+        print("\n")
+
+    if matrice :
+        confusion = resultat['confusion']
+        print('Réel \\ Prédit    SPAM    HAM')
+        print('SPAM           {0:>6} {1:>6}'.format(confusion['SPAM']['SPAM'], confusion['SPAM']['HAM']))
+        print('HAM            {0:>6} {1:>6}'.format(confusion['HAM']['SPAM'], confusion['HAM']['HAM']))
+
+    for (cle, nom) in (('tauxErreurSpam', 'les spams'), ('tauxErreurHam', 'les hams'), ('tauxErreur', 'l\'ensemble')) :
+        if not resultat[cle] : print('0% d\'erreurs sur ' + nom)
+        else : print('{0:.2f}% d\'erreurs sur '.format(resultat[cle]*100) + nom)
+
+
+def ecrire_resultats_jsonl(resultat, cheminFichier) :
+    """
+    Écrit le résultat de chaque message d'une évaluation (cf. evaluer_base) dans un fichier json, à raison d'un message par ligne.
+    """
+    with open(cheminFichier, 'w') as f :
+        for message in resultat['messages'] :
+            f.write(json.dumps(message) + '\n')
+
+
 def test_dossiers(spamFolder, hamFolder, nbSpam, nbHam, dicoProbas, nbSpamsTest, nbHamsTest) :
     """
-    Teste le filtre sur une base de test.
+    Teste le filtre sur une base de test et affiche la prédiction de chaque message et les pourcentages d'erreurs.
     
     Parameters
     ----------
@@ -268,65 +963,20 @@ def test_dossiers(spamFolder, hamFolder, nbSpam, nbHam, dicoProbas, nbSpamsTest,
         Fait partie des attributs du classifieur.
     dicoProbas : dict
         Les probabilités sous forme de dictionnaire.
-        Modifié à la sortie de la fonction.
         Fait partie des attributs du classifieur.
     nbSpamsTest : int
         Le nombre de spams à tester dans le dossier précisé.
     nbHamsTest : int
         Le nombre de hams à tester dans le dossier précisé.
     """
-    nbSpamsCourant = 0
-    nbHamsCourant = 0
-    nbErreursSpam = 0
-    nbErreursHam = 0
-
     PspamApriori = nbSpam/(nbSpam+nbHam)
     PhamApriori = nbHam/(nbSpam+nbHam)
+    filtreCompile = compiler_filtre(dicoProbas, PspamApriori, PhamApriori)
 
-    #Pour tous les spams de test
-    for msgFilePath in glob(path.join(spamFolder, '*.txt')) :
-        nbSpamsCourant += 1
-        probas = predire_message(msgFilePath, nbSpam, nbHam, dicoProbas, PspamApriori, PhamApriori)
-        #On calcule la proba a posteriori
-        probaspam = 1. / (1. + exp(probas[1] - probas[0]))
-        
-        print('Spam ' + msgFilePath + ', P(SPAM) = {0}, P(HAM) = {1}'.format(probaspam, 1-probaspam))
-        
-        if (probas[0] >= probas[1]) :
-            print('-> identifié comme spam')
-        else :
-            print('-> identifié comme ham **erreur**')
-            nbErreursSpam += 1
-        if nbSpamsCourant >= nbSpamsTest : break
-
-    #Pour tous les hams de test
-    for msgFilePath in glob(path.join(hamFolder, '*.txt')) :
-        nbHamsCourant += 1
-        probas = predire_message(msgFilePath, nbSpam, nbHam, dicoProbas, PspamApriori, PhamApriori)
-        #On calcule la proba a posteriori
-        probaspam = 1. / (1. + exp(probas[1] - probas[0]))
-
-        print('Ham ' + msgFilePath + ', P(SPAM) = {0}, P(HAM) = {1}'.format(probaspam, 1-probaspam))
-        
-        if (probas[1] > probas[0]) :
-            print('-> identifié comme ham')
-        else :
-            print('-> identifié comme spam **erreur**')
-            nbErreursHam += 1
-        if nbHamsCourant >= nbHamsTest : break
-        
-    print("\n")
-    if nbErreursSpam == 0 : print('0% d\'erreurs sur les spams')
-    else : print('{0:.2f}% d\'erreurs sur les spams'.format((nbErreursSpam/nbSpamsTest)*100))
-
-    if nbErreursHam == 0 : print('0% d\'erreurs sur les hams')
-    else : print('{0:.2f}% d\'erreurs sur les hams'.format((nbErreursHam/nbHamsTest)*100))
-
-    if (nbErreursSpam+nbErreursHam) == 0 : print('0% d\'erreurs sur l\'ensemble')
-    else : print('{0:.2f}% d\'erreurs sur l\'ensemble'.format(((nbErreursSpam+nbErreursHam)/(nbSpamsTest+nbHamsTest))*100))
+    afficher_resultats(evaluer_base(filtreCompile, spamFolder, hamFolder, nbSpamsTest, nbHamsTest), details=True)
 
     
-def sauvegarder_filtre(cheminFichier, dicoProbas, nbSpam, nbHam):
+def sauvegarder_filtre(cheminFichier, dicoComptes, nbSpam, nbHam, epsilon=EPSILON):
     """
     Sauvegarde les attributs/données du filtre (c-à-d du classifieur) dans une fichier.
     
@@ -335,24 +985,27 @@ def sauvegarder_filtre(cheminFichier, dicoProbas, nbSpam, nbHam):
     cheminFichier : str
         Le chemin du fichier dans lequel sauvegarder le filtre.
         Si le fichier existe déjà, il sera écrasé.
-    dicoProbas : dict
-        Les probabilités sous forme de dictionnaire.
-        Fait partie des attributs du classifieur.
-    nbHam : int
-        Le nombre totale de spams que le classifieur a appris.
+    dicoComptes : dict
+        Les comptes [nbSpam, nbHam] de chaque mot sous forme de dictionnaire.
         Fait partie des attributs du classifieur.
     nbSpam : int
         Le nombre totale de spams que le classifieur a appris.
         Fait partie des attributs du classifieur.
+    nbHam : int
+        Le nombre totale de hams que le classifieur a appris.
+        Fait partie des attributs du classifieur.
+    epsilon : int
+        Paramètre du lissage appliqué lors de la prédiction.
     """ 
-    with open(cheminFichier, 'w') as f:
-        jsonData = {}
-        json.dump({NB_SPAM_JSON_NAME:nbSpam, NB_HAM_JSON_NAME:nbHam, DICO_PROBA_JSON_NAME:dicoProbas}, f)
+    with moduleMetriques.etape('sauvegarde'), open(cheminFichier, 'w') as f:
+        json.dump({NB_SPAM_JSON_NAME:nbSpam, NB_HAM_JSON_NAME:nbHam, EPSILON_JSON_NAME:epsilon,
+                   DICO_COMPTES_JSON_NAME:dicoComptes}, f)
 
         
 def charger_filtre(cheminFichier):
     """
-    Charge les attributs/données du filtre (c-à-d du classifieur) depuis un fichier.
+    Charge les attributs/données du filtre (c-à-d du classifieur) depuis un fichier (json ou binaire)
+    et rejoue son journal d'apprentissage en ligne (cf. moduleJournal).
     
     Parameters
     ----------    
@@ -362,61 +1015,132 @@ def charger_filtre(cheminFichier):
     Returns
     -------
     tuple
-        Les attributs du classifieur sous la forme (dicoProbas, nbSpam, nbHam)
+        Les attributs du classifieur sous la forme (dicoComptes, nbSpam, nbHam, epsilon)
+    
+    Raises
+    ------
+    ValueError
+        Si le fichier passé en paramètre n'est pas un fichier de filtre valide ou si son journal est invalide.
+    """
+    from moduleJournal import verrou_journal, lire_journal, appliquer_journal
+    with verrou_journal(cheminFichier) as journal:
+        (dicoComptes, nbSpam, nbHam, epsilon) = charger_filtre_sans_journal(cheminFichier)
+        entrees = lire_journal(journal)
+    (nbSpam, nbHam) = appliquer_journal(dicoComptes, nbSpam, nbHam, entrees)
+    return (dicoComptes, nbSpam, nbHam, epsilon)
+
+
+def charger_filtre_sans_journal(cheminFichier):
+    """
+    Charge les attributs/données du filtre (c-à-d du classifieur) depuis un fichier (json ou binaire),
+    sans son journal d'apprentissage en ligne.
+    Les anciens fichiers ne contenant que les probabilités lissées sont convertis en comptes.
+    
+    Parameters
+    ----------    
+    cheminFichier : str
+        Le chemin du fichier dans lequel est sauvegardé le filtre.
+        
+    Returns
+    -------
+    tuple
+        Les attributs du classifieur sous la forme (dicoComptes, nbSpam, nbHam, epsilon)
     
     Raises
     ------
     ValueError
         Si le fichier passé en paramètre n'est pas un fichier de filtre valide.
     """
-    with open(cheminFichier, 'r') as f:
+    from moduleFormatBinaire import est_filtre_binaire, charger_filtre_binaire, comptes_filtre_binaire
+    if est_filtre_hache(cheminFichier):
+        raise ValueError("Le fichier " + cheminFichier + " est un filtre haché, sans dictionnaire (cf. moduleHachage).")
+    if est_filtre_binaire(cheminFichier):
+        modele = charger_filtre_binaire(cheminFichier)
+        return (comptes_filtre_binaire(modele), modele.nbSpam, modele.nbHam, modele.epsilon)
+
+    with moduleMetriques.etape('chargement'), open(cheminFichier, 'r') as f:
         try:
             jsonData = json.load(f)
             nbSpam = jsonData[NB_SPAM_JSON_NAME]
             nbHam = jsonData[NB_HAM_JSON_NAME]
-            dicoProbas = jsonData[DICO_PROBA_JSON_NAME]
-        except (ValueError, KeyError) as e:
+            epsilon = jsonData.get(EPSILON_JSON_NAME, EPSILON)
+            if DICO_COMPTES_JSON_NAME in jsonData:
+                dicoComptes = jsonData[DICO_COMPTES_JSON_NAME]
+            else:   # Ancien format : on retrouve les comptes à partir des probas lissées
+                dicoComptes = {}
+                for (mot, (pSpam, pHam)) in jsonData[DICO_PROBA_JSON_NAME].items():
+                    dicoComptes[mot] = [int(round(pSpam * (nbSpam + 2*epsilon) - epsilon)),
+                                        int(round(pHam * (nbHam + 2*epsilon) - epsilon))]
+        except (ValueError, KeyError, TypeError):
             raise ValueError("Le fichier " + cheminFichier + " n'est pas un fichier de filtre valide.")
             
-    return (dicoProbas, nbSpam, nbHam)
+    return (dicoComptes, nbSpam, nbHam, epsilon)
+
+
+def est_filtre_hache(cheminFichier):
+    """
+    Retourne vrai si le fichier est un filtre haché (cf. moduleHachage).
+    """
+    with open(cheminFichier, 'rb') as f:
+        return f.read(len(SIGNATURE_FILTRE_HACHE)) == SIGNATURE_FILTRE_HACHE
 
 
-def ajouter_mail(dicoProbas, nbSpam, nbHam, fichierMail, epsilon, isSpam) :
+def charger_filtre_compile(cheminFichier):
+    """
+    Charge un filtre depuis un fichier et le compile pour la prédiction.
+    Un filtre au format binaire dont le journal est vide est directement projeté en mémoire, sans compilation.
+    Un filtre haché (cf. moduleHachage) est compilé avec compiler_filtre_hache.
+    
+    Parameters
+    ----------    
+    cheminFichier : str
+        Le chemin du fichier dans lequel est sauvegardé le filtre.
+        
+    Returns
+    -------
+    FiltreCompile
+        Le classifieur compilé (cf. compiler_filtre).
+    
+    Raises
+    ------
+    ValueError
+        Si le fichier passé en paramètre n'est pas un fichier de filtre valide.
+    """
+    from moduleFormatBinaire import est_filtre_binaire, charger_filtre_binaire
+    from moduleJournal import verrou_journal, taille_journal
+    if est_filtre_hache(cheminFichier):
+        from moduleHachage import charger_filtre_hache, compiler_filtre_hache
+        return compiler_filtre_hache(*charger_filtre_hache(cheminFichier))
+    if est_filtre_binaire(cheminFichier):
+        with verrou_journal(cheminFichier):
+            modele = charger_filtre_binaire(cheminFichier)
+            journalVide = taille_journal(cheminFichier) == 0
+        if journalVide:
+            return modele.filtreCompile
+
+    (dicoComptes, nbSpam, nbHam, epsilon) = charger_filtre(cheminFichier)
+    PspamApriori = nbSpam / (nbSpam + nbHam)
+    PhamApriori = nbHam / (nbSpam + nbHam)
+    return compiler_filtre(lissage(dicoComptes, nbSpam, nbHam, epsilon), PspamApriori, PhamApriori)
+
+
+def ajouter_mail(dicoComptes, fichierMail, isSpam) :
     """
     Ajoute un mail supplémentaire dans le dictionnaire (en ligne).
+    Seuls les comptes des mots présents dans le mail sont modifiés ;
+    le nombre total de spams ou de hams est à incrémenter par l'appelant.
     
     Parameters
     ----------
-    dicoProbas : dict
-        Les probabilités sous forme de dictionnaire.
+    dicoComptes : dict
+        Les comptes [nbSpam, nbHam] de chaque mot sous forme de dictionnaire.
+        Modifié à la sortie de la fonction.
     fichierMail : str
         Le chemin du fichier dans lequel se trouve le mail.
-    nbHam : int
-        Le nombre total de spams que le classifieur a appris.
-    nbSpam : int
-        Le nombre total de spams que le classifieur a appris.
-    epsilon : int
-        Le epsilon utilisé dans le lissage.
     isSpam : boolean
         Le type de mail à apprendre.
     """
-
-    vecteurPresence = lire_message(fichierMail, dicoProbas)
-    
-    for mot in dicoProbas :
-        if isSpam :
-            exNbSpam = (nbSpam + 2 * epsilon)
-            nb_occu = (dicoProbas[mot][0] * exNbSpam) - epsilon
-            if vecteurPresence[mot] == True : nb_occu += 1
-            nb_occu += epsilon
-            exNbSpam += 1
-            dicoProbas[mot][0] = nb_occu / exNbSpam
-        else :
-            exNbHam = (nbHam + 2 * epsilon)
-            nb_occu = (dicoProbas[mot][1] * exNbHam) - epsilon
-            if vecteurPresence[mot] == True : nb_occu += 1
-            nb_occu += epsilon
-            exNbHam += 1
-            dicoProbas[mot][1] = nb_occu / exNbHam
-        
-        
+    if isSpam :
+        apprendre_spam(dicoComptes, fichierMail)
+    else :
+        apprendre_ham(dicoComptes, fichierMail)
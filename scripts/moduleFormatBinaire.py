@@ -0,0 +1,315 @@
+"""
+Module contenant le format binaire (versionné et projetable en mémoire via mmap) des filtres.
+
+Structure du fichier (petit-boutiste) :
+  - un en-tête : signature, version, nbSpam, nbHam, epsilon, nombre de mots,
+    log-vraisemblances de base spam/ham (cf. compiler_filtre) et taille de la table des mots ;
+  - la table des mots triés (encodés en UTF-8) : offsets uint32[nbMots+1] puis les octets des mots ;
+  - des tableaux contigus : deltaSpam float64[nbMots], deltaHam float64[nbMots],
+    comptesSpam int32[nbMots], comptesHam int32[nbMots] ;
+  - (version 2) la table de hachage des mots : alvéoles uint32[nbAlveoles] (puissance de 2, au moins 2*nbMots),
+    adressage ouvert par crc32 de l'encodage du mot, chaque alvéole contenant numéro du mot + 1 (0 : vide).
+Le chargement ne copie rien : les tableaux, la table des mots et sa table de hachage sont lus directement
+dans le fichier projeté (partagé entre les processus qui le projettent) ; chaque mot recherché coûte
+un crc32 et quelques comparaisons d'octets (une recherche dichotomique pour un fichier de version 1).
+Un filtre binaire est toujours réécrit de manière atomique (fichier temporaire puis os.replace) :
+les processus qui projettent l'ancien fichier continuent de le lire sans erreur.
+"""
+
+from array import array
+from collections import namedtuple
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from zlib import crc32
+from moduleFiltreAntiSpam import FiltreCompile, lissage, compiler_filtre
+import moduleMetriques
+
+#: Signature des fichiers de filtre binaires
+SIGNATURE = b"FILTRESB"
+#: Version du format binaire (écrite ; les fichiers de version 1, sans table de hachage, restent lisibles)
+VERSION = 2
+#: En-tête : signature, version, nbSpam, nbHam, epsilon, nbMots, logBaseSpam, logBaseHam, taille de la table des mots
+EN_TETE = struct.Struct("<8sIqqdIddQ")
+
+#: Filtre chargé depuis le format binaire
+ModeleBinaire = namedtuple('ModeleBinaire', ['nbSpam', 'nbHam', 'epsilon', 'mots', 'comptesSpam', 'comptesHam', 'filtreCompile'])
+
+def _aligner(position):
+    """
+    Retourne la première position alignée sur 8 octets à partir de position.
+    """
+    return (position + 7) & ~7
+
+
+def _nombre_alveoles(nbMots):
+    """
+    Retourne le nombre d'alvéoles de la table de hachage des mots (plus petite puissance de 2 >= 2*nbMots).
+    """
+    return 1 << max(0, 2 * nbMots - 1).bit_length()
+
+
+class TableMots:
+    """
+    Table des mots triés d'un filtre binaire (lue sans copie dans le tampon), utilisée comme index
+    (mot -> numéro) du filtre compilé : aucun dictionnaire n'est construit.
+    """
+    __slots__ = ('offsets', 'octets', 'alveoles')
+
+    def __init__(self, offsets, octets, alveoles=None):
+        self.offsets = offsets
+        self.octets = octets
+        self.alveoles = alveoles
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def mot(self, i):
+        """
+        Retourne le i-ème mot de la table.
+        """
+        return self.octets[self.offsets[i]:self.offsets[i+1]].tobytes().decode('utf-8')
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.mot(i)
+
+    def get(self, mot, defaut=None):
+        """
+        Retourne le numéro d'un mot dans la table, ou defaut s'il en est absent.
+        """
+        cle = mot.encode('utf-8')
+        (offsets, octets, alveoles) = (self.offsets, self.octets, self.alveoles)
+        if alveoles is None:    # Version 1 : recherche dichotomique
+            (debut, fin) = (0, len(self))
+            while debut < fin:
+                milieu = (debut + fin) // 2
+                if octets[offsets[milieu]:offsets[milieu+1]].tobytes() < cle:
+                    debut = milieu + 1
+                else:
+                    fin = milieu
+            if debut < len(self) and octets[offsets[debut]:offsets[debut+1]] == cle:
+                return debut
+            return defaut
+        masque = len(alveoles) - 1
+        j = crc32(cle) & masque
+        while True:
+            i = alveoles[j] - 1
+            if i < 0:
+                return defaut
+            if octets[offsets[i]:offsets[i+1]] == cle:
+                return i
+            j = (j + 1) & masque
+
+    def __contains__(self, mot):
+        return self.get(mot) is not None
+
+    def __getitem__(self, mot):
+        i = self.get(mot)
+        if i is None:
+            raise KeyError(mot)
+        return i
+
+
+def sauvegarder_filtre_binaire(cheminFichier, dicoComptes, nbSpam, nbHam, epsilon):
+    """
+    Sauvegarde les attributs/données du filtre (c-à-d du classifieur) dans un fichier au format binaire.
+
+    Parameters
+    ----------
+    cheminFichier : str
+        Le chemin du fichier dans lequel sauvegarder le filtre.
+        Si le fichier existe déjà, il sera remplacé de manière atomique.
+    dicoComptes : dict
+        Les comptes [nbSpam, nbHam] de chaque mot sous forme de dictionnaire.
+    nbSpam : int
+        Le nombre totale de spams que le classifieur a appris.
+    nbHam : int
+        Le nombre totale de hams que le classifieur a appris.
+    epsilon : int
+        Paramètre du lissage appliqué lors de la prédiction.
+    """
+    contenu = serialiser_filtre_binaire(dicoComptes, nbSpam, nbHam, epsilon)
+    try:    # Le fichier remplacé conserve ses droits
+        mode = os.stat(cheminFichier).st_mode & 0o777
+    except FileNotFoundError:
+        mode = 0o644
+    with moduleMetriques.etape('sauvegarde'):
+        # Jamais de troncature sur place : un processus qui projette le fichier recevrait SIGBUS.
+        # Le fichier temporaire est propre à chaque sauvegarde (sauvegardes concurrentes d'un même filtre)
+        (descripteur, cheminTemporaire) = tempfile.mkstemp(prefix=os.path.basename(cheminFichier) + '.', suffix='.tmp',
+                                                          dir=os.path.dirname(os.path.abspath(cheminFichier)))
+        try:
+            with os.fdopen(descripteur, 'wb') as f:
+                f.write(contenu)
+                f.flush()
+                os.fchmod(f.fileno(), mode)
+                os.fsync(f.fileno())
+            os.replace(cheminTemporaire, cheminFichier)
+        except BaseException:
+            os.remove(cheminTemporaire)
+            raise
+
+
+def serialiser_filtre_binaire(dicoComptes, nbSpam, nbHam, epsilon):
+    """
+    Traduit les attributs du filtre au format binaire.
+
+    Returns
+    -------
+    bytes
+        Le contenu du fichier de filtre binaire.
+
+    Raises
+    ------
+    ValueError
+        Si un compte ne tient pas sur 32 bits.
+    """
+    filtreCompile = compiler_filtre(lissage(dicoComptes, nbSpam, nbHam, epsilon),
+                                    nbSpam / (nbSpam + nbHam), nbHam / (nbSpam + nbHam))
+    motsEncodes = sorted((mot.encode('utf-8'), mot) for mot in dicoComptes)
+
+    offsets = array('I', [0])
+    for (cle, _) in motsEncodes:
+        offsets.append(offsets[-1] + len(cle))
+    octetsMots = b"".join(cle for (cle, _) in motsEncodes)
+    indices = [filtreCompile.indexMots[mot] for (_, mot) in motsEncodes]
+
+    try:
+        comptes = [array('i', [dicoComptes[mot][0] for (_, mot) in motsEncodes]),
+                   array('i', [dicoComptes[mot][1] for (_, mot) in motsEncodes])]
+    except OverflowError:
+        raise ValueError("Les comptes du filtre dépassent la capacité du format binaire (entiers signés sur 32 bits).")
+
+    alveoles = array('I', [0]) * _nombre_alveoles(len(motsEncodes))
+    masque = len(alveoles) - 1
+    for (i, (cle, _)) in enumerate(motsEncodes):
+        j = crc32(cle) & masque
+        while alveoles[j]:
+            j = (j + 1) & masque
+        alveoles[j] = i + 1
+
+    tableaux = [array('d', [filtreCompile.deltaSpam[i] for i in indices]),
+                array('d', [filtreCompile.deltaHam[i] for i in indices])] + comptes + [alveoles]
+    if sys.byteorder != 'little':
+        for tableau in [offsets] + tableaux:
+            tableau.byteswap()
+
+    contenu = bytearray(EN_TETE.pack(SIGNATURE, VERSION, nbSpam, nbHam, epsilon, len(motsEncodes),
+                                     filtreCompile.logBaseSpam, filtreCompile.logBaseHam, len(octetsMots)))
+    contenu += offsets.tobytes() + octetsMots
+    contenu += bytes(_aligner(len(contenu)) - len(contenu))
+    for tableau in tableaux:
+        contenu += tableau.tobytes()
+    return bytes(contenu)
+
+
+def _tableau(tampon, debut, nbElements, format):
+    """
+    Retourne une vue (sans copie) sur un tableau du tampon.
+    Sur une machine grand-boutiste, le tableau est copié puis remis dans l'ordre natif.
+    """
+    taille = struct.calcsize(format) * nbElements
+    vue = tampon[debut:debut + taille]
+    if sys.byteorder == 'little':
+        return vue.cast(format)
+    tableau = array(format, vue.tobytes())
+    tableau.byteswap()
+    return tableau
+
+
+def lire_filtre_binaire(tampon):
+    """
+    Lit un filtre au format binaire depuis un tampon (mmap, mémoire partagée, bytes...) sans copier ses données.
+
+    Parameters
+    ----------
+    tampon : buffer
+        Le tampon contenant le filtre binaire. Il doit rester ouvert tant que le filtre est utilisé.
+
+    Returns
+    -------
+    ModeleBinaire
+        Le filtre, dont le filtre compilé (cf. compiler_filtre) s'appuie directement sur le tampon.
+
+    Raises
+    ------
+    ValueError
+        Si le tampon ne contient pas un filtre binaire valide.
+    """
+    vue = memoryview(tampon)
+    if len(vue) < EN_TETE.size:
+        raise ValueError("Filtre binaire tronqué.")
+    (signature, version, nbSpam, nbHam, epsilon, nbMots, logBaseSpam, logBaseHam, tailleMots) = EN_TETE.unpack_from(vue)
+    if signature != SIGNATURE:
+        raise ValueError("Signature de filtre binaire invalide.")
+    if version not in (1, VERSION):
+        raise ValueError("Version de filtre binaire non supportée : " + str(version) + ".")
+
+    if epsilon.is_integer():
+        epsilon = int(epsilon)
+
+    position = EN_TETE.size
+    nbAlveoles = _nombre_alveoles(nbMots) if version >= 2 else 0
+    if _aligner(position + 4 * (nbMots + 1) + tailleMots) + 24 * nbMots + 4 * nbAlveoles > len(vue):
+        raise ValueError("Filtre binaire tronqué.")
+    offsets = _tableau(vue, position, nbMots + 1, 'I')
+    position += 4 * (nbMots + 1)
+    octetsMots = vue[position:position + tailleMots]
+    position = _aligner(position + tailleMots)
+    deltaSpam = _tableau(vue, position, nbMots, 'd')
+    deltaHam = _tableau(vue, position + 8 * nbMots, nbMots, 'd')
+    comptesSpam = _tableau(vue, position + 16 * nbMots, nbMots, 'i')
+    comptesHam = _tableau(vue, position + 20 * nbMots, nbMots, 'i')
+    alveoles = _tableau(vue, position + 24 * nbMots, nbAlveoles, 'I') if version >= 2 else None
+
+    mots = TableMots(offsets, octetsMots, alveoles)
+    filtreCompile = FiltreCompile(logBaseSpam, logBaseHam, mots, deltaSpam, deltaHam)
+    return ModeleBinaire(nbSpam, nbHam, epsilon, mots, comptesSpam, comptesHam, filtreCompile)
+
+
+def est_filtre_binaire(cheminFichier):
+    """
+    Vérifie si le fichier passé en paramètre est un filtre au format binaire (d'après sa signature).
+    """
+    with open(cheminFichier, 'rb') as f:
+        return f.read(len(SIGNATURE)) == SIGNATURE
+
+
+def charger_filtre_binaire(cheminFichier):
+    """
+    Charge un filtre au format binaire en projetant le fichier en mémoire (mmap).
+
+    Parameters
+    ----------
+    cheminFichier : str
+        Le chemin du fichier dans lequel est sauvegardé le filtre.
+
+    Returns
+    -------
+    ModeleBinaire
+        Le filtre (cf. lire_filtre_binaire).
+
+    Raises
+    ------
+    ValueError
+        Si le fichier passé en paramètre n'est pas un fichier de filtre binaire valide.
+    """
+    with moduleMetriques.etape('chargement'), open(cheminFichier, 'rb') as f:
+        try:
+            projection = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # Fichier vide
+            raise ValueError("Le fichier " + cheminFichier + " n'est pas un fichier de filtre valide.")
+    try:
+        return lire_filtre_binaire(projection)
+    except ValueError:
+        raise ValueError("Le fichier " + cheminFichier + " n'est pas un fichier de filtre valide.")
+
+
+def comptes_filtre_binaire(modele):
+    """
+    Retourne les comptes d'un filtre binaire sous forme de dictionnaire (mot -> [nbSpam, nbHam]).
+    """
+    return {mot: [modele.comptesSpam[i], modele.comptesHam[i]] for (i, mot) in enumerate(modele.mots)}
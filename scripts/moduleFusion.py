@@ -0,0 +1,89 @@
+"""
+Module contenant la fusion de filtres partiels (apprentissage distribué).
+
+Un filtre ne conserve que des comptes (le lissage n'est appliqué qu'à la prédiction) : chaque nœud apprend
+un filtre partiel sur ses propres mails (cf. apprend_filtre.py) et la fusion additionne exactement les comptes
+des mots et les nombres de spams et de hams. Le filtre fusionné est identique à celui appris sur l'union des mails.
+Un filtre partiel peut également être soustrait (expiration d'anciens mails).
+
+Les filtres fusionnés doivent partager le même dictionnaire (même empreinte, cf. empreinte_dictionnaire)
+et le même epsilon ; les filtres hachés (cf. moduleHachage) doivent avoir le même nombre d'alvéoles.
+"""
+
+from moduleCache import empreinte_dictionnaire
+
+def _verifier_compatibles(reference, modele, nom):
+    """
+    Vérifie qu'un filtre partiel peut être fusionné avec le filtre de référence.
+
+    Raises
+    ------
+    ValueError
+        Si les dictionnaires (ou nombres d'alvéoles) ou les epsilons diffèrent.
+    """
+    (comptesReference, _, _, epsilonReference) = reference
+    (comptes, _, _, epsilon) = modele
+    if isinstance(comptes, dict) != isinstance(comptesReference, dict):
+        raise ValueError("Le filtre " + nom + " ne peut être fusionné : filtres hachés et à dictionnaire mélangés.")
+    if isinstance(comptes, dict):
+        if empreinte_dictionnaire(comptes) != empreinte_dictionnaire(comptesReference):
+            raise ValueError("Le dictionnaire du filtre " + nom + " est différent (empreinte "
+                             + empreinte_dictionnaire(comptes) + ").")
+    elif comptes.shape != comptesReference.shape:
+        raise ValueError("Le filtre haché " + nom + " n'a pas le même nombre d'alvéoles.")
+    if epsilon != epsilonReference:
+        raise ValueError("L'epsilon du filtre " + nom + " est différent (" + str(epsilon) + ").")
+
+
+def fusionner_filtres(modeles, soustraits=()):
+    """
+    Fusionne des filtres partiels : additionne les comptes des modèles puis soustrait ceux des modèles soustraits.
+
+    Parameters
+    ----------
+    modeles : list
+        Les couples (nom, attributs du filtre) des filtres à additionner, les attributs étant de la forme
+        (comptes, nbSpam, nbHam, epsilon) (cf. charger_filtre et charger_filtre_hache).
+    soustraits : list
+        Les couples (nom, attributs du filtre) des filtres à soustraire.
+
+    Returns
+    -------
+    tuple
+        Les attributs du filtre fusionné (comptes, nbSpam, nbHam, epsilon).
+
+    Raises
+    ------
+    ValueError
+        Si les filtres sont incompatibles, ou si un compte devient négatif ou si aucun mail ne reste appris.
+    """
+    (_, reference) = modeles[0]
+    (comptes, nbSpam, nbHam, epsilon) = reference
+    if isinstance(comptes, dict):
+        comptes = {mot: list(compte) for (mot, compte) in comptes.items()}
+    else:
+        comptes = comptes.copy()
+
+    for (signe, liste) in ((1, modeles[1:]), (-1, soustraits)):
+        for (nom, modele) in liste:
+            _verifier_compatibles(reference, modele, nom)
+            (comptesModele, nbSpamModele, nbHamModele, _) = modele
+            if isinstance(comptes, dict):
+                for (mot, (compteSpam, compteHam)) in comptesModele.items():
+                    compte = comptes[mot]
+                    compte[0] += signe * compteSpam
+                    compte[1] += signe * compteHam
+            else:
+                comptes += signe * comptesModele
+            nbSpam += signe * nbSpamModele
+            nbHam += signe * nbHamModele
+
+    if isinstance(comptes, dict):
+        negatif = any(compteSpam < 0 or compteHam < 0 for (compteSpam, compteHam) in comptes.values())
+    else:
+        negatif = bool((comptes < 0).any())
+    if negatif or nbSpam < 0 or nbHam < 0:
+        raise ValueError("Les filtres soustraits contiennent des mails absents des filtres fusionnés (comptes négatifs).")
+    if nbSpam + nbHam == 0:
+        raise ValueError("Le filtre fusionné n'a appris aucun mail.")
+    return (comptes, nbSpam, nbHam, epsilon)
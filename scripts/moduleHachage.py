@@ -0,0 +1,242 @@
+"""
+Module contenant le mode de traits « haché » (hashing trick) du filtre anti-spam.
+
+Plutôt que de se limiter aux mots du dictionnaire, chaque mot (capitalisé) d'un message est associé
+par une fonction de hachage stable (crc32) à l'une des 2^nbBits alvéoles d'un tableau :
+le vocabulaire est ouvert mais la taille du modèle reste fixe quelle que soit la base.
+Une alvéole est « présente » dans un message si au moins un de ses mots l'est ; les comptes
+(nombre de spams et de hams contenant chaque alvéole) sont conservés dans un tableau NumPy
+de forme (2, 2^nbBits) et sauvegardés au format .npz.
+
+Le filtre compilé (cf. compiler_filtre_hache) réutilise FiltreCompile : son index des mots
+est un HacheurMots, de sorte que predire_contenu_compile et evaluer_base s'appliquent tels quels.
+L'apprentissage en ligne passe par le journal du filtre (cf. moduleJournal).
+"""
+
+from math import log, fsum
+from zlib import crc32
+import numpy as np
+from moduleFiltreAntiSpam import (FiltreCompile, lire_mots_presents, lire_mots_messages, EPSILON)
+from moduleSources import iterer_messages
+from moduleJournal import verrou_journal, lire_journal
+
+#: Nombre de bits par défaut (2^18 alvéoles)
+DEFAULT_NB_BITS = 18
+#: Nombre maximal de bits
+MAX_NB_BITS = 28
+#: Nombre d'alvéoles (des messages lus) accumulées avant d'être ajoutées aux comptes
+TAILLE_LOT = 1 << 16
+
+class HacheurMots:
+    """
+    Index des mots d'un filtre haché : associe à chaque mot (non vide) son alvéole.
+    """
+    __slots__ = ('nbBits', 'masque')
+
+    #: Vocabulaire ouvert : tous les mots non vides en font partie (il n'est pas énumérable)
+    ouvert = True
+
+    def __init__(self, nbBits):
+        self.nbBits = nbBits
+        self.masque = (1 << nbBits) - 1
+
+    def __getitem__(self, mot):
+        return crc32(mot.encode('utf-8')) & self.masque
+
+    def __contains__(self, mot):
+        return mot != ''
+
+    def get(self, mot, defaut=None):
+        return self[mot] if mot != '' else defaut
+
+    def __len__(self):
+        return self.masque + 1
+
+    def alveoles(self, mots):
+        """
+        Retourne l'ensemble des alvéoles des mots.
+        """
+        masque = self.masque
+        return {crc32(mot.encode('utf-8')) & masque for mot in mots}
+
+
+def nouveaux_comptes_haches(nbBits=DEFAULT_NB_BITS):
+    """
+    Retourne des comptes nuls pour 2^nbBits alvéoles.
+
+    Returns
+    -------
+    numpy.ndarray
+        Les comptes (int64) de forme (2, 2^nbBits) : ligne 0 pour les spams, ligne 1 pour les hams.
+    """
+    if not 1 <= nbBits <= MAX_NB_BITS:
+        raise ValueError("Le nombre de bits doit être compris entre 1 et " + str(MAX_NB_BITS) + ".")
+    return np.zeros((2, 1 << nbBits), dtype=np.int64)
+
+
+def hacheur(comptes):
+    """
+    Retourne le HacheurMots correspondant à des comptes hachés.
+    """
+    return HacheurMots(comptes.shape[1].bit_length() - 1)
+
+
+def apprendre_base_hachee(comptes, dossierSpam, dossierHam, nbSpam, nbHam, nbJobs=1, nettoyer=False):
+    """
+    Met à jour les comptes hachés en apprenant l'ensemble des spams et des hams de la base (cf. apprendre_base).
+
+    Parameters
+    ----------
+    comptes : numpy.ndarray
+        Les comptes hachés (cf. nouveaux_comptes_haches). Modifiés à la sortie de la fonction.
+    dossierSpam : str
+        Le chemin du dossier qui contient tous les spams de la base d'apprentissage.
+    dossierHam : str
+        Le chemin du dossier qui contient tous les hams de la base d'apprentissage.
+    nbSpam : int
+        Le nombre de spams à apprendre.
+    nbHam : int
+        Le nombre de hams à apprendre.
+    nbJobs : int
+        Le nombre de processus utilisés pour lire les mails.
+    nettoyer : bool
+        Supprime les en-têtes et les pièces jointes des mails avant l'apprentissage (cf. nettoyer_message).
+
+    Returns
+    -------
+    tuple
+        Les nombres de spams et de hams réellement appris (cf. apprendre_base).
+    """
+    index = hacheur(comptes)
+    nbAppris = [0, 0]
+    for (ligne, dossier, nbMails) in ((0, dossierSpam, nbSpam), (1, dossierHam, nbHam)):
+        lot = []
+        for (_, mots) in lire_mots_messages(iterer_messages(dossier, nbMails, nettoyer), index, nbJobs):
+            lot.extend(index.alveoles(mots))
+            nbAppris[ligne] += 1
+            if len(lot) >= TAILLE_LOT:
+                comptes[ligne] += np.bincount(np.array(lot, dtype=np.int64), minlength=comptes.shape[1])
+                lot = []
+        if lot:
+            comptes[ligne] += np.bincount(np.array(lot, dtype=np.int64), minlength=comptes.shape[1])
+    return tuple(nbAppris)
+
+
+def ajouter_mail_hache(comptes, fichierMail, isSpam):
+    """
+    Ajoute un mail supplémentaire aux comptes hachés (cf. ajouter_mail) ;
+    le nombre total de spams ou de hams est à incrémenter par l'appelant.
+    """
+    index = hacheur(comptes)
+    alveoles = np.fromiter(index.alveoles(lire_mots_presents(fichierMail, index)), dtype=np.int64)
+    comptes[0 if isSpam else 1, alveoles] += 1
+
+
+def appliquer_journal_hache(comptes, nbSpam, nbHam, entrees):
+    """
+    Rejoue des entrées du journal sur des comptes hachés (cf. appliquer_journal).
+
+    Returns
+    -------
+    tuple
+        Les nouveaux nombres de spams et de hams appris (nbSpam, nbHam).
+    """
+    index = hacheur(comptes)
+    for (deltaSpam, deltaHam, mots) in entrees:
+        alveoles = np.fromiter(index.alveoles(mot for mot in mots if mot in index), dtype=np.int64)
+        comptes[0, alveoles] += deltaSpam
+        comptes[1, alveoles] += deltaHam
+        nbSpam += deltaSpam
+        nbHam += deltaHam
+    return (nbSpam, nbHam)
+
+
+def compiler_filtre_hache(comptes, nbSpam, nbHam, epsilon):
+    """
+    Lisse les comptes hachés et compile le filtre (cf. lissage et compiler_filtre).
+
+    Returns
+    -------
+    FiltreCompile
+        Le classifieur compilé, dont l'index des mots est un HacheurMots.
+    """
+    pSpam = (comptes[0] + epsilon) / (nbSpam + 2*epsilon)
+    pHam = (comptes[1] + epsilon) / (nbHam + 2*epsilon)
+    logAbsentsSpam = np.log(1 - pSpam)
+    logAbsentsHam = np.log(1 - pHam)
+    logBaseSpam = fsum([log(nbSpam / (nbSpam + nbHam))] + logAbsentsSpam.tolist())
+    logBaseHam = fsum([log(nbHam / (nbSpam + nbHam))] + logAbsentsHam.tolist())
+    return FiltreCompile(logBaseSpam, logBaseHam, hacheur(comptes),
+                         np.log(pSpam) - logAbsentsSpam, np.log(pHam) - logAbsentsHam)
+
+
+def sauvegarder_filtre_hache(cheminFichier, comptes, nbSpam, nbHam, epsilon=EPSILON):
+    """
+    Sauvegarde un filtre haché dans un fichier (format .npz de NumPy).
+
+    Parameters
+    ----------
+    cheminFichier : str
+        Le chemin du fichier dans lequel sauvegarder le filtre.
+        Si le fichier existe déjà, il sera écrasé.
+    comptes : numpy.ndarray
+        Les comptes hachés.
+    nbSpam : int
+        Le nombre totale de spams que le classifieur a appris.
+    nbHam : int
+        Le nombre totale de hams que le classifieur a appris.
+    epsilon : int
+        Paramètre du lissage appliqué lors de la prédiction.
+    """
+    with open(cheminFichier, 'wb') as f:    # Un fichier ouvert évite l'ajout de l'extension .npz
+        np.savez_compressed(f, comptes=comptes, nbSpamHam=np.array([nbSpam, nbHam], dtype=np.int64),
+                            epsilon=np.array(epsilon, dtype=np.float64))
+
+
+def charger_filtre_hache_sans_journal(cheminFichier):
+    """
+    Charge un filtre haché depuis un fichier, sans son journal d'apprentissage en ligne.
+
+    Returns
+    -------
+    tuple
+        Les attributs du classifieur sous la forme (comptes, nbSpam, nbHam, epsilon).
+
+    Raises
+    ------
+    ValueError
+        Si le fichier passé en paramètre n'est pas un fichier de filtre haché valide.
+    """
+    try:
+        with np.load(cheminFichier) as donnees:
+            comptes = donnees['comptes'].astype(np.int64)
+            (nbSpam, nbHam) = (int(n) for n in donnees['nbSpamHam'])
+            epsilon = float(donnees['epsilon'])
+    except (OSError, ValueError, KeyError):
+        raise ValueError("Le fichier " + cheminFichier + " n'est pas un fichier de filtre haché valide.")
+    if comptes.ndim != 2 or comptes.shape[0] != 2 or comptes.shape[1] & (comptes.shape[1] - 1):
+        raise ValueError("Le fichier " + cheminFichier + " n'est pas un fichier de filtre haché valide.")
+    if epsilon.is_integer():
+        epsilon = int(epsilon)
+    return (comptes, nbSpam, nbHam, epsilon)
+
+
+def charger_filtre_hache(cheminFichier):
+    """
+    Charge un filtre haché depuis un fichier et rejoue son journal d'apprentissage en ligne (cf. charger_filtre).
+
+    Returns
+    -------
+    tuple
+        Les attributs du classifieur sous la forme (comptes, nbSpam, nbHam, epsilon).
+
+    Raises
+    ------
+    ValueError
+        Si le fichier passé en paramètre n'est pas un fichier de filtre haché valide ou si son journal est invalide.
+    """
+    with verrou_journal(cheminFichier) as journal:
+        (comptes, nbSpam, nbHam, epsilon) = charger_filtre_hache_sans_journal(cheminFichier)
+        entrees = lire_journal(journal)
+    (nbSpam, nbHam) = appliquer_journal_hache(comptes, nbSpam, nbHam, entrees)
+    return (comptes, nbSpam, nbHam, epsilon)
@@ -0,0 +1,384 @@
+"""
+Module contenant le journal des mises à jour d'un filtre (apprentissage en ligne).
+
+Plutôt que de réécrire tout le filtre à chaque mail appris, l'apprentissage en ligne ajoute
+une ligne json au journal situé à côté du filtre (<fichierFiltre>.journal) :
+{"nbSpam": 1, "nbHam": 0, "mots": [...]} ; les comptes des mots listés augmentent de nbSpam et nbHam,
+les mots absents du dictionnaire du filtre étant ignorés au rejeu. Le filtre n'est pas chargé pour
+une mise à jour (cf. vocabulaire_journal) : son coût ne dépend donc pas de la taille du filtre.
+
+Le chargement d'un filtre (cf. charger_filtre) rejoue le journal sur le filtre de base
+et la compaction (cf. compacter_filtre) l'y intègre. Les accès au journal sont protégés par un verrou
+(fcntl.flock) : partagé pour la lecture, exclusif pour l'ajout et la compaction.
+
+La compaction est idempotente : avant de remplacer le filtre, elle ajoute au journal une ligne
+{"compaction": empreinte} contenant l'empreinte (sha1) du nouveau filtre. Si elle est interrompue
+après le remplacement du filtre mais avant que le journal ne soit vidé, les entrées qui précèdent
+cette ligne sont ignorées au rejeu (le filtre, dont l'empreinte correspond, les contient déjà).
+"""
+
+from contextlib import contextmanager
+import fcntl
+import hashlib
+import json
+import os
+from moduleFiltreAntiSpam import (SEPARATEURS_MOTS, mots_presents, charger_filtre_sans_journal, sauvegarder_filtre,
+                                  est_filtre_hache)
+
+#: Extension du journal d'un filtre
+EXTENSION_JOURNAL = ".journal"
+
+def chemin_journal(cheminFiltre):
+    """
+    Retourne le chemin du journal d'un filtre.
+    """
+    return cheminFiltre + EXTENSION_JOURNAL
+
+
+def chemin_filtre(journal):
+    """
+    Retourne le chemin du filtre d'un journal ouvert.
+    """
+    return journal.name[:-len(EXTENSION_JOURNAL)]
+
+
+def vocabulaire_journal(cheminFiltre):
+    """
+    Retourne le vocabulaire à conserver dans les entrées du journal d'un filtre, sans charger le filtre :
+    la table des mots projetée d'un filtre binaire (cf. moduleFormatBinaire), ou None pour conserver
+    tous les mots (filtre json, dont les mots inconnus sont ignorés au rejeu, ou haché).
+
+    Raises
+    ------
+    ValueError
+        Si le fichier passé en paramètre n'est pas un fichier de filtre valide.
+    """
+    if est_filtre_hache(cheminFiltre):
+        return None
+    from moduleFormatBinaire import est_filtre_binaire, charger_filtre_binaire
+    if est_filtre_binaire(cheminFiltre):
+        return charger_filtre_binaire(cheminFiltre).mots
+    with open(cheminFiltre, 'rb') as f:
+        if not f.read(64).lstrip().startswith(b'{'):
+            raise ValueError("Le fichier " + cheminFiltre + " n'est pas un fichier de filtre valide.")
+    return None
+
+
+def mots_du_contenu(contenu, vocabulaire=None):
+    """
+    Retourne l'ensemble des mots (capitalisés) distincts d'un message à ajouter au journal :
+    seuls les mots du vocabulaire du filtre sont conservés, s'il est précisé (cf. vocabulaire_journal).
+
+    Parameters
+    ----------
+    contenu : str
+        Le contenu du message.
+    vocabulaire : dict, set ou conteneur
+        Le vocabulaire du filtre, ou None pour conserver tous les mots.
+
+    Returns
+    -------
+    set
+        Les mots capitalisés du message.
+    """
+    if vocabulaire is not None:
+        return mots_presents(contenu, vocabulaire)
+    mots = {mot.upper() for mot in set(SEPARATEURS_MOTS.split(contenu))}
+    mots.discard('')
+    return mots
+
+
+def empreinte_fichier(chemin):
+    """
+    Retourne l'empreinte (sha1) du contenu d'un fichier.
+    """
+    empreinte = hashlib.sha1()
+    with open(chemin, 'rb') as f:
+        for bloc in iter(lambda: f.read(1 << 20), b''):
+            empreinte.update(bloc)
+    return empreinte.hexdigest()
+
+
+@contextmanager
+def verrou_journal(cheminFiltre, exclusif=False):
+    """
+    Verrouille le journal d'un filtre le temps d'un bloc with.
+
+    Parameters
+    ----------
+    cheminFiltre : str
+        Le chemin du fichier du filtre.
+    exclusif : bool
+        Verrou exclusif (ajout, compaction ; le journal est alors créé s'il n'existe pas)
+        ou partagé (lecture).
+
+    Yields
+    ------
+    file
+        Le journal ouvert en binaire, ou None s'il n'existe pas (verrou partagé uniquement).
+    """
+    try:
+        journal = open(chemin_journal(cheminFiltre), 'a+b' if exclusif else 'rb')
+    except FileNotFoundError:
+        yield None
+        return
+    with journal:
+        fcntl.flock(journal, fcntl.LOCK_EX if exclusif else fcntl.LOCK_SH)
+        try:
+            yield journal
+        finally:
+            fcntl.flock(journal, fcntl.LOCK_UN)
+
+
+def _lire_journal(journal):
+    """
+    Lit les entrées d'un journal (cf. lire_journal).
+
+    Returns
+    -------
+    tuple
+        Les entrées à rejouer et vrai si le journal contient une ligne de compaction.
+    """
+    if journal is None:
+        return ([], False)
+    journal.seek(0)
+    entrees = []
+    empreinteFiltre = None
+    for ligne in journal.read().split(b'\n')[:-1]:
+        try:
+            entree = json.loads(ligne)
+            if "compaction" in entree:
+                if empreinteFiltre is None:
+                    empreinteFiltre = empreinte_fichier(chemin_filtre(journal))
+                if entree["compaction"] == empreinteFiltre:    # Entrées précédentes déjà intégrées au filtre
+                    entrees = []
+                continue
+            entrees.append((entree["nbSpam"], entree["nbHam"], entree["mots"]))
+        except (ValueError, KeyError, TypeError):
+            raise ValueError("Le journal " + journal.name + " contient une entrée invalide.")
+    return (entrees, empreinteFiltre is not None)
+
+
+def lire_journal(journal):
+    """
+    Lit les entrées d'un journal (cf. verrou_journal). Une dernière ligne incomplète
+    (écriture interrompue) est ignorée, ainsi que les entrées déjà intégrées au filtre
+    par une compaction interrompue (cf. compacter_filtre).
+
+    Parameters
+    ----------
+    journal : file
+        Le journal ouvert en binaire, ou None.
+
+    Returns
+    -------
+    list
+        Les entrées sous la forme de tuples (nbSpam, nbHam, mots).
+
+    Raises
+    ------
+    ValueError
+        Si une entrée du journal est invalide.
+    """
+    return _lire_journal(journal)[0]
+
+
+def appliquer_journal(dicoComptes, nbSpam, nbHam, entrees):
+    """
+    Rejoue des entrées du journal sur les comptes d'un filtre.
+
+    Parameters
+    ----------
+    dicoComptes : dict
+        Les comptes [nbSpam, nbHam] de chaque mot sous forme de dictionnaire.
+        Modifié à la sortie de la fonction.
+    nbSpam : int
+        Le nombre de spams appris par le filtre.
+    nbHam : int
+        Le nombre de hams appris par le filtre.
+    entrees : list
+        Les entrées du journal (cf. lire_journal).
+
+    Returns
+    -------
+    tuple
+        Les nouveaux nombres de spams et de hams appris (nbSpam, nbHam).
+    """
+    for (deltaSpam, deltaHam, mots) in entrees:
+        for mot in mots:
+            comptes = dicoComptes.get(mot)
+            if comptes is not None:
+                comptes[0] += deltaSpam
+                comptes[1] += deltaHam
+        nbSpam += deltaSpam
+        nbHam += deltaHam
+    return (nbSpam, nbHam)
+
+
+def journaliser(cheminFiltre, mots, isSpam):
+    """
+    Ajoute au journal d'un filtre l'apprentissage d'un mail.
+
+    Parameters
+    ----------
+    cheminFiltre : str
+        Le chemin du fichier du filtre.
+    mots : iterable
+        Les mots (capitalisés) présents dans le mail (cf. mots_du_contenu).
+    isSpam : boolean
+        Le type du mail appris.
+
+    Returns
+    -------
+    tuple
+        Les positions (début, fin) de l'entrée dans le journal.
+    """
+    return journaliser_plusieurs(cheminFiltre, [(mots, isSpam)])
+
+
+def _retirer_ligne_incomplete(journal):
+    """
+    Retire la dernière ligne d'un journal (verrouillé en exclusif) si elle est incomplète (écriture interrompue),
+    pour que les entrées ajoutées ensuite commencent sur une nouvelle ligne.
+
+    Returns
+    -------
+    int
+        La taille du journal (position des entrées ajoutées).
+    """
+    fin = journal.seek(0, os.SEEK_END)
+    if fin > 0:
+        journal.seek(fin - 1)
+        if journal.read(1) != b'\n':
+            journal.seek(0)
+            fin = journal.read().rfind(b'\n') + 1
+            journal.truncate(fin)
+    return fin
+
+
+def journaliser_plusieurs(cheminFiltre, mails):
+    """
+    Ajoute au journal d'un filtre l'apprentissage de plusieurs mails, en une seule écriture.
+
+    Parameters
+    ----------
+    cheminFiltre : str
+        Le chemin du fichier du filtre.
+    mails : iterable
+        Les couples (mots présents dans le mail, isSpam).
+
+    Returns
+    -------
+    tuple
+        Les positions (début, fin) des entrées dans le journal.
+    """
+    lignes = b''.join((json.dumps({"nbSpam": int(isSpam), "nbHam": int(not isSpam), "mots": sorted(mots)}) + '\n').encode('utf-8')
+                      for (mots, isSpam) in mails)
+    with verrou_journal(cheminFiltre, exclusif=True) as journal:
+        debut = _retirer_ligne_incomplete(journal)
+        journal.write(lignes)
+        journal.flush()
+        return (debut, journal.tell())
+
+
+def taille_journal(cheminFiltre):
+    """
+    Retourne la taille (en octets) du journal d'un filtre (0 s'il n'existe pas).
+    """
+    try:
+        return os.stat(chemin_journal(cheminFiltre)).st_size
+    except FileNotFoundError:
+        return 0
+
+
+def supprimer_journal(cheminFiltre):
+    """
+    Supprime le journal d'un filtre (après qu'un nouveau filtre a été sauvegardé à sa place).
+    """
+    if not os.path.exists(chemin_journal(cheminFiltre)):
+        return
+    with verrou_journal(cheminFiltre, exclusif=True) as journal:
+        journal.truncate(0)
+    os.remove(chemin_journal(cheminFiltre))
+
+
+def _synchroniser(chemin):
+    """
+    Force l'écriture sur le disque d'un fichier ou d'un répertoire (os.fsync).
+    """
+    descripteur = os.open(chemin, os.O_RDONLY)
+    try:
+        os.fsync(descripteur)
+    finally:
+        os.close(descripteur)
+
+
+def terminer_compaction(journal):
+    """
+    Termine une compaction interrompue : le journal (verrouillé en exclusif) ne conserve que les entrées
+    restant à rejouer. Le filtre peut ensuite être remplacé par un autre qu'une compaction
+    (cf. apprendre_incremental) sans que ces entrées ne soient perdues ni rejouées deux fois.
+
+    Returns
+    -------
+    list
+        Les entrées restant à rejouer (cf. lire_journal).
+    """
+    (entrees, compaction) = _lire_journal(journal)
+    if compaction:
+        journal.truncate(0)
+        journal.write(b''.join((json.dumps({"nbSpam": deltaSpam, "nbHam": deltaHam, "mots": mots}) + '\n').encode('utf-8')
+                               for (deltaSpam, deltaHam, mots) in entrees))
+        journal.flush()
+        os.fsync(journal.fileno())
+    return entrees
+
+
+def compacter_filtre(cheminFiltre):
+    """
+    Intègre le journal au filtre (sauvegardé dans son format d'origine) puis vide le journal.
+    Le filtre est remplacé de manière atomique (os.replace) et la compaction est idempotente :
+    interrompue à n'importe quel moment, aucune entrée n'est perdue ni rejouée deux fois.
+
+    Parameters
+    ----------
+    cheminFiltre : str
+        Le chemin du fichier du filtre.
+
+    Returns
+    -------
+    int
+        Le nombre d'entrées intégrées.
+
+    Raises
+    ------
+    ValueError
+        Si le fichier n'est pas un fichier de filtre valide ou si le journal est invalide.
+    """
+    from moduleFormatBinaire import est_filtre_binaire, sauvegarder_filtre_binaire
+    with verrou_journal(cheminFiltre, exclusif=True) as journal:
+        entrees = lire_journal(journal)
+        if not entrees:     # Rien à intégrer (ou compaction interrompue après le remplacement du filtre)
+            journal.truncate(0)
+            return 0
+        if est_filtre_hache(cheminFiltre):
+            from moduleHachage import charger_filtre_hache_sans_journal, appliquer_journal_hache, sauvegarder_filtre_hache
+            (comptes, nbSpam, nbHam, epsilon) = charger_filtre_hache_sans_journal(cheminFiltre)
+            (nbSpam, nbHam) = appliquer_journal_hache(comptes, nbSpam, nbHam, entrees)
+            sauvegarde = sauvegarder_filtre_hache
+        else:
+            (comptes, nbSpam, nbHam, epsilon) = charger_filtre_sans_journal(cheminFiltre)
+            (nbSpam, nbHam) = appliquer_journal(comptes, nbSpam, nbHam, entrees)
+            sauvegarde = sauvegarder_filtre_binaire if est_filtre_binaire(cheminFiltre) else sauvegarder_filtre
+        cheminTemporaire = cheminFiltre + ".tmp"
+        sauvegarde(cheminTemporaire, comptes, nbSpam, nbHam, epsilon)
+        _synchroniser(cheminTemporaire)
+        # Le journal désigne le nouveau filtre avant qu'il ne remplace l'ancien (une ligne incomplète est retirée)
+        _retirer_ligne_incomplete(journal)
+        journal.write((json.dumps({"compaction": empreinte_fichier(cheminTemporaire)}) + '\n').encode('utf-8'))
+        journal.flush()
+        os.fsync(journal.fileno())
+        os.replace(cheminTemporaire, cheminFiltre)
+        _synchroniser(os.path.dirname(os.path.abspath(cheminFiltre)))
+        journal.truncate(0)
+    return len(entrees)
@@ -0,0 +1,332 @@
+"""
+Module contenant le manifeste d'apprentissage d'un filtre, pour son réapprentissage incrémental.
+
+Le manifeste (base sqlite <fichierFiltre>.manifeste, sur le modèle du cache des traits, cf. moduleCache)
+conserve pour chaque mail appris son chemin, sa classe, sa taille, sa date de modification et les mots
+du dictionnaire qui y sont présents (numéros dans le dictionnaire trié). Le réapprentissage incrémental
+(cf. apprendre_incremental) parcourt la base : seuls les mails nouveaux ou modifiés sont lus et ajoutés
+aux comptes, ceux qui ont été supprimés (ou modifiés) en sont retirés à partir du manifeste.
+
+Le manifeste conserve également les comptes des mails qu'il décrit (l'agrégat), distincts de ceux du filtre :
+l'écart entre le filtre de base et l'agrégat (apprentissage en ligne intégré par une compaction, cf. moduleJournal)
+est reporté tel quel sur le filtre mis à jour. Seul un changement de dictionnaire impose de tout réapprendre.
+Le journal du filtre est conservé.
+"""
+
+from array import array
+from glob import glob
+import os
+import sqlite3
+from moduleFiltreAntiSpam import lire_mots_presents_parallele, charger_filtre_sans_journal, sauvegarder_filtre, EPSILON
+from moduleFormatBinaire import est_filtre_binaire, sauvegarder_filtre_binaire
+from moduleJournal import verrou_journal, terminer_compaction, empreinte_fichier
+from moduleCache import empreinte_dictionnaire
+
+#: Extension du manifeste d'un filtre
+EXTENSION_MANIFESTE = ".manifeste"
+
+def chemin_manifeste(cheminFiltre):
+    """
+    Retourne le chemin du manifeste d'un filtre.
+    """
+    return cheminFiltre + EXTENSION_MANIFESTE
+
+
+def supprimer_manifeste(cheminFiltre):
+    """
+    Supprime le manifeste d'un filtre s'il existe (le filtre a été réappris sans manifeste).
+    """
+    try:
+        os.remove(chemin_manifeste(cheminFiltre))
+    except FileNotFoundError:
+        pass
+
+def _numeros(indices):
+    """
+    Retourne les numéros (dans le dictionnaire trié) des mots présents enregistrés pour un mail.
+    """
+    numeros = array('I')
+    numeros.frombytes(indices)
+    return numeros
+
+
+class ManifesteApprentissage:
+    """
+    Manifeste (base sqlite) des mails appris par un filtre.
+    """
+
+    def __init__(self, cheminManifeste, vocabulaire):
+        """
+        Parameters
+        ----------
+        cheminManifeste : str
+            Le chemin du fichier du manifeste (créé s'il n'existe pas).
+        vocabulaire : iterable
+            Les mots (capitalisés) du dictionnaire.
+        """
+        self.mots = sorted(vocabulaire)
+        self.indexMots = {mot: i for (i, mot) in enumerate(self.mots)}
+        self.empreinte = empreinte_dictionnaire(self.mots)
+        self.connexion = sqlite3.connect(cheminManifeste)
+        self.connexion.execute("CREATE TABLE IF NOT EXISTS manifeste (chemin TEXT PRIMARY KEY, spam INTEGER, taille INTEGER,"
+                               " mtime INTEGER, indices BLOB)")
+        self.connexion.execute("CREATE TABLE IF NOT EXISTS proprietes (cle TEXT PRIMARY KEY, valeur TEXT)")
+        self.connexion.execute("CREATE TABLE IF NOT EXISTS agregat (cle TEXT PRIMARY KEY, valeurs BLOB)")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.fermer()
+
+    def fermer(self):
+        """
+        Ferme le manifeste.
+        """
+        self.connexion.close()
+
+    def proprietes(self):
+        """
+        Retourne les propriétés du manifeste (dictionnaire clé -> valeur).
+        """
+        return dict(self.connexion.execute("SELECT cle, valeur FROM proprietes"))
+
+    def decrit(self, dicoComptes):
+        """
+        Vérifie que le manifeste a été établi avec le dictionnaire d'un filtre.
+        """
+        return self.proprietes().get('empreinte') == self.empreinte == empreinte_dictionnaire(dicoComptes)
+
+    def _comptes(self, prefixe):
+        """
+        Retourne des comptes enregistrés (tableaux spam et ham, nombres de spams et de hams), ou None.
+        """
+        tableaux = dict(self.connexion.execute("SELECT cle, valeurs FROM agregat WHERE cle IN (?, ?)",
+                                               (prefixe + 'Spam', prefixe + 'Ham')))
+        proprietes = self.proprietes()
+        if len(tableaux) != 2 or 'nb' + prefixe + 'Spam' not in proprietes:
+            return None
+        comptes = []
+        for cle in (prefixe + 'Spam', prefixe + 'Ham'):
+            tableau = array('q')
+            tableau.frombytes(tableaux[cle])
+            comptes.append(tableau)
+        return (comptes[0], comptes[1], int(proprietes['nb' + prefixe + 'Spam']), int(proprietes['nb' + prefixe + 'Ham']))
+
+    def _enregistrer_comptes(self, prefixe, comptesSpam, comptesHam, nbSpam, nbHam):
+        """
+        Enregistre des comptes (dans la transaction en cours).
+        """
+        self.connexion.executemany("INSERT OR REPLACE INTO agregat VALUES (?, ?)",
+                                   [(prefixe + 'Spam', comptesSpam.tobytes()), (prefixe + 'Ham', comptesHam.tobytes())])
+        self.connexion.executemany("INSERT OR REPLACE INTO proprietes VALUES (?, ?)",
+                                   [('nb' + prefixe + 'Spam', str(nbSpam)), ('nb' + prefixe + 'Ham', str(nbHam))])
+
+    def enregistrer_agregat(self, comptesSpam, comptesHam, nbSpam, nbHam):
+        """
+        Enregistre les comptes des mails du manifeste (dans la transaction en cours, cf. agregat).
+        """
+        self._enregistrer_comptes('Agregat', comptesSpam, comptesHam, nbSpam, nbHam)
+
+    def agregat(self):
+        """
+        Retourne les comptes des mails du manifeste (recalculés depuis les mails pour un manifeste qui ne les contient pas).
+
+        Returns
+        -------
+        tuple
+            (comptes spam, comptes ham, nbSpam, nbHam) : les comptes sont des tableaux dans l'ordre du dictionnaire trié.
+        """
+        agregat = self._comptes('Agregat')
+        if agregat is not None:
+            return agregat
+        (comptesSpam, comptesHam) = (array('q', bytes(8 * len(self.mots))), array('q', bytes(8 * len(self.mots))))
+        (nbSpam, nbHam) = (0, 0)
+        for (isSpam, _, _, indices) in self.entrees().values():
+            comptes = comptesSpam if isSpam else comptesHam
+            for j in _numeros(indices):
+                comptes[j] += 1
+            (nbSpam, nbHam) = (nbSpam + 1, nbHam) if isSpam else (nbSpam, nbHam + 1)
+        return (comptesSpam, comptesHam, nbSpam, nbHam)
+
+    def ecart_en_cours(self, cheminFiltre):
+        """
+        Retourne l'écart (cf. preparer) d'une mise à jour interrompue après le remplacement du filtre,
+        mais avant la validation du manifeste : None si le filtre n'est pas celui de cette mise à jour.
+        """
+        enCours = self.proprietes().get('enCours')
+        if enCours is None or empreinte_fichier(cheminFiltre) != enCours:
+            return None
+        return self._comptes('Ecart')
+
+    def preparer(self, cheminTemporaire, ecart):
+        """
+        Enregistre, avant qu'il ne remplace le filtre, l'empreinte du filtre mis à jour et l'écart qu'il contient
+        (comptes spam, comptes ham, nbSpam, nbHam ne provenant pas des mails du manifeste).
+        """
+        with self.connexion:
+            self._enregistrer_comptes('Ecart', *ecart)
+            self.connexion.execute("INSERT OR REPLACE INTO proprietes VALUES (?, ?)",
+                                   ('enCours', empreinte_fichier(cheminTemporaire)))
+
+    def entrees(self):
+        """
+        Retourne les mails du manifeste.
+
+        Returns
+        -------
+        dict
+            Pour chaque chemin, le tuple (isSpam, taille, date de modification, indices des mots présents).
+        """
+        return {chemin: (bool(spam), taille, mtime, indices)
+                for (chemin, spam, taille, mtime, indices) in self.connexion.execute("SELECT * FROM manifeste")}
+
+    def mots_presents(self, indices):
+        """
+        Retourne les mots présents d'un mail du manifeste.
+        """
+        return [self.mots[j] for j in _numeros(indices)]
+
+    def indices(self, mots):
+        """
+        Retourne les mots présents d'un mail sous la forme enregistrée dans le manifeste.
+        """
+        return array('I', sorted(self.indexMots[mot] for mot in mots)).tobytes()
+
+
+def mails_base(dossierSpam, dossierHam):
+    """
+    Retourne les mails (.txt) de la base d'apprentissage.
+
+    Returns
+    -------
+    dict
+        Pour chaque chemin absolu, le tuple (isSpam, taille, date de modification).
+    """
+    mails = {}
+    for (isSpam, dossier) in ((True, dossierSpam), (False, dossierHam)):
+        for fichierMail in glob(dossier + '/*.txt'):
+            chemin = os.path.abspath(fichierMail)
+            stat = os.stat(chemin)
+            mails[chemin] = (isSpam, stat.st_size, stat.st_mtime_ns)
+    return mails
+
+
+def apprendre_incremental(cheminFiltre, dicoComptes, dossierSpam, dossierHam, nbJobs=1, binaire=None):
+    """
+    Met à jour un filtre (ou l'apprend s'il n'existe pas) sur l'ensemble des mails de la base d'apprentissage :
+    seuls les mails nouveaux ou modifiés depuis le précédent apprentissage sont lus, ceux qui ont été supprimés
+    sont retirés des comptes. Le filtre obtenu est identique à celui appris sur toute la base, auquel s'ajoute
+    l'écart entre le filtre existant et les mails du manifeste (apprentissage en ligne intégré par compaction).
+    Le filtre est remplacé de manière atomique (os.replace) ; son journal est conservé.
+
+    Parameters
+    ----------
+    cheminFiltre : str
+        Le chemin du fichier du filtre.
+    dicoComptes : dict
+        Le dictionnaire (comptes nuls, cf. charger_dictionnaire).
+    dossierSpam : str
+        Le chemin du dossier qui contient tous les spams de la base d'apprentissage.
+    dossierHam : str
+        Le chemin du dossier qui contient tous les hams de la base d'apprentissage.
+    nbJobs : int
+        Le nombre de processus utilisés pour lire les mails.
+    binaire : bool
+        Sauvegarde le filtre au format binaire (None : le format du filtre existant, json sinon).
+
+    Returns
+    -------
+    dict
+        Les nombres de spams et de hams appris, de mails lus et de mails retirés, si le filtre a été
+        entièrement réappris et si l'écart d'un filtre existant (apprentissage en ligne compacté) a été abandonné.
+
+    Raises
+    ------
+    ValueError
+        Si aucun mail n'est appris ou si le filtre a été modifié pendant l'apprentissage.
+    """
+    with ManifesteApprentissage(chemin_manifeste(cheminFiltre), dicoComptes) as manifeste:
+        nbMots = len(manifeste.mots)
+        base = None
+        if os.path.exists(cheminFiltre):
+            statBase = os.stat(cheminFiltre)
+            try:
+                base = charger_filtre_sans_journal(cheminFiltre)
+            except ValueError:  # Filtre haché ou invalide : réappris
+                base = None
+            if binaire is None:
+                binaire = est_filtre_binaire(cheminFiltre)
+
+        if base is not None and manifeste.decrit(base[0]):
+            (comptesSpam, comptesHam, nbSpam, nbHam) = manifeste.agregat()
+            # Écart entre le filtre et les mails du manifeste, sauf si le filtre est celui d'une mise à jour interrompue
+            ecart = manifeste.ecart_en_cours(cheminFiltre)
+            if ecart is None:
+                (dicoBase, nbSpamBase, nbHamBase, _) = base
+                ecart = (array('q', (dicoBase[mot][0] - comptesSpam[i] for (i, mot) in enumerate(manifeste.mots))),
+                         array('q', (dicoBase[mot][1] - comptesHam[i] for (i, mot) in enumerate(manifeste.mots))),
+                         nbSpamBase - nbSpam, nbHamBase - nbHam)
+            epsilon = base[3]
+            entrees = manifeste.entrees()
+            reconstruction = False
+        else:   # L'epsilon d'un filtre existant (optimisé par exemple, cf. optimiser_filtre.py) est conservé
+            (comptesSpam, comptesHam, nbSpam, nbHam) = (array('q', bytes(8 * nbMots)), array('q', bytes(8 * nbMots)), 0, 0)
+            ecart = (array('q', bytes(8 * nbMots)), array('q', bytes(8 * nbMots)), 0, 0)
+            epsilon = base[3] if base is not None else EPSILON
+            entrees = {}
+            reconstruction = True
+
+        # Mails supprimés ou modifiés : retirés des comptes
+        mails = mails_base(dossierSpam, dossierHam)
+        retires = [chemin for (chemin, entree) in entrees.items() if mails.get(chemin) != entree[:3]]
+        for chemin in retires:
+            (isSpam, _, _, indices) = entrees[chemin]
+            comptes = comptesSpam if isSpam else comptesHam
+            for j in _numeros(indices):
+                comptes[j] -= 1
+            (nbSpam, nbHam) = (nbSpam - 1, nbHam) if isSpam else (nbSpam, nbHam - 1)
+
+        # Mails nouveaux ou modifiés : lus et ajoutés aux comptes
+        ajoutes = [chemin for (chemin, mail) in mails.items() if chemin not in entrees or entrees[chemin][:3] != mail]
+        lignes = []
+        for (chemin, mots) in zip(ajoutes, lire_mots_presents_parallele(ajoutes, dicoComptes, nbJobs)):
+            (isSpam, taille, mtime) = mails[chemin]
+            indices = manifeste.indices(mots)
+            comptes = comptesSpam if isSpam else comptesHam
+            for j in _numeros(indices):
+                comptes[j] += 1
+            (nbSpam, nbHam) = (nbSpam + 1, nbHam) if isSpam else (nbSpam, nbHam + 1)
+            lignes.append((chemin, int(isSpam), taille, mtime, indices))
+
+        # Filtre mis à jour : comptes des mails du manifeste et écart, dans l'ordre du dictionnaire
+        (ecartSpam, ecartHam, ecartNbSpam, ecartNbHam) = ecart
+        for mot in dicoComptes:
+            i = manifeste.indexMots[mot]
+            dicoComptes[mot] = [comptesSpam[i] + ecartSpam[i], comptesHam[i] + ecartHam[i]]
+        (nbSpamFiltre, nbHamFiltre) = (nbSpam + ecartNbSpam, nbHam + ecartNbHam)
+        if nbSpamFiltre + nbHamFiltre == 0:
+            raise ValueError("Aucun mail à apprendre.")
+
+        # Le manifeste n'est validé qu'une fois le filtre remplacé
+        cheminTemporaire = cheminFiltre + ".tmp"
+        sauvegarde = sauvegarder_filtre_binaire if binaire else sauvegarder_filtre
+        sauvegarde(cheminTemporaire, dicoComptes, nbSpamFiltre, nbHamFiltre, epsilon)
+        manifeste.preparer(cheminTemporaire, ecart)
+        with manifeste.connexion:
+            if reconstruction:
+                manifeste.connexion.execute("DELETE FROM manifeste")
+            manifeste.connexion.executemany("DELETE FROM manifeste WHERE chemin = ?", [(chemin,) for chemin in retires])
+            manifeste.connexion.executemany("INSERT INTO manifeste VALUES (?, ?, ?, ?, ?)", lignes)
+            manifeste.enregistrer_agregat(comptesSpam, comptesHam, nbSpam, nbHam)
+            manifeste.connexion.execute("INSERT OR REPLACE INTO proprietes VALUES (?, ?)", ('empreinte', manifeste.empreinte))
+            manifeste.connexion.execute("DELETE FROM proprietes WHERE cle = 'enCours'")
+            with verrou_journal(cheminFiltre, exclusif=True) as journal:   # Pas de compaction concurrente
+                if base is not None and os.stat(cheminFiltre).st_mtime_ns != statBase.st_mtime_ns:
+                    os.remove(cheminTemporaire)
+                    raise ValueError("Le filtre " + cheminFiltre + " a été modifié pendant l'apprentissage.")
+                terminer_compaction(journal)    # Les entrées déjà intégrées à l'ancien filtre ne s'appliquent plus
+                os.replace(cheminTemporaire, cheminFiltre)
+
+    return {'nbSpam': nbSpamFiltre, 'nbHam': nbHamFiltre, 'nbLus': len(ajoutes), 'nbRetires': len(retires),
+            'reconstruction': reconstruction, 'ecartAbandonne': reconstruction and base is not None}
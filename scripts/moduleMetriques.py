@@ -0,0 +1,225 @@
+"""
+Module contenant l'instrumentation (optionnelle) du filtre anti-spam : chronomètres par étape
+(temps mural et temps CPU) et compteurs (fichiers lus, octets lus, mots, mots du dictionnaire,
+messages prédits, mises à jour...).
+
+L'instrumentation est désactivée par défaut et ne coûte alors qu'un test par appel.
+Elle s'active avec la variable d'environnement FILTRE_METRIQUES (chemin du fichier de sortie,
+ou '-' pour la sortie d'erreur) ou avec l'option --metriques des scripts ; le résumé est écrit
+à la fin du programme, au format texte de Prometheus si le fichier se termine par .prom, en json sinon.
+La variable FILTRE_PROFIL (ou l'option --profil) désigne une étape à profiler avec cProfile.
+
+Seules les étapes exécutées dans le processus principal sont mesurées (pas celles des processus
+de lire_mots_presents_parallele, compter_mails_parallele et evaluer_base).
+"""
+
+from collections import Counter
+from contextlib import nullcontext
+import atexit
+import cProfile
+import io
+import json
+import os
+import pstats
+import sys
+import time
+
+#: Vrai si l'instrumentation est activée
+ACTIF = False
+#: Préfixe des noms des métriques au format Prometheus
+PREFIXE_PROMETHEUS = "filtre_anti_spam_"
+#: Nombre de fonctions affichées dans le profil
+NB_LIGNES_PROFIL = 25
+
+#: Les compteurs (nom -> valeur)
+compteurs = Counter()
+#: Les chronomètres (nom de l'étape -> [nombre d'appels, temps mural, temps CPU])
+chronometres = {}
+
+_sortie = None
+_etapeProfilee = None
+_profil = None
+_RIEN = nullcontext()
+
+class _Etape:
+    """
+    Chronomètre d'une exécution d'une étape (cf. etape).
+    """
+    __slots__ = ('nom', 'debutMural', 'debutCpu')
+
+    def __init__(self, nom):
+        self.nom = nom
+
+    def __enter__(self):
+        if self.nom == _etapeProfilee:
+            _profil.enable()
+        self.debutMural = time.perf_counter()
+        self.debutCpu = time.process_time()
+        return self
+
+    def __exit__(self, *args):
+        mural = time.perf_counter() - self.debutMural
+        cpu = time.process_time() - self.debutCpu
+        if self.nom == _etapeProfilee:
+            _profil.disable()
+        chronometre = chronometres.get(self.nom)
+        if chronometre is None:
+            chronometres[self.nom] = [1, mural, cpu]
+        else:
+            chronometre[0] += 1
+            chronometre[1] += mural
+            chronometre[2] += cpu
+
+
+def etape(nom):
+    """
+    Retourne un gestionnaire de contexte chronométrant une étape (sans effet si l'instrumentation est désactivée).
+
+    Parameters
+    ----------
+    nom : str
+        Le nom de l'étape (par exemple 'lecture', 'tokenisation' ou 'prediction').
+
+    Returns
+    -------
+    gestionnaire de contexte
+        Le chronomètre de l'étape.
+    """
+    if not ACTIF:
+        return _RIEN
+    return _Etape(nom)
+
+
+def incrementer(nom, valeur=1):
+    """
+    Incrémente un compteur (à n'appeler que si ACTIF est vrai, afin d'éviter tout calcul inutile).
+
+    Parameters
+    ----------
+    nom : str
+        Le nom du compteur.
+    valeur : int
+        La valeur à ajouter.
+    """
+    compteurs[nom] += valeur
+
+
+def resume():
+    """
+    Retourne le résumé des métriques.
+
+    Returns
+    -------
+    dict
+        'compteurs' : nom -> valeur,
+        'etapes' : nom de l'étape -> dictionnaire (appels, secondes, secondesCpu).
+    """
+    return {'compteurs': dict(compteurs),
+            'etapes': {nom: {'appels': appels, 'secondes': mural, 'secondesCpu': cpu}
+                       for (nom, (appels, mural, cpu)) in chronometres.items()}}
+
+
+def format_prometheus():
+    """
+    Retourne les métriques au format texte de Prometheus.
+
+    Returns
+    -------
+    str
+        Les métriques (une par ligne).
+    """
+    lignes = []
+    for nom in sorted(compteurs):
+        metrique = PREFIXE_PROMETHEUS + nom + "_total"
+        lignes.append("# TYPE " + metrique + " counter")
+        lignes.append(metrique + " " + str(compteurs[nom]))
+    for (metrique, position) in (("etape_appels_total", 0), ("etape_secondes_total", 1), ("etape_secondes_cpu_total", 2)):
+        lignes.append("# TYPE " + PREFIXE_PROMETHEUS + metrique + " counter")
+        for nom in sorted(chronometres):
+            lignes.append(PREFIXE_PROMETHEUS + metrique + '{etape="' + nom + '"} ' + repr(chronometres[nom][position]))
+    return "\n".join(lignes) + "\n"
+
+
+def ecrire_metriques(cheminSortie):
+    """
+    Écrit les métriques dans un fichier (format Prometheus si le fichier se termine par .prom, json sinon)
+    ou sur la sortie d'erreur si le chemin est '-'.
+
+    Parameters
+    ----------
+    cheminSortie : str
+        Le chemin du fichier de sortie.
+    """
+    if cheminSortie == '-':
+        print(json.dumps(resume(), indent=2), file=sys.stderr)
+        return
+    with open(cheminSortie, 'w') as f:
+        if cheminSortie.endswith('.prom'):
+            f.write(format_prometheus())
+        else:
+            json.dump(resume(), f, indent=2)
+
+
+def _terminer():
+    """
+    Écrit les métriques et le profil à la fin du programme.
+    """
+    if _profil is not None:
+        sortieProfil = io.StringIO()
+        pstats.Stats(_profil, stream=sortieProfil).sort_stats('cumulative').print_stats(NB_LIGNES_PROFIL)
+        print("Profil de l'étape '" + _etapeProfilee + "' :\n" + sortieProfil.getvalue(), file=sys.stderr)
+    ecrire_metriques(_sortie)
+
+
+def activer(cheminSortie, etapeProfilee=None):
+    """
+    Active l'instrumentation ; les métriques seront écrites à la fin du programme.
+
+    Parameters
+    ----------
+    cheminSortie : str
+        Le fichier de sortie des métriques (cf. ecrire_metriques).
+    etapeProfilee : str
+        Le nom d'une étape à profiler avec cProfile (profil affiché sur la sortie d'erreur), ou None.
+    """
+    global ACTIF, _sortie, _etapeProfilee, _profil
+    if not ACTIF:
+        atexit.register(_terminer)
+    ACTIF = True
+    _sortie = cheminSortie
+    if etapeProfilee is not None:
+        _etapeProfilee = etapeProfilee
+        _profil = cProfile.Profile()
+
+
+def ajouter_arguments(parser):
+    """
+    Ajoute les options --metriques et --profil à un parser d'arguments.
+
+    Parameters
+    ----------
+    parser : argparse.ArgumentParser
+        Le parser des arguments du script.
+    """
+    parser.add_argument("--metriques", metavar="fichier", dest="metriques",
+                        help="active l'instrumentation et écrit les métriques à la fin du programme\n"
+                             "(format Prometheus si le fichier se termine par .prom, json sinon, '-' pour la sortie d'erreur).")
+    parser.add_argument("--profil", metavar="étape", dest="profil",
+                        help="profile une étape (lecture, tokenisation, prediction...) avec cProfile (avec --metriques).")
+
+
+def activer_depuis_arguments(args):
+    """
+    Active l'instrumentation si l'option --metriques est présente (cf. ajouter_arguments).
+
+    Parameters
+    ----------
+    args : argparse.Namespace
+        Les arguments du script.
+    """
+    if args.metriques is not None:
+        activer(args.metriques, args.profil)
+
+
+if os.environ.get('FILTRE_METRIQUES'):
+    activer(os.environ['FILTRE_METRIQUES'], os.environ.get('FILTRE_PROFIL') or None)
@@ -0,0 +1,144 @@
+"""
+Module contenant le réglage des hyperparamètres du filtre anti-spam (EPSILON et minNbOfChar)
+par validation croisée à k plis.
+
+La base n'est lue qu'une fois (matrice creuse de présence, cf. moduleVectorise) ; pour chaque pli,
+les comptes d'apprentissage s'obtiennent par soustraction des comptes du pli aux comptes totaux,
+puis chaque configuration (epsilon, nombre minimal de caractères) est évaluée analytiquement :
+lissage des comptes, masquage des mots trop courts et somme des deltas des mots présents.
+"""
+
+from multiprocessing import Pool
+import random
+import numpy as np
+from moduleVectorise import matrice_presence
+
+#: Données des processus de valider_configurations
+_donneesTravailleur = None
+
+def _initialiser_travailleur(donnees):
+    """
+    Initialise un processus de valider_configurations avec la base et les configurations.
+    """
+    global _donneesTravailleur
+    _donneesTravailleur = donnees
+
+
+def plis_aleatoires(nbDocuments, nbPlis, graine):
+    """
+    Répartit aléatoirement (mais de façon reproductible) les documents en plis de tailles égales (à un près).
+
+    Returns
+    -------
+    numpy.ndarray
+        Le numéro du pli de chaque document.
+    """
+    plis = [i % nbPlis for i in range(nbDocuments)]
+    random.Random(graine).shuffle(plis)
+    return np.array(plis, dtype=np.int32)
+
+
+def _erreurs_pli(pli):
+    """
+    Évalue toutes les configurations sur un pli, les autres plis servant à l'apprentissage.
+
+    Returns
+    -------
+    list
+        Pour chaque configuration, le couple (erreurs sur les spams, erreurs sur les hams) du pli.
+    """
+    (indptr, indices, estSpam, plis, longueurs, configurations) = _donneesTravailleur
+    nbMots = len(longueurs)
+    lignes = np.repeat(np.arange(len(estSpam)), np.diff(indptr))   # Numéro du document de chaque présence
+    dansPli = plis[lignes] == pli
+    test = plis == pli
+
+    # Comptes d'apprentissage : comptes totaux - comptes du pli
+    comptes = []
+    for classe in (True, False):
+        presencesClasse = estSpam[lignes] == classe
+        total = np.bincount(indices[presencesClasse], minlength=nbMots)
+        duPli = np.bincount(indices[presencesClasse & dansPli], minlength=nbMots)
+        nbDocuments = int(np.sum(estSpam == classe)) - int(np.sum(estSpam[test] == classe))
+        comptes.append((total - duPli, nbDocuments))
+    ((comptesSpam, nbSpam), (comptesHam, nbHam)) = comptes
+
+    lignesTest = lignes[dansPli]
+    indicesTest = indices[dansPli]
+    documentsTest = np.flatnonzero(test)
+    renumerotation = np.zeros(len(estSpam), dtype=np.int64)
+    renumerotation[documentsTest] = np.arange(len(documentsTest))
+    lignesTest = renumerotation[lignesTest]
+    spamsTest = estSpam[documentsTest]
+
+    erreurs = []
+    for (epsilon, minNbOfChar) in configurations:
+        masque = longueurs >= minNbOfChar
+        scores = []
+        for (comptesClasse, nbClasse, apriori) in ((comptesSpam, nbSpam, nbSpam / (nbSpam + nbHam)),
+                                                   (comptesHam, nbHam, nbHam / (nbSpam + nbHam))):
+            p = (comptesClasse + epsilon) / (nbClasse + 2*epsilon)
+            logAbsents = np.where(masque, np.log1p(-p), 0.)
+            deltas = np.where(masque, np.log(p), 0.) - logAbsents
+            base = np.log(apriori) + np.sum(logAbsents)
+            scores.append(base + np.bincount(lignesTest, weights=deltas[indicesTest], minlength=len(documentsTest)))
+        predictionsSpam = scores[0] >= scores[1]
+        erreurs.append((int(np.sum(spamsTest & ~predictionsSpam)), int(np.sum(~spamsTest & predictionsSpam))))
+    return erreurs
+
+
+def valider_configurations(fichiersSpam, fichiersHam, dicoComptes, configurations, nbPlis, nbJobs=1, graine=0, cache=None):
+    """
+    Évalue par validation croisée à k plis chaque configuration (epsilon, nombre minimal de caractères des mots),
+    en ne lisant qu'une fois la base.
+
+    Parameters
+    ----------
+    fichiersSpam : list
+        Les chemins des spams de la base.
+    fichiersHam : list
+        Les chemins des hams de la base.
+    dicoComptes : dict
+        Le dictionnaire, chargé avec le plus petit nombre minimal de caractères des configurations.
+    configurations : list
+        Les couples (epsilon, nombre minimal de caractères) à évaluer.
+    nbPlis : int
+        Le nombre de plis de la validation croisée.
+    nbJobs : int
+        Le nombre de processus (les plis sont évalués en parallèle).
+    graine : int
+        La graine de la répartition aléatoire des mails dans les plis.
+    cache : CacheTraits
+        Le cache des mots présents dans les mails (cf. moduleCache), ou None.
+
+    Returns
+    -------
+    list
+        Pour chaque configuration, un dictionnaire (epsilon, minNbOfChar, nbSpams, nbHams,
+        tauxErreurSpam, tauxErreurHam, tauxErreur).
+    """
+    mots = list(dicoComptes)
+    indexMots = {mot: i for (i, mot) in enumerate(mots)}
+    (indptr, indices) = matrice_presence(fichiersSpam + fichiersHam, indexMots, cache)
+    estSpam = np.array([True] * len(fichiersSpam) + [False] * len(fichiersHam))
+    plis = plis_aleatoires(len(estSpam), nbPlis, graine)
+    longueurs = np.array([len(mot) for mot in mots])
+
+    donnees = (indptr, indices, estSpam, plis, longueurs, configurations)
+    if nbJobs > 1:
+        with Pool(min(nbJobs, nbPlis), initializer=_initialiser_travailleur, initargs=(donnees,)) as pool:
+            erreursPlis = pool.map(_erreurs_pli, range(nbPlis))
+    else:
+        _initialiser_travailleur(donnees)
+        erreursPlis = [_erreurs_pli(pli) for pli in range(nbPlis)]
+
+    (nbSpams, nbHams) = (len(fichiersSpam), len(fichiersHam))
+    resultats = []
+    for (i, (epsilon, minNbOfChar)) in enumerate(configurations):
+        erreursSpam = sum(erreurs[i][0] for erreurs in erreursPlis)
+        erreursHam = sum(erreurs[i][1] for erreurs in erreursPlis)
+        resultats.append({'epsilon': epsilon, 'minNbOfChar': minNbOfChar, 'nbSpams': nbSpams, 'nbHams': nbHams,
+                          'tauxErreurSpam': erreursSpam / nbSpams if nbSpams else None,
+                          'tauxErreurHam': erreursHam / nbHams if nbHams else None,
+                          'tauxErreur': (erreursSpam + erreursHam) / (nbSpams + nbHams)})
+    return resultats
@@ -0,0 +1,159 @@
+"""
+Module contenant l'hébergement d'un filtre en mémoire partagée pour des processus (pré-forkés) de classement.
+
+Le filtre est publié une fois au format binaire (cf. moduleFormatBinaire) dans un répertoire de partage,
+par défaut sur /dev/shm (système de fichiers en mémoire) : chaque processus le projette en lecture seule (mmap),
+sans copie, les pages étant partagées par tous les processus. Les mots sont recherchés directement dans
+la table de hachage projetée (cf. moduleFormatBinaire) : aucun index n'est construit par processus.
+Chaque publication crée une nouvelle version (filtre-<version>.bin) puis remplace de manière atomique (os.replace)
+le fichier 'courant' qui désigne la version en service ; un processus passe à la nouvelle version lorsqu'il appelle
+FiltrePartage.actualiser.
+Les versions antérieures à la précédente sont supprimées (les processus qui les projettent encore les gardent
+lisibles jusqu'à leur actualisation).
+"""
+
+from contextlib import contextmanager
+import fcntl
+import glob
+import os
+import tempfile
+from moduleFiltreAntiSpam import charger_filtre
+from moduleFormatBinaire import serialiser_filtre_binaire, charger_filtre_binaire
+from moduleClassifieur import FiltreAntiSpam
+
+#: Répertoire de partage par défaut (en mémoire si /dev/shm existe)
+DEFAULT_DOSSIER_PARTAGE = os.path.join('/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir(), 'filtre_anti_spam')
+#: Fichier désignant la version en service
+FICHIER_COURANT = 'courant'
+#: Verrou des publications
+FICHIER_VERROU = '.verrou'
+
+def chemin_version(dossier, version):
+    """
+    Retourne le chemin du filtre binaire d'une version.
+    """
+    return os.path.join(dossier, 'filtre-' + str(version) + '.bin')
+
+
+def version_courante(dossier):
+    """
+    Retourne la version en service dans un répertoire de partage (0 si aucun filtre n'a été publié).
+    """
+    try:
+        with open(os.path.join(dossier, FICHIER_COURANT)) as f:
+            return int(f.read())
+    except FileNotFoundError:
+        return 0
+
+
+@contextmanager
+def _verrou_publication(dossier):
+    """
+    Sérialise les publications dans un répertoire de partage (fcntl.flock).
+    """
+    with open(os.path.join(dossier, FICHIER_VERROU), 'a') as verrou:
+        fcntl.flock(verrou, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(verrou, fcntl.LOCK_UN)
+
+
+def _remplacer(chemin, contenu):
+    """
+    Écrit un fichier de manière atomique (fichier temporaire puis os.replace).
+    """
+    cheminTemporaire = chemin + '.tmp'
+    with open(cheminTemporaire, 'wb') as f:
+        f.write(contenu)
+    os.replace(cheminTemporaire, chemin)
+
+
+def publier_filtre(dossier, dicoComptes, nbSpam, nbHam, epsilon):
+    """
+    Publie un filtre dans un répertoire de partage et le met en service.
+
+    Parameters
+    ----------
+    dossier : str
+        Le répertoire de partage (créé s'il n'existe pas).
+    dicoComptes : dict
+        Les comptes [nbSpam, nbHam] de chaque mot sous forme de dictionnaire.
+    nbSpam : int
+        Le nombre totale de spams que le classifieur a appris.
+    nbHam : int
+        Le nombre totale de hams que le classifieur a appris.
+    epsilon : int
+        Paramètre du lissage.
+
+    Returns
+    -------
+    int
+        La version publiée.
+    """
+    os.makedirs(dossier, exist_ok=True)
+    contenu = serialiser_filtre_binaire(dicoComptes, nbSpam, nbHam, epsilon)
+    with _verrou_publication(dossier):
+        version = version_courante(dossier) + 1
+        _remplacer(chemin_version(dossier, version), contenu)
+        _remplacer(os.path.join(dossier, FICHIER_COURANT), str(version).encode())
+        # On garde la version précédente : un processus peut avoir lu 'courant' juste avant son remplacement
+        for chemin in glob.glob(os.path.join(dossier, 'filtre-*.bin')):
+            numero = os.path.basename(chemin)[len('filtre-'):-len('.bin')]
+            if numero.isdigit() and int(numero) < version - 1:
+                os.remove(chemin)
+    return version
+
+
+def publier_fichier(dossier, cheminFiltre):
+    """
+    Publie le filtre d'un fichier (json ou binaire, journal compris) dans un répertoire de partage (cf. publier_filtre).
+
+    Raises
+    ------
+    ValueError
+        Si le fichier passé en paramètre n'est pas un fichier de filtre valide.
+    """
+    return publier_filtre(dossier, *charger_filtre(cheminFiltre))
+
+
+class FiltrePartage:
+    """
+    Filtre publié dans un répertoire de partage, projeté en lecture seule par un processus de classement.
+    Le filtre en service (FiltreAntiSpam) est remplacé d'un bloc par actualiser.
+    """
+    __slots__ = ('dossier', 'version', 'filtre')
+
+    def __init__(self, dossier=DEFAULT_DOSSIER_PARTAGE):
+        self.dossier = dossier
+        self.version = 0
+        self.filtre = None
+        if not self.actualiser():
+            raise ValueError("Aucun filtre n'est publié dans " + dossier + ".")
+
+    def actualiser(self):
+        """
+        Passe à la version en service si elle a changé.
+
+        Returns
+        -------
+        bool
+            Vrai si une nouvelle version a été projetée.
+        """
+        while True:
+            version = version_courante(self.dossier)
+            if version == self.version:
+                return False
+            try:
+                modele = charger_filtre_binaire(chemin_version(self.dossier, version))
+            except FileNotFoundError:   # Remplacée entre-temps par une publication plus récente
+                continue
+            # Ni copie ni index propre au processus : le filtre s'appuie sur la projection partagée
+            (self.filtre, self.version) = (FiltreAntiSpam.depuis_binaire(modele), version)
+            return True
+
+    def classer(self, message, nettoyer=False):
+        """
+        Classe un message avec la version en service (cf. FiltreAntiSpam.classer).
+        """
+        return self.filtre.classer(message, nettoyer)
@@ -0,0 +1,292 @@
+"""
+Module contenant les sources de messages : lecture en flux (générateurs, mémoire bornée par la taille
+d'un message) des mails d'un répertoire de fichiers .txt, d'un Maildir, d'un fichier mbox
+et d'archives .gz, .tar, .tar.gz/.tgz, ainsi que le nettoyage optionnel des messages
+(suppression des en-têtes et des pièces jointes non textuelles).
+
+Chaque message est identifié par le chemin de son fichier, complété pour les messages
+d'une archive par le numéro du message dans un mbox (archive.mbox:12) ou le nom du membre
+d'une archive tar (archive.tar.gz/membre).
+"""
+
+from email import message_from_string
+from email.policy import default as politiqueDefaut
+from glob import glob
+from itertools import islice
+import gzip
+import html
+import os
+import re
+import tarfile
+from moduleUtils import iterer_chemins
+
+#: Extensions des archives tar
+EXTENSIONS_TAR = ('.tar', '.tar.gz', '.tgz')
+#: Extensions des fichiers mbox
+EXTENSIONS_MBOX = ('.mbox', '.mbx')
+#: Début de la ligne séparant deux messages d'un fichier mbox
+SEPARATEUR_MBOX = b'From '
+
+#: Ligne d'en-tête d'un mail (nom: valeur)
+LIGNE_EN_TETE = re.compile(r'^[!-9;-~]+:')
+#: Balises html
+BALISES_HTML = re.compile(r'<[^>]*>')
+
+def decoder(octets):
+    """
+    Décode le contenu d'un message (utf-8, les octets invalides sont ignorés comme dans lire_contenu).
+    """
+    return octets.decode('utf-8', errors='ignore')
+
+
+def est_maildir(dossier):
+    """
+    Retourne vrai si le dossier est un Maildir (il contient les sous-répertoires cur et new).
+    """
+    return os.path.isdir(os.path.join(dossier, 'cur')) and os.path.isdir(os.path.join(dossier, 'new'))
+
+
+def est_archive(chemin):
+    """
+    Retourne vrai si le fichier est une archive (mbox, .gz, .tar...) pouvant contenir plusieurs messages.
+    """
+    nom = chemin.lower()
+    return nom.endswith(EXTENSIONS_TAR + EXTENSIONS_MBOX + ('.gz',))
+
+
+def est_source_simple(dossier):
+    """
+    Retourne vrai si le dossier ne contient que des mails au format .txt (un message par fichier),
+    c'est-à-dire s'il n'est pas un Maildir et ne contient aucune archive.
+    """
+    if not os.path.isdir(dossier):
+        return True
+    if est_maildir(dossier):
+        return False
+    with os.scandir(dossier) as entrees:
+        return not any(entree.is_file() and est_archive(entree.name) for entree in entrees)
+
+
+def _messages_mbox(lignes, identifiant):
+    """
+    Parcourt les messages d'un fichier mbox (itérable de lignes en octets).
+    Les lignes '>From ' échappées (format mboxrd) sont restaurées.
+    """
+    numero = 0
+    message = None
+    precedenteVide = True
+    for ligne in lignes:
+        if ligne.startswith(SEPARATEUR_MBOX) and precedenteVide:
+            if message is not None:
+                yield (identifiant + ":" + str(numero), decoder(b''.join(message)))
+                numero += 1
+            message = []
+        elif message is not None:
+            if ligne.startswith(b'>') and ligne.lstrip(b'>').startswith(SEPARATEUR_MBOX):
+                ligne = ligne[1:]
+            message.append(ligne)
+        precedenteVide = ligne in (b'\n', b'\r\n')
+    if message is not None:
+        yield (identifiant + ":" + str(numero), decoder(b''.join(message)))
+
+
+def _messages_flux(flux, identifiant):
+    """
+    Parcourt les messages d'un flux binaire : un mbox s'il commence par 'From ', un seul message sinon.
+    """
+    debut = flux.peek(len(SEPARATEUR_MBOX))[:len(SEPARATEUR_MBOX)] if hasattr(flux, 'peek') else b''
+    if debut == SEPARATEUR_MBOX:
+        yield from _messages_mbox(flux, identifiant)
+    else:
+        yield (identifiant, decoder(flux.read()))
+
+
+def messages_fichier(chemin):
+    """
+    Parcourt les messages d'un fichier : une archive tar (un message par membre, ou un mbox par membre .mbox),
+    un fichier .gz, un mbox, ou un mail .txt (un message). Un autre fichier est lu comme un mbox
+    s'il commence par 'From ', comme un mail sinon.
+
+    Parameters
+    ----------
+    chemin : str
+        Le chemin du fichier.
+
+    Yields
+    ------
+    tuple
+        (identifiant, contenu) pour chaque message.
+    """
+    nom = chemin.lower()
+    if nom.endswith(EXTENSIONS_TAR):
+        with tarfile.open(chemin, mode='r|*') as archive:   # Lecture en flux, sans index des membres
+            for membre in archive:
+                if not membre.isfile():
+                    continue
+                identifiant = chemin + "/" + membre.name
+                with archive.extractfile(membre) as flux:
+                    if membre.name.lower().endswith(EXTENSIONS_MBOX):
+                        yield from _messages_mbox(flux, identifiant)
+                    else:
+                        yield (identifiant, decoder(flux.read()))
+    elif nom.endswith('.gz'):
+        with gzip.open(chemin, 'rb') as flux:
+            yield from _messages_flux(flux, chemin)
+    elif nom.endswith(EXTENSIONS_MBOX):
+        with open(chemin, 'rb') as flux:
+            yield from _messages_mbox(flux, chemin)
+    elif nom.endswith('.txt'):
+        with open(chemin, 'rb') as flux:
+            yield (chemin, decoder(flux.read()))
+    else:
+        with open(chemin, 'rb') as flux:
+            yield from _messages_flux(flux, chemin)
+
+
+def _fichiers_maildir(dossier):
+    """
+    Parcourt les fichiers (un message par fichier) d'un Maildir.
+    """
+    for sousDossier in ('cur', 'new'):
+        for chemin in sorted(glob(os.path.join(dossier, sousDossier, '*'))):
+            if os.path.isfile(chemin):
+                yield chemin
+
+
+def _messages_dossier(dossier):
+    """
+    Parcourt les messages d'un dossier de la base (cf. iterer_messages).
+    """
+    if est_maildir(dossier):
+        for chemin in _fichiers_maildir(dossier):
+            with open(chemin, 'rb') as flux:
+                yield (chemin, decoder(flux.read()))
+        return
+    for chemin in glob(dossier + '/*.txt'):    # Même ordre que lister_mails
+        with open(chemin, 'rb') as flux:
+            yield (chemin, decoder(flux.read()))
+    for chemin in sorted(glob(os.path.join(dossier, '*'))):
+        if os.path.isfile(chemin) and est_archive(chemin):
+            yield from messages_fichier(chemin)
+
+
+def nettoyer_message(contenu):
+    """
+    Supprime les en-têtes et les pièces jointes non textuelles d'un mail :
+    seul le texte des parties text/plain et text/html (sans les balises) est conservé.
+    Un message sans en-têtes est retourné tel quel.
+
+    Parameters
+    ----------
+    contenu : str
+        Le contenu du message.
+
+    Returns
+    -------
+    str
+        Le texte du message.
+    """
+    if not LIGNE_EN_TETE.match(contenu):
+        return contenu
+    try:
+        message = message_from_string(contenu, policy=politiqueDefaut)
+        textes = []
+        for partie in message.walk():
+            if partie.is_multipart() or partie.get_content_maintype() != 'text' or partie.is_attachment():
+                continue
+            texte = partie.get_content()
+            if partie.get_content_subtype() == 'html':
+                texte = html.unescape(BALISES_HTML.sub(' ', texte))
+            textes.append(texte)
+        return '\n'.join(textes)
+    except (LookupError, ValueError, AttributeError):  # Message mal formé : on garde le corps brut
+        (_, _, corps) = contenu.partition('\n\n')
+        return corps
+
+
+def iterer_messages(dossier, nbMessages=None, nettoyer=False):
+    """
+    Parcourt en flux les messages d'un dossier de la base (spam ou ham) : ses mails .txt (dans le même ordre
+    que lister_mails), puis les messages de ses archives (mbox, .gz, .tar, .tar.gz) ; ou les messages
+    d'un Maildir (sous-répertoires cur et new).
+
+    Parameters
+    ----------
+    dossier : str
+        Le dossier.
+    nbMessages : int
+        Le nombre maximal de messages parcourus (None pour tous).
+    nettoyer : bool
+        Supprime les en-têtes et les pièces jointes des messages (cf. nettoyer_message).
+
+    Yields
+    ------
+    tuple
+        (identifiant, contenu) pour chaque message.
+    """
+    messages = islice(_messages_dossier(dossier), nbMessages)
+    if nettoyer:
+        return ((identifiant, nettoyer_message(contenu)) for (identifiant, contenu) in messages)
+    return messages
+
+
+def iterer_sources(sources, nettoyer=False, surErreur=None):
+    """
+    Parcourt en flux les messages désignés par une liste de sources (cf. iterer_chemins) :
+    chaque fichier est lu avec messages_fichier et un Maildir est parcouru entièrement.
+
+    Parameters
+    ----------
+    sources : list
+        Les sources : répertoires, Maildir, fichiers (mails ou archives), motifs glob ou '-' (entrée standard).
+    nettoyer : bool
+        Supprime les en-têtes et les pièces jointes des messages (cf. nettoyer_message).
+    surErreur : function
+        Fonction appelée avec le chemin et l'exception lorsqu'un fichier est illisible,
+        le parcours continuant alors avec le fichier suivant ; None pour propager l'exception.
+
+    Yields
+    ------
+    tuple
+        (identifiant, contenu) pour chaque message.
+    """
+    for source in sources:
+        if source != '-' and os.path.isdir(source) and est_maildir(source):
+            fichiers = _fichiers_maildir(source)
+        else:
+            fichiers = iterer_chemins([source])
+        for chemin in fichiers:
+            try:
+                for (identifiant, contenu) in messages_fichier(chemin):
+                    yield (identifiant, nettoyer_message(contenu) if nettoyer else contenu)
+            except (OSError, EOFError, tarfile.TarError) as e:
+                if surErreur is None:
+                    raise
+                surErreur(chemin, e)
+
+
+def nombre_messages(dossier):
+    """
+    Retourne le nombre de messages d'un dossier de la base (cf. iterer_messages), ou None s'il contient
+    des archives ou est un Maildir : les messages ne sont alors comptés que pendant leur lecture
+    (cf. apprendre_base), plutôt que de parcourir deux fois les archives.
+    """
+    if est_source_simple(dossier):
+        return len(glob(dossier + '/*.txt'))
+    return None
+
+
+def limite_messages(nbDemande, nbMax):
+    """
+    Retourne le nombre de messages à parcourir : le plus petit des nombres connus,
+    ou None (tous les messages) si aucun ne l'est (cf. nombre_messages).
+    """
+    nombres = [n for n in (nbDemande, nbMax) if n is not None]
+    return min(nombres) if nombres else None
+
+
+def libelle_nombre(nbMessages):
+    """
+    Retourne le libellé d'un nombre de messages à parcourir ("tous les" si None).
+    """
+    return "tous les" if nbMessages is None else str(nbMessages)
@@ -0,0 +1,234 @@
+"""
+Module contenant la surveillance d'un répertoire de dépôt (spool) : les mails déposés dans le répertoire
+sont classés par un groupe de processus puis déplacés dans les sous-répertoires spam/ ou ham/ du répertoire
+de sortie, chaque verdict étant ajouté au journal des verdicts (json, un mail par ligne).
+
+Le répertoire est parcouru périodiquement (sans service externe). Les mails à classer passent par une file
+bornée : lorsqu'elle est pleine, le parcours attend que des mails aient été traités (contre-pression).
+Un mail n'est retiré du répertoire de dépôt qu'une fois classé ; après un arrêt (ou une interruption),
+les mails restants sont donc simplement classés au redémarrage.
+Les fichiers dont le nom commence par un point (en cours d'écriture) sont ignorés : un mail doit être écrit
+sous un nom temporaire puis renommé dans le répertoire de dépôt. Le journal des verdicts est lui aussi ignoré
+(il est par défaut dans le répertoire de sortie, c'est-à-dire le répertoire de dépôt).
+"""
+
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import json
+import os
+from pathlib import Path
+import signal
+import time
+from moduleUtils import eprint
+from moduleClassifieur import FiltreAntiSpam
+
+#: Sous-répertoire de sortie des mails illisibles
+DOSSIER_ERREURS = 'erreurs'
+#: Nom par défaut du journal des verdicts (dans le répertoire de sortie)
+DEFAULT_JOURNAL_VERDICTS = 'verdicts.jsonl'
+
+#: Filtre et option de nettoyage des processus de classement
+_filtreTravailleur = None
+_nettoyerTravailleur = False
+
+def _initialiser_travailleur(fichierFiltre, nettoyer):
+    """
+    Initialise un processus de classement : chaque processus charge le filtre
+    (un filtre binaire est projeté en mémoire et partagé entre les processus).
+    """
+    global _filtreTravailleur, _nettoyerTravailleur
+    signal.signal(signal.SIGINT, signal.SIG_IGN)    # L'arrêt est géré par le processus principal
+    _filtreTravailleur = FiltreAntiSpam.charger(fichierFiltre)
+    _nettoyerTravailleur = nettoyer
+
+
+def classer_fichier(chemin):
+    """
+    Classe un mail dans un processus de classement.
+
+    Returns
+    -------
+    tuple
+        (étiquette SPAM ou HAM, probabilité que le mail soit un spam).
+    """
+    verdict = _filtreTravailleur.classer(Path(chemin), _nettoyerTravailleur)
+    return (verdict.etiquette, verdict.pSpam)
+
+
+def destination_libre(dossier, nom):
+    """
+    Retourne un chemin inutilisé pour le fichier nom dans le dossier (un suffixe .1, .2... est ajouté si besoin).
+    """
+    destination = os.path.join(dossier, nom)
+    numero = 0
+    while os.path.exists(destination):
+        numero += 1
+        destination = os.path.join(dossier, nom + "." + str(numero))
+    return destination
+
+
+def fichiers_deposes(spool, ageMinimal, exclus=frozenset()):
+    """
+    Retourne les mails prêts à être classés dans le répertoire de dépôt, du plus ancien au plus récent.
+
+    Parameters
+    ----------
+    spool : str
+        Le répertoire de dépôt.
+    ageMinimal : float
+        L'âge minimal (en secondes, depuis la dernière modification) d'un mail pour être classé.
+    exclus : set
+        Les chemins (os.path.realpath) des fichiers à ignorer (journal des verdicts).
+
+    Returns
+    -------
+    list
+        Les chemins des mails.
+    """
+    limite = time.time() - ageMinimal
+    fichiers = []
+    with os.scandir(spool) as entrees:
+        for entree in entrees:
+            if entree.name.startswith('.') or not entree.is_file(follow_symlinks=False):
+                continue
+            if exclus and os.path.realpath(entree.path) in exclus:
+                continue
+            try:
+                dateModification = entree.stat(follow_symlinks=False).st_mtime
+            except FileNotFoundError:   # Retiré entre-temps
+                continue
+            if dateModification <= limite:
+                fichiers.append((dateModification, entree.path))
+    return [chemin for (_, chemin) in sorted(fichiers)]
+
+
+class SurveillantSpool:
+    """
+    Surveillance asyncio d'un répertoire de dépôt, le classement étant réalisé par un groupe de processus.
+    """
+
+    def __init__(self, fichierFiltre, spool, sortie, journalVerdicts=None, nbJobs=1, tailleFile=1000,
+                 intervalle=1., ageMinimal=0., nettoyer=False):
+        self.fichierFiltre = fichierFiltre
+        self.spool = spool
+        self.dossiers = {etiquette: os.path.join(sortie, etiquette.lower()) for etiquette in ("SPAM", "HAM")}
+        self.dossiers[DOSSIER_ERREURS] = os.path.join(sortie, DOSSIER_ERREURS)
+        self.journalVerdicts = journalVerdicts if journalVerdicts is not None else os.path.join(sortie, DEFAULT_JOURNAL_VERDICTS)
+        self.exclus = frozenset([os.path.realpath(self.journalVerdicts)])   # Le journal n'est pas un mail à classer
+        self.nbJobs = nbJobs
+        self.tailleFile = tailleFile
+        self.intervalle = intervalle
+        self.ageMinimal = ageMinimal
+        self.nettoyer = nettoyer
+        self.enCours = set()    # Mails en file ou en cours de classement (à ne pas reprendre au parcours suivant)
+        self.nbClasses = 0
+        self.nbErreurs = 0
+        self.arret = None
+        for dossier in self.dossiers.values():
+            os.makedirs(dossier, exist_ok=True)
+        # On vérifie le filtre dès le lancement plutôt que dans chaque processus
+        FiltreAntiSpam.charger(fichierFiltre)
+
+    def ranger(self, chemin, verdict):
+        """
+        Ajoute le verdict d'un mail classé au journal puis déplace le mail (classé ou illisible) dans son répertoire
+        de sortie. Le déplacement valide le classement : interrompu avant, le mail est de nouveau classé
+        au redémarrage (son verdict figure alors deux fois au journal), mais aucun mail rangé n'est sans verdict.
+        """
+        if verdict is None:
+            dossier = self.dossiers[DOSSIER_ERREURS]
+        else:
+            dossier = self.dossiers[verdict[0]]
+        destination = destination_libre(dossier, os.path.basename(chemin))
+        if verdict is not None:
+            ligne = {"chemin": chemin, "destination": destination, "etiquette": verdict[0], "pSpam": verdict[1],
+                     "date": time.time()}
+            self.verdicts.write(json.dumps(ligne) + "\n")
+            self.verdicts.flush()
+        os.replace(chemin, destination)
+
+    async def parcourir(self, file, arret):
+        """
+        Parcourt périodiquement le répertoire de dépôt et ajoute les nouveaux mails à la file
+        (en attendant qu'une place se libère lorsqu'elle est pleine).
+        """
+        boucle = asyncio.get_running_loop()
+        while not arret.is_set():
+            try:
+                fichiers = await boucle.run_in_executor(None, fichiers_deposes, self.spool, self.ageMinimal,
+                                                     self.exclus)
+            except OSError as e:
+                eprint("Parcours de '" + self.spool + "' impossible : " + str(e))
+                fichiers = []
+            for chemin in fichiers:
+                if arret.is_set():
+                    return
+                if chemin in self.enCours:
+                    continue
+                self.enCours.add(chemin)
+                await file.put(chemin)
+            try:
+                await asyncio.wait_for(arret.wait(), self.intervalle)
+            except asyncio.TimeoutError:
+                pass
+
+    async def classer(self, file, groupe):
+        """
+        Classe les mails de la file avec le groupe de processus et les range.
+        """
+        boucle = asyncio.get_running_loop()
+        while True:
+            chemin = await file.get()
+            try:
+                try:
+                    verdict = await boucle.run_in_executor(groupe, classer_fichier, chemin)
+                except BrokenProcessPool as e:  # Groupe inutilisable : arrêt, les mails restent dans le répertoire de dépôt
+                    eprint("Classement de " + chemin + " impossible, arrêt de la surveillance : " + str(e))
+                    self.arret.set()
+                    continue
+                except Exception as e:  # Mail illisible ou erreur du processus de classement
+                    if isinstance(e, OSError) and not os.path.exists(chemin):  # Retiré entre-temps
+                        continue
+                    eprint(chemin + " : " + repr(e))
+                    verdict = None
+                try:
+                    self.ranger(chemin, verdict)
+                except Exception as e:
+                    eprint("Impossible de ranger " + chemin + " : " + str(e))
+                    continue
+                if verdict is None:
+                    self.nbErreurs += 1
+                else:
+                    self.nbClasses += 1
+            finally:
+                self.enCours.discard(chemin)
+                file.task_done()
+
+    async def surveiller(self):
+        """
+        Surveille le répertoire de dépôt jusqu'à réception de SIGINT ou SIGTERM.
+        Les mails en cours de classement sont alors terminés ; ceux restés en file le seront au redémarrage.
+        """
+        arret = self.arret = asyncio.Event()
+        boucle = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            boucle.add_signal_handler(sig, arret.set)
+
+        file = asyncio.Queue(self.tailleFile)
+        with open(self.journalVerdicts, 'a') as self.verdicts, \
+             ProcessPoolExecutor(self.nbJobs, initializer=_initialiser_travailleur,
+                                 initargs=(self.fichierFiltre, self.nettoyer)) as groupe:
+            # Deux tâches par processus : un mail est rangé pendant que le suivant est classé
+            classements = [asyncio.ensure_future(self.classer(file, groupe)) for _ in range(2 * self.nbJobs)]
+            print("Surveillance de '" + self.spool + "'.")
+            await self.parcourir(file, arret)
+            while not file.empty():   # Les mails en file restent dans le répertoire de dépôt
+                chemin = file.get_nowait()
+                self.enCours.discard(chemin)
+                file.task_done()
+            await file.join()
+            for tache in classements:
+                tache.cancel()
+            await asyncio.gather(*classements, return_exceptions=True)
+        print(str(self.nbClasses) + " mails classés, " + str(self.nbErreurs) + " illisibles.")
@@ -4,6 +4,8 @@ Module contenant quelques fonctions utilitaires.
 
 from __future__ import print_function
 from argparse import ArgumentTypeError
+from glob import iglob
+from math import ceil
 import os
 import sys
 
@@ -45,6 +47,44 @@ def is_positive_integer(value):
         raise ArgumentTypeError("%s n'est pas un entier positif." % value)
     return ivalue
 
+def is_non_negative_number(value):
+    """
+    Vérifie que la valeur passée en paramètre est un nombre positif ou nul.
+
+    Raises
+    ------
+    ArgumentTypeError
+        Si la valeur passé en paramètre n'est pas un nombre positif ou nul.
+    """
+    try:
+        nombre = float(value)
+        if not nombre >= 0:
+            raise ValueError
+    except ValueError:
+        raise ArgumentTypeError("%s n'est pas un nombre positif ou nul." % value)
+    return nombre
+
+def is_positive_number_list(value):
+    """
+    Vérifie que la valeur passée en paramètre est une liste de nombres positifs séparés par des virgules.
+    Les nombres entiers sont convertis en int, les autres en float.
+
+    Raises
+    ------
+    ArgumentTypeError
+        Si la valeur passé en paramètre n'est pas une liste de nombres positifs.
+    """
+    nombres = []
+    try:
+        for element in value.split(','):
+            nombre = float(element)
+            if not nombre > 0:
+                raise ValueError
+            nombres.append(int(nombre) if nombre.is_integer() else nombre)
+    except ValueError:
+        raise ArgumentTypeError("%s n'est pas une liste de nombres positifs séparés par des virgules." % value)
+    return nombres
+
 def is_valid_directory(dirpath):
     """
     Vérifie si la chaîne de caractères passée en paramètre correspond bien à un répertoire existant.
@@ -82,14 +122,17 @@ def ask_input_for_integer_between_bounds(prompt, lowerBounds, upperBounds):
     lowerBounds : int
         La borne inférieur (inclusive).
     upperBounds : int
-        La borne supérieur (inclusive)
+        La borne supérieur (inclusive), ou None si elle est inconnue.
         
     Returns
     -------
     int
         L'entier entré par l'utilisateur.
     """
-    errorMsg = "Entrée invalide. Entier compris entre " + str(lowerBounds) + " et " + str(upperBounds) + " (inclus) requis."
+    if upperBounds is None:
+        errorMsg = "Entrée invalide. Entier supérieur ou égal à " + str(lowerBounds) + " requis."
+    else:
+        errorMsg = "Entrée invalide. Entier compris entre " + str(lowerBounds) + " et " + str(upperBounds) + " (inclus) requis."
     while True:
         try:
             value = int(input(prompt))
@@ -97,9 +140,57 @@ def ask_input_for_integer_between_bounds(prompt, lowerBounds, upperBounds):
             print(errorMsg)
             continue
 
-        if value < lowerBounds or value > upperBounds:
+        if value < lowerBounds or (upperBounds is not None and value > upperBounds):
             print(errorMsg)
             continue
         else:
             break
-    return value
\ No newline at end of file
+    return value
+
+def iterer_chemins(sources):
+    """
+    Parcourt (au fur et à mesure) les fichiers désignés par une liste de sources.
+
+    Parameters
+    ----------
+    sources : list
+        Les sources : un répertoire (ses fichiers sont parcourus),
+        un fichier, un motif glob ou '-' pour lire les chemins sur l'entrée standard (un par ligne).
+
+    Yields
+    ------
+    str
+        Le chemin de chaque fichier.
+    """
+    for source in sources:
+        if source == '-':
+            for ligne in sys.stdin:
+                ligne = ligne.rstrip('\r\n')
+                if ligne:
+                    yield ligne
+        elif os.path.isdir(source):
+            with os.scandir(source) as entrees:
+                for entree in entrees:
+                    if entree.is_file():
+                        yield entree.path
+        elif os.path.isfile(source):
+            yield source
+        else:
+            for chemin in iglob(source):
+                if os.path.isfile(chemin):
+                    yield chemin
+
+def centile(valeurs, q):
+    """
+    Calcule le centile q (entre 0 et 1) d'une liste de valeurs (méthode du rang le plus proche).
+
+    Returns
+    -------
+    float
+        Le centile, ou None si la liste est vide.
+    """
+    if not valeurs:
+        return None
+    valeursTriees = sorted(valeurs)
+    rang = ceil(q * len(valeursTriees)) - 1     # Plus petite valeur dont au moins q des valeurs sont inférieures ou égales
+    return valeursTriees[min(len(valeursTriees) - 1, max(0, rang))]
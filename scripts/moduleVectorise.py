@@ -0,0 +1,148 @@
+"""
+Module contenant le moteur d'apprentissage vectorisé (NumPy) du filtre anti-spam.
+
+La base d'apprentissage est traduite en une matrice creuse document x mot de présence
+(format CSR : tableaux indptr et indices), les comptes par classe sont obtenus
+par sommes de colonnes et le lissage par une seule opération sur les tableaux.
+Les résultats sont identiques à ceux de apprendre_base et lissage.
+La lecture des mails (tokenisation) reste celle de lire_mots_presents : seuls le comptage et le lissage sont vectorisés.
+"""
+
+from array import array
+import numpy as np
+from moduleFiltreAntiSpam import apprendre_base, lister_mails, lire_mots_presents
+from moduleSources import est_source_simple
+
+def matrice_presence(fichiersMails, indexMots, cache=None) :
+    """
+    Traduit une liste de mails en une matrice creuse de présence document x mot (format CSR).
+    
+    Parameters
+    ----------
+    fichiersMails : list
+        Les chemins des mails à lire.
+    indexMots : dict
+        L'index (mot -> numéro de colonne) des mots du dictionnaire.
+    cache : CacheTraits
+        Le cache des mots présents dans les mails (cf. moduleCache), ou None.
+    
+    Returns
+    -------
+    tuple
+        La matrice sous la forme (indptr, indices) : les numéros de colonnes des mots
+        présents dans le document i sont indices[indptr[i]:indptr[i+1]].
+    """
+    indptr = array('q', [0])
+    indices = array('i')
+
+    if cache is not None :
+        ensemblesMots = cache.lire_plusieurs(fichiersMails)
+    else :
+        ensemblesMots = (lire_mots_presents(fichierMail, indexMots) for fichierMail in fichiersMails)
+
+    for mots in ensemblesMots :
+        indices.extend(sorted(indexMots[mot] for mot in mots))
+        indptr.append(len(indices))
+
+    return (np.frombuffer(indptr, dtype=np.int64), np.frombuffer(indices, dtype=np.int32))
+
+
+def sommes_colonnes(indices, nbMots) :
+    """
+    Calcule, pour chaque mot, le nombre de documents de la matrice de présence le contenant.
+    
+    Parameters
+    ----------
+    indices : numpy.ndarray
+        Les numéros de colonnes de la matrice de présence (cf. matrice_presence).
+    nbMots : int
+        Le nombre de colonnes (mots) de la matrice.
+    
+    Returns
+    -------
+    numpy.ndarray
+        Le nombre de documents contenant chaque mot.
+    """
+    return np.bincount(indices, minlength=nbMots)
+
+
+def apprendre_base_vectorise(dicoComptes, dossierSpam, dossierHam, nbSpam, nbHam, nbJobs=1, cache=None, nettoyer=False) :
+    """
+    Met à jour le classifieur en apprenant l'ensemble des spams et des hams de la base (version vectorisée).
+    Équivalent à apprendre_base ; avec plusieurs processus, des archives ou le nettoyage des mails,
+    l'apprentissage est confié à apprendre_base.
+    
+    Parameters
+    ----------
+    dicoComptes : dict
+        Les comptes [nbSpam, nbHam] de chaque mot sous forme de dictionnaire.
+        Modifié à la sortie de la fonction.
+        Fait partie des attributs du classifieur.
+    dossierSpam : str
+        Le chemin du dossier qui contient tous les spams de la base d'apprentissage.
+    dossierHam : str
+        Le chemin du dossier qui contient tous les hams de la base d'apprentissage.
+    nbSpam : int
+        Le nombre totale de spams que le classifieur va apprendre.
+        Fait partie des attributs du classifieur.
+    nbHam : int
+        Le nombre totale de hams que le classifieur va apprendre.
+        Fait partie des attributs du classifieur.
+    nbJobs : int
+        Le nombre de processus utilisés pour l'apprentissage.
+    cache : CacheTraits
+        Le cache des mots présents dans les mails (cf. moduleCache), ou None.
+    nettoyer : bool
+        Supprime les en-têtes et les pièces jointes des mails avant l'apprentissage (cf. nettoyer_message).
+    
+    Returns
+    -------
+    tuple
+        Les nombres de spams et de hams réellement appris (cf. apprendre_base).
+    """
+    if nbJobs > 1 or nettoyer or not (est_source_simple(dossierSpam) and est_source_simple(dossierHam)) :
+        return apprendre_base(dicoComptes, dossierSpam, dossierHam, nbSpam, nbHam, nbJobs, cache, nettoyer)
+
+    mots = list(dicoComptes)
+    indexMots = {mot: i for (i, mot) in enumerate(mots)}
+
+    fichiersSpam = lister_mails(dossierSpam, nbSpam)
+    fichiersHam = lister_mails(dossierHam, nbHam)
+    (_, indicesSpam) = matrice_presence(fichiersSpam, indexMots, cache)
+    (_, indicesHam) = matrice_presence(fichiersHam, indexMots, cache)
+    comptesSpam = sommes_colonnes(indicesSpam, len(mots)).tolist()
+    comptesHam = sommes_colonnes(indicesHam, len(mots)).tolist()
+
+    for (i, mot) in enumerate(mots) :
+        dicoComptes[mot][0] += comptesSpam[i]
+        dicoComptes[mot][1] += comptesHam[i]
+    return (len(fichiersSpam), len(fichiersHam))
+
+
+def lissage_vectorise(dicoComptes, nbSpam, nbHam, epsilon) :
+    """
+    Calcule les probas lissées à partir des comptes (version vectorisée).
+    Équivalent à lissage.
+    
+    Parameters
+    ----------
+    dicoComptes : dict
+        Les comptes [nbSpam, nbHam] de chaque mot sous forme de dictionnaire.
+        Fait partie des attributs du classifieur.
+    nbSpam : int
+        Le nombre totale de spams que le classifieur a appris.
+        Fait partie des attributs du classifieur.
+    nbHam : int
+        Le nombre totale de hams que le classifieur a appris.
+        Fait partie des attributs du classifieur.    
+    epsilon : int
+        Paramètre du lissage.
+
+    Returns
+    -------
+    dict
+        Les probabilités [P(mot|spam), P(mot|ham)] sous forme de dictionnaire.
+    """
+    comptes = np.array(list(dicoComptes.values()), dtype=np.float64).reshape(-1, 2)
+    probas = (comptes + epsilon) / np.array([nbSpam + 2*epsilon, nbHam + 2*epsilon], dtype=np.float64)
+    return dict(zip(dicoComptes, probas.tolist()))
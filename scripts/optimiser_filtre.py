@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+"""
+Règle les hyperparamètres du filtre anti-spam : évalue par validation croisée à k plis
+le taux d'erreurs de chaque combinaison d'epsilon (lissage) et de nombre minimal de caractères
+des mots du dictionnaire, sur la base d'apprentissage passée en paramètre.
+La base n'est lue qu'une fois, quel que soit le nombre de configurations et de plis.
+"""
+
+import argparse
+import os
+from moduleUtils import is_positive_integer, is_positive_number_list, is_valid_directory, is_valid_file, eprint
+from moduleFiltreAntiSpam import charger_dictionnaire, lister_mails, DEFAULT_DICT, DEFAULT_MIN_CHAR_DICT, EPSILON
+from moduleOptimisation import valider_configurations
+from moduleCache import CacheTraits
+
+def main():
+    # On parse les arguments
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("repAppr", metavar="répertoireApprentissage", type=is_valid_directory,
+                        help="répertoire contenant la base d'apprentissage (contenant 2 sous-répertoires spam et ham).")
+    parser.add_argument("nbSpam", nargs='?', metavar="nbSpam", type=is_positive_integer,
+                        help="(optionnel) nombre de spam à utiliser parmi ceux de la base d'apprentissage.")
+    parser.add_argument("nbHam", nargs='?', metavar="nbHam", type=is_positive_integer,
+                        help="(optionnel) nombre de ham à utiliser parmi ceux de la base d'apprentissage.")
+    parser.add_argument("-d", "--dictionnaire", metavar="dictionnaire", dest="dict", type=is_valid_file, default=DEFAULT_DICT,
+                        help="le dictionnaire contenant les mots à prendre en compte.\nPar défault, c'est le fichier '" + DEFAULT_DICT + "' qui sera utilisé.")
+    parser.add_argument("-e", "--epsilons", metavar="e1,e2,...", type=is_positive_number_list, default=[0.01, 0.1, 0.5, EPSILON, 2],
+                        help="les valeurs d'epsilon à évaluer (par défaut : 0.01,0.1,0.5,1,2).")
+    parser.add_argument("-m", "--min-caracteres", metavar="m1,m2,...", dest="minCaracteres", type=is_positive_number_list,
+                        default=[1, 2, DEFAULT_MIN_CHAR_DICT, 4, 5],
+                        help="les nombres minimaux de caractères des mots du dictionnaire à évaluer (par défaut : 1,2,3,4,5).")
+    parser.add_argument("-k", "--plis", metavar="k", type=is_positive_integer, default=5,
+                        help="nombre de plis de la validation croisée (par défaut : 5).")
+    parser.add_argument("-j", "--jobs", metavar="N", dest="jobs", type=is_positive_integer, default=1,
+                        help="nombre de processus (par défaut : 1).")
+    parser.add_argument("-g", "--graine", metavar="graine", type=int, default=0,
+                        help="graine de la répartition aléatoire des mails dans les plis (par défaut : 0).")
+    parser.add_argument("-c", "--cache", metavar="fichierCache", dest="cache",
+                        help="cache des mots présents dans les mails : seuls les mails nouveaux ou modifiés sont relus.")
+    args = parser.parse_args()
+
+    if args.plis < 2:
+        parser.error("au moins 2 plis sont nécessaires.")
+    if any(not isinstance(m, int) for m in args.minCaracteres):
+        parser.error("les nombres minimaux de caractères doivent être entiers.")
+
+    spamDir = os.path.join(args.repAppr, 'spam')
+    hamDir = os.path.join(args.repAppr, 'ham')
+    fichiersSpam = lister_mails(spamDir, args.nbSpam)
+    fichiersHam = lister_mails(hamDir, args.nbHam)
+    if len(fichiersSpam) < args.plis or len(fichiersHam) < args.plis:
+        eprint("Pas assez de spams ou de hams dans " + args.repAppr + " pour " + str(args.plis) + " plis.")
+        exit(-1)
+
+    # Le dictionnaire est chargé avec le plus petit nombre minimal de caractères : les autres s'en déduisent
+    minNbOfChar = min(args.minCaracteres)
+    dicoComptes = charger_dictionnaire(args.dict, minNbOfChar)
+    configurations = [(epsilon, m) for epsilon in args.epsilons for m in args.minCaracteres]
+
+    print("Validation croisée à " + str(args.plis) + " plis sur " + str(len(fichiersSpam)) + " spams et "
+          + str(len(fichiersHam)) + " hams, " + str(len(configurations)) + " configurations...")
+    cache = CacheTraits(args.cache, dicoComptes, minNbOfChar) if args.cache is not None else None
+    resultats = valider_configurations(fichiersSpam, fichiersHam, dicoComptes, configurations, args.plis,
+                                       args.jobs, args.graine, cache)
+    if cache is not None:
+        cache.fermer()
+
+    print("{0:>10} {1:>8} {2:>10} {3:>10} {4:>10}".format("epsilon", "minCar", "err. spam", "err. ham", "err. total"))
+    meilleur = min(resultats, key=lambda resultat: resultat['tauxErreur'])
+    for resultat in resultats:
+        print("{0:>10} {1:>8} {2:>9.2f}% {3:>9.2f}% {4:>9.2f}%{5}".format(
+            resultat['epsilon'], resultat['minNbOfChar'], resultat['tauxErreurSpam']*100, resultat['tauxErreurHam']*100,
+            resultat['tauxErreur']*100, " *" if resultat is meilleur else ""))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,29 @@
+#!/usr/bin/env python
+"""
+Publie un filtre/classifieur (fichier json ou binaire) dans un répertoire de partage en mémoire
+(par défaut sur /dev/shm) : les processus de classement le projettent en lecture seule, sans copie
+(cf. modulePartage.FiltrePartage), et passent à la nouvelle version de manière atomique à leur actualisation.
+"""
+
+import argparse
+from moduleUtils import is_valid_file, eprint
+from modulePartage import publier_fichier, DEFAULT_DOSSIER_PARTAGE
+
+def main():
+    # On parse les arguments
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("fichierFiltre", metavar="fichierFiltre", type=is_valid_file,
+                        help="fichier contenant les données du filtre à publier.")
+    parser.add_argument("-d", "--dossier", metavar="répertoire", default=DEFAULT_DOSSIER_PARTAGE,
+                        help="répertoire de partage.\nPar défaut : '" + DEFAULT_DOSSIER_PARTAGE + "'.")
+    args = parser.parse_args()
+
+    try:
+        version = publier_fichier(args.dossier, args.fichierFiltre)
+    except ValueError as e: # N'est pas un fichier de filtre
+        eprint(str(e))
+        exit(-1)
+    print("Filtre '" + args.fichierFiltre + "' publié dans '" + args.dossier + "' (version " + str(version) + ").")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,208 @@
+#!/usr/bin/env python
+"""
+Serveur de classification résident : garde le filtre/classifieur (fichier json, binaire ou haché) en mémoire
+et répond aux requêtes reçues sur une socket Unix locale (cf. client_filtre.py).
+
+Chaque requête et chaque réponse est un objet json sur une ligne :
+  {"action": "classer", "chemin": "..."} ou {"action": "classer", "contenu": "..."}
+  {"action": "apprendre", "chemin"/"contenu": "...", "type": "SPAM"|"HAM"} (avec l'option --apprentissage)
+  {"action": "stats"} : nombre de requêtes et latences p50/p99 (en ms)
+Le fichier de filtre est rechargé à chaud lorsqu'il (ou son journal) est modifié sur le disque ;
+les mails appris sont ajoutés au journal du filtre (cf. moduleJournal).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+import time
+from collections import deque
+from moduleUtils import is_valid_file, is_positive_integer, eprint, centile
+from moduleFiltreAntiSpam import lire_contenu
+from moduleClassifieur import FiltreAntiSpam
+from moduleJournal import journaliser, taille_journal, mots_du_contenu
+from moduleMetriques import ajouter_arguments, activer_depuis_arguments
+
+#: Chemin par défaut de la socket du serveur
+DEFAULT_SOCKET = "/tmp/filtre_anti_spam.sock"
+#: Nombre de latences conservées pour le calcul des centiles
+NB_LATENCES = 10000
+
+class ServeurFiltre:
+    """
+    Serveur asyncio gardant le filtre (FiltreAntiSpam immuable) en mémoire.
+    """
+
+    def __init__(self, fichierFiltre, apprentissage, intervalleRechargement):
+        self.fichierFiltre = fichierFiltre
+        self.apprentissage = apprentissage
+        self.intervalleRechargement = intervalleRechargement
+        self.latences = deque(maxlen=NB_LATENCES)
+        self.nbRequetes = 0
+        self.verrouApprentissage = asyncio.Lock()
+        self.charger()
+
+    def charger(self):
+        """
+        (Re)charge le filtre depuis le fichier (et son journal). Le filtre est remplacé d'un bloc :
+        les requêtes en cours continuent d'utiliser l'ancien.
+        """
+        version = self.version_fichier()
+        (self.filtre, self.version) = (FiltreAntiSpam.charger(self.fichierFiltre), version)
+
+    def version_fichier(self):
+        """
+        Retourne la version du filtre sur le disque : date de modification du filtre et taille de son journal.
+        """
+        return (os.stat(self.fichierFiltre).st_mtime_ns, taille_journal(self.fichierFiltre))
+
+    async def surveiller_filtre(self):
+        """
+        Recharge le filtre lorsque le fichier ou son journal est modifié sur le disque.
+        """
+        boucle = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.intervalleRechargement)
+            try:
+                if self.version_fichier() == self.version:
+                    continue
+                async with self.verrouApprentissage:
+                    await boucle.run_in_executor(None, self.charger)
+                eprint("Filtre '" + self.fichierFiltre + "' rechargé.")
+            except (OSError, ValueError) as e:  # Fichier en cours d'écriture ou invalide : on garde l'ancien filtre
+                eprint("Rechargement impossible : " + str(e))
+
+    async def apprendre(self, contenu, isSpam):
+        """
+        Apprend un mail, l'ajoute au journal du filtre et remplace le filtre par le nouvel instantané.
+        """
+        boucle = asyncio.get_running_loop()
+        async with self.verrouApprentissage:
+            self.filtre = await boucle.run_in_executor(None, self.filtre.apprendre, contenu, isSpam)
+            (debut, fin) = await boucle.run_in_executor(None, lambda: journaliser(self.fichierFiltre,
+                                                                                mots_du_contenu(contenu, self.vocabulaire()), isSpam))
+            if debut == self.version[1]:    # Sinon, une autre mise à jour a eu lieu : le filtre sera rechargé
+                self.version = (self.version[0], fin)
+
+    def vocabulaire(self):
+        """
+        Retourne le vocabulaire du filtre à conserver dans le journal (None pour un filtre haché).
+        """
+        return None if getattr(self.filtre.mots, 'ouvert', False) else self.filtre.mots
+
+    def statistiques(self):
+        """
+        Retourne le nombre de requêtes traitées et les latences p50/p99 (en ms).
+        """
+        latences = list(self.latences)
+        return {"requetes": self.nbRequetes,
+                "p50": centile(latences, 0.5), "p99": centile(latences, 0.99)}
+
+    async def traiter(self, requete):
+        """
+        Traite une requête et retourne la réponse.
+        La lecture et le classement d'un mail sont réalisés hors de la boucle d'événements (run_in_executor) :
+        un gros mail ne bloque pas les autres clients.
+        """
+        if not isinstance(requete, dict):
+            return {"erreur": "Requête invalide : un objet json est attendu."}
+        action = requete.get("action")
+        if action == "stats":
+            return self.statistiques()
+        if action not in ("classer", "apprendre"):
+            return {"erreur": "Action inconnue : " + str(action)}
+
+        boucle = asyncio.get_running_loop()
+        if "contenu" in requete:
+            contenu = requete["contenu"]
+            if not isinstance(contenu, str):
+                return {"erreur": "Contenu invalide : une chaîne de caractères est attendue."}
+        else:
+            chemin = requete.get("chemin")
+            if not isinstance(chemin, str):
+                return {"erreur": "Requête invalide : 'contenu' ou 'chemin' (chaîne de caractères) requis."}
+            contenu = await boucle.run_in_executor(None, lire_contenu, chemin)
+
+        if action == "classer":
+            verdict = await boucle.run_in_executor(None, self.filtre.classer, contenu)
+            return {"etiquette": verdict.etiquette, "pSpam": verdict.pSpam}
+
+        if not self.apprentissage:
+            return {"erreur": "Apprentissage désactivé (option --apprentissage)."}
+        type = str(requete.get("type")).upper()
+        if type not in ("SPAM", "HAM"):
+            return {"erreur": "Type invalide : " + type + ". SPAM ou HAM requis."}
+        await self.apprendre(contenu, type == "SPAM")
+        return {"appris": type}
+
+    async def gerer_connexion(self, lecteur, ecrivain):
+        """
+        Traite les requêtes (une par ligne) d'une connexion cliente.
+        """
+        try:
+            while True:
+                ligne = await lecteur.readline()
+                if not ligne:
+                    break
+                debut = time.perf_counter()
+                try:
+                    reponse = await self.traiter(json.loads(ligne))
+                except (ValueError, KeyError, OSError) as e:
+                    reponse = {"erreur": str(e)}
+                self.latences.append((time.perf_counter() - debut) * 1000)
+                self.nbRequetes += 1
+                ecrivain.write((json.dumps(reponse) + "\n").encode())
+                await ecrivain.drain()
+        except ConnectionError:
+            pass
+        finally:
+            ecrivain.close()
+
+    async def servir(self, cheminSocket):
+        """
+        Lance le serveur jusqu'à réception de SIGINT ou SIGTERM.
+        """
+        if os.path.exists(cheminSocket):
+            os.unlink(cheminSocket)
+        serveur = await asyncio.start_unix_server(self.gerer_connexion, path=cheminSocket, limit=2**26)
+        surveillance = asyncio.ensure_future(self.surveiller_filtre())
+
+        arret = asyncio.Event()
+        boucle = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            boucle.add_signal_handler(sig, arret.set)
+
+        print("Serveur à l'écoute sur '" + cheminSocket + "'.")
+        async with serveur:
+            await arret.wait()
+        surveillance.cancel()
+        os.unlink(cheminSocket)
+
+        stats = self.statistiques()
+        print("{0} requêtes traitées (p50 = {1} ms, p99 = {2} ms).".format(stats["requetes"], stats["p50"], stats["p99"]))
+
+def main():
+    # On parse les arguments
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("fichierFiltre", metavar="fichierFiltre", type=is_valid_file,
+                        help="fichier contenant les données du filtre.")
+    parser.add_argument("-s", "--socket", default=DEFAULT_SOCKET, metavar="socket", dest="socket",
+                        help="chemin de la socket Unix du serveur.\nPar défaut : '" + DEFAULT_SOCKET + "'.")
+    parser.add_argument("-a", "--apprentissage", action="store_true",
+                        help="autorise les requêtes d'apprentissage (le fichier de filtre est alors mis à jour).")
+    parser.add_argument("-r", "--rechargement", type=is_positive_integer, default=2, metavar="secondes",
+                        help="intervalle de vérification des modifications du fichier de filtre (par défaut : 2s).")
+    ajouter_arguments(parser)
+    args = parser.parse_args()
+    activer_depuis_arguments(args)
+
+    try:
+        serveur = ServeurFiltre(args.fichierFiltre, args.apprentissage, args.rechargement)
+    except ValueError as e: # N'est pas un fichier de filtre
+        eprint(str(e))
+        exit(-1)
+    asyncio.run(serveur.servir(args.socket))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+"""
+Surveille un répertoire de dépôt (spool) : chaque mail qui y est déposé est classé avec le filtre/classifieur
+(fichier json ou binaire) puis déplacé dans le sous-répertoire spam/ ou ham/ du répertoire de sortie
+(erreurs/ pour un mail illisible), et son verdict est ajouté au journal des verdicts (json, un mail par ligne).
+
+Les mails doivent être écrits sous un nom commençant par un point puis renommés dans le répertoire de dépôt
+(ou y être déposés depuis au moins --age secondes). Un mail n'est retiré du répertoire de dépôt qu'une fois classé :
+après un arrêt (SIGINT ou SIGTERM) ou une interruption, la surveillance reprend simplement avec les mails restants.
+"""
+
+import argparse
+import asyncio
+from moduleUtils import is_valid_file, is_valid_directory, is_positive_integer, is_non_negative_number, eprint
+from moduleSpool import SurveillantSpool, DEFAULT_JOURNAL_VERDICTS
+from moduleMetriques import ajouter_arguments, activer_depuis_arguments
+
+def main():
+    # On parse les arguments
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("fichierFiltre", metavar="fichierFiltre", type=is_valid_file,
+                        help="fichier contenant les données du filtre.")
+    parser.add_argument("spool", metavar="répertoireDépôt", type=is_valid_directory,
+                        help="répertoire surveillé dans lequel les mails sont déposés.")
+    parser.add_argument("-o", "--sortie", metavar="répertoireSortie", dest="sortie",
+                        help="répertoire de sortie contenant les sous-répertoires spam, ham et erreurs\n(par défaut : le répertoire de dépôt).")
+    parser.add_argument("-v", "--verdicts", metavar="fichier", dest="verdicts",
+                        help="journal des verdicts (par défaut : '" + DEFAULT_JOURNAL_VERDICTS + "' dans le répertoire de sortie).")
+    parser.add_argument("-j", "--jobs", metavar="N", dest="jobs", type=is_positive_integer, default=1,
+                        help="nombre de processus de classement (par défaut : 1).")
+    parser.add_argument("-q", "--file", metavar="N", dest="tailleFile", type=is_positive_integer, default=1000,
+                        help="nombre maximal de mails en attente de classement (par défaut : 1000).")
+    parser.add_argument("-i", "--intervalle", metavar="secondes", type=is_non_negative_number, default=1.,
+                        help="intervalle entre deux parcours du répertoire de dépôt (par défaut : 1s).")
+    parser.add_argument("--age", metavar="secondes", dest="ageMinimal", type=is_non_negative_number, default=0.,
+                        help="âge minimal (depuis la dernière modification) d'un mail pour être classé (par défaut : 0s).")
+    parser.add_argument("-n", "--nettoyer", action="store_true",
+                        help="supprime les en-têtes et les pièces jointes des mails avant la prédiction.")
+    ajouter_arguments(parser)
+    args = parser.parse_args()
+    activer_depuis_arguments(args)
+
+    try:
+        surveillant = SurveillantSpool(args.fichierFiltre, args.spool, args.sortie if args.sortie is not None else args.spool,
+                                       args.verdicts, args.jobs, args.tailleFile, args.intervalle, args.ageMinimal, args.nettoyer)
+    except ValueError as e: # N'est pas un fichier de filtre
+        eprint(str(e))
+        exit(-1)
+    asyncio.run(surveillant.surveiller())
+
+if __name__ == '__main__':
+    main()
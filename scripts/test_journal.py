@@ -0,0 +1,43 @@
+"""
+Tests du journal d'apprentissage en ligne (cf. moduleJournal).
+"""
+
+import os
+import tempfile
+import unittest
+from moduleFiltreAntiSpam import sauvegarder_filtre, charger_filtre
+from moduleJournal import chemin_journal, journaliser, compacter_filtre
+
+class TestJournal(unittest.TestCase):
+
+    def setUp(self):
+        self.dossier = tempfile.TemporaryDirectory()
+        self.cheminFiltre = os.path.join(self.dossier.name, "filtre.json")
+        sauvegarder_filtre(self.cheminFiltre, {"ARGENT": [1, 0], "REUNION": [0, 1]}, 1, 1, 1.0)
+
+    def tearDown(self):
+        self.dossier.cleanup()
+
+    def test_ajout_apres_ligne_incomplete(self):
+        journaliser(self.cheminFiltre, ["ARGENT"], True)
+        with open(chemin_journal(self.cheminFiltre), 'ab') as journal:    # Écriture interrompue
+            journal.write(b'{"nbSpam": 1, "nbHam": 0, "mo')
+        journaliser(self.cheminFiltre, ["REUNION"], False)
+
+        (dicoComptes, nbSpam, nbHam, _) = charger_filtre(self.cheminFiltre)
+        self.assertEqual((nbSpam, nbHam), (2, 2))
+        self.assertEqual(dicoComptes, {"ARGENT": [2, 0], "REUNION": [0, 2]})
+
+    def test_compaction_apres_ligne_incomplete(self):
+        with open(chemin_journal(self.cheminFiltre), 'ab') as journal:
+            journal.write(b'{"nbSpam": 1, "nbHam": 0, "mots": ["ARG')
+        journaliser(self.cheminFiltre, ["ARGENT"], True)
+
+        self.assertEqual(compacter_filtre(self.cheminFiltre), 1)
+        (dicoComptes, nbSpam, nbHam, _) = charger_filtre(self.cheminFiltre)
+        self.assertEqual((nbSpam, nbHam), (2, 1))
+        self.assertEqual(dicoComptes["ARGENT"], [2, 0])
+
+
+if __name__ == '__main__':
+    unittest.main()